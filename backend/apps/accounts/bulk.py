@@ -0,0 +1,471 @@
+"""
+Bulk registration of public users and their sub-accounts by a data collector.
+
+A batch is a list of rows (JSON, or a CSV with dotted headers such as
+``user.first_name`` / ``profile.address.zilla``) plus an optional zip of photos
+and signatures referenced by file name::
+
+    {
+        "ref": "hh-12",                      # client reference, echoed back
+        "account_type": "public",            # or "sub_account"
+        "user": {"first_name": ..., "last_name": ..., "phone": ..., "email": ...},
+        "profile": {"name_en": ..., "name_bn": ..., "nid": ..., "photo": "hh-12.jpg",
+                    "address": {"division": 3, "zilla": 17, ...}}
+    }
+
+Sub-account rows name their parent either by user id (``user.parent`` plus the
+parent's ``profile.guardian_nid``, as the single registration does) or by the
+``ref`` of a public row in the same batch (``user.parent_ref``). Like the single
+registration, a sub-account gets the username ``<first_name>-<last_name>`` and a
+random temporary password, which is returned once in its row of the report.
+
+Validation is set based: contact uniqueness, parents and address references are
+checked with one query per kind for the whole batch, and field formats with
+``full_clean()`` minus the per-row database checks. Valid rows are then written
+with ``bulk_create`` for ``User``, ``Address`` and ``UserProfile`` in one
+transaction per chunk. ``bulk_create`` skips ``save()`` and signals, so the
+normalized contacts, dashboard rollups and collector counters are maintained
+here explicitly. Every row gets its own entry in the report; a chunk that still
+hits a database error is retried row by row so one bad row can't sink the rest.
+"""
+import csv
+import io
+import json
+import logging
+import os
+import zipfile
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.validators import validate_image_file_extension
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+from django.utils.crypto import get_random_string
+
+from apps.address.models import Address, Division, Para, PostOffice, Union, Upazila, Village, Zilla
+from core.utils.contact import normalize_email, normalize_phone
+
+from .models import CollectorCounter, Role, User, UserProfile, counters_enabled
+
+
+logger = logging.getLogger(__name__)
+
+ACCOUNT_TYPES = ("public", "sub_account")
+ROLE_FOR_ACCOUNT_TYPE = {"public": "public", "sub_account": "subUser"}
+USER_FIELDS = ("first_name", "last_name", "email", "phone")
+PROFILE_FIELDS = (
+    "name_en", "name_bn", "phone", "gurdian_phone", "gurdian_email", "relationship",
+    "nid", "guardian_nid", "father_name_en", "father_name_bn", "mother_name_en", "mother_name_bn",
+    "spouse_name_en", "spouse_name_bn", "occupation", "blood_group", "data_of_birth", "email",
+)
+IMAGE_FIELDS = ("photo", "signature")
+ADDRESS_MODELS = {
+    "division": Division, "zilla": Zilla, "upazila": Upazila, "union": Union,
+    "post_office": PostOffice, "village": Village, "para": Para,
+}
+
+
+class BulkRegistrationError(Exception):
+    """The batch as a whole can't be read (bad file, too many rows, ...)."""
+
+
+# -- reading -----------------------------------------------------------------
+
+def _nest(flat):
+    """``{"user.first_name": "A"}`` -> ``{"user": {"first_name": "A"}}``; blank cells are dropped."""
+    row = {}
+    for header, value in flat.items():
+        if header is None or value is None or str(value).strip() == "":
+            continue
+        *parents, leaf = header.strip().split(".")
+        node = row
+        for parent in parents:
+            node = node.setdefault(parent, {})
+        node[leaf] = value.strip() if isinstance(value, str) else value
+    return row
+
+
+def read_rows(data, files, field="rows"):
+    """Rows from a JSON body (``{"rows": [...]}``) or an uploaded ``rows`` file (.json or .csv)."""
+    upload = files.get(field)
+    if upload is not None:
+        content = upload.read().decode("utf-8-sig")
+        if upload.name.lower().endswith(".csv"):
+            rows = [_nest(flat) for flat in csv.DictReader(io.StringIO(content))]
+        else:
+            try:
+                rows = json.loads(content)
+            except ValueError:
+                raise BulkRegistrationError(f"{field} file is neither CSV nor JSON")
+    else:
+        rows = data.get(field)
+        if isinstance(rows, str):
+            try:
+                rows = json.loads(rows)
+            except ValueError:
+                raise BulkRegistrationError(f"{field} must be a JSON list")
+
+    if isinstance(rows, dict):
+        rows = rows.get(field)
+    if not isinstance(rows, list) or not rows:
+        raise BulkRegistrationError(f"{field} must be a non-empty list")
+    if len(rows) > settings.BULK_REGISTRATION_MAX_ROWS:
+        raise BulkRegistrationError(f"At most {settings.BULK_REGISTRATION_MAX_ROWS} {field} per batch")
+    return rows
+
+
+def open_photos(files):
+    """The uploaded ``photos`` zip, indexed by base file name, or an empty dict."""
+    upload = files.get("photos")
+    if upload is None:
+        return {}
+    try:
+        archive = zipfile.ZipFile(upload)
+    except zipfile.BadZipFile:
+        raise BulkRegistrationError("photos must be a zip archive")
+    return {
+        os.path.basename(info.filename): (archive, info)
+        for info in archive.infolist() if not info.is_dir()
+    }
+
+
+# -- validation --------------------------------------------------------------
+
+def _clean_instance(instance, errors, prefix, exclude):
+    try:
+        instance.full_clean(exclude=exclude, validate_unique=False, validate_constraints=False)
+    except ValidationError as error:
+        for field, messages in error.message_dict.items():
+            errors[f"{prefix}.{field}"] = messages
+
+
+def _existing_ids(model, ids):
+    ids = {value for value in ids if value is not None}
+    if not ids:
+        return set()
+    return set(model.objects.filter(pk__in=ids).values_list("pk", flat=True))
+
+
+def _as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class BulkRegistration:
+    """One batch submitted by ``collector``; ``run()`` returns the per-row report."""
+
+    def __init__(self, rows, collector, photos=None):
+        self.rows = rows
+        self.collector = collector
+        self.photos = photos or {}
+        self.results = [None] * len(rows)
+        self.roles = {role.name: role for role in Role.objects.filter(name__in=ROLE_FOR_ACCOUNT_TYPE.values())}
+
+    def run(self):
+        entries = [self._build(index, row) for index, row in enumerate(self.rows)]
+        entries = [entry for entry in entries if entry is not None]
+        self._check_contacts(entries)
+        self._check_addresses(entries)
+
+        created_by_ref = {}
+        public = [entry for entry in entries if entry["account_type"] == "public"]
+        for entry in self._insert(public):
+            if entry["ref"] is not None:
+                created_by_ref[entry["ref"]] = entry
+
+        sub_accounts = [entry for entry in entries if entry["account_type"] == "sub_account"]
+        self._check_parents(sub_accounts, created_by_ref)
+        self._check_usernames(sub_accounts)
+        self._insert(sub_accounts)
+        return self.results
+
+    # building and per-row checks
+
+    def _fail(self, index, ref, errors):
+        self.results[index] = {"row": index, "ref": ref, "status": "error", "errors": errors}
+
+    def _build(self, index, row):
+        if not isinstance(row, dict):
+            self._fail(index, None, {"row": ["Expected an object"]})
+            return None
+        ref = row.get("ref")
+        account_type = row.get("account_type")
+        user_data = row.get("user") or {}
+        profile_data = dict(row.get("profile") or {})
+        address_data = profile_data.pop("address", None)
+        errors = {}
+
+        if account_type not in ACCOUNT_TYPES:
+            self._fail(index, ref, {"account_type": [f"Must be one of {', '.join(ACCOUNT_TYPES)}"]})
+            return None
+        role = self.roles.get(ROLE_FOR_ACCOUNT_TYPE[account_type])
+        if role is None:
+            self._fail(index, ref, {"account_type": ["Role is not configured"]})
+            return None
+
+        for field in set(row) - {"ref", "account_type", "user", "profile"}:
+            errors[field] = ["Unknown field"]
+        for prefix, data, allowed in (
+            ("user", user_data, USER_FIELDS + ("parent", "parent_ref")),
+            ("profile", profile_data, PROFILE_FIELDS + IMAGE_FIELDS),
+            ("profile.address", address_data or {}, tuple(ADDRESS_MODELS)),
+        ):
+            for field in set(data) - set(allowed):
+                errors[f"{prefix}.{field}"] = ["Unknown field"]
+
+        user = User(
+            role=role,
+            addBy=self.collector,
+            password=make_password(None),
+            **{field: user_data[field] for field in USER_FIELDS if field in user_data},
+        )
+        user.email = user.email or ""
+        password = None
+        if account_type == "sub_account":
+            password = get_random_string(12)
+            user.set_password(password)
+            user.username = f"{user.first_name}-{user.last_name}"
+        user.email_normalized = normalize_email(user.email)
+        user.phone_normalized = normalize_phone(user.phone)
+        _clean_instance(user, errors, "user", exclude=["role", "parent", "addBy", "rejected_by", "approved_by", "username"])
+
+        profile = UserProfile(**{field: profile_data[field] for field in PROFILE_FIELDS if field in profile_data})
+        _clean_instance(profile, errors, "profile", exclude=["user", "address", *IMAGE_FIELDS])
+
+        address = None
+        if address_data is not None or account_type == "public":
+            address = Address(**{
+                f"{field}_id": _as_int(value) for field, value in (address_data or {}).items() if field in ADDRESS_MODELS
+            })
+            for field, value in (address_data or {}).items():
+                if field in ADDRESS_MODELS and _as_int(value) is None:
+                    errors[f"profile.address.{field}"] = ["Must be an id"]
+
+        if account_type == "public":
+            if not user.phone and not user.email:
+                errors["user.unique_field_error"] = ["Either phone or email must be provided."]
+            if not profile.phone and not profile.email:
+                errors["profile.non_field_errors"] = ["Either phone or email must be provided."]
+        else:
+            if not user_data.get("parent") and not user_data.get("parent_ref"):
+                errors["user.parent"] = ["Parent ID or parent_ref is required for sub-account"]
+
+        images = {}
+        for field in IMAGE_FIELDS:
+            name = profile_data.get(field)
+            if not name:
+                continue
+            member = self.photos.get(os.path.basename(str(name)))
+            if member is None:
+                errors[f"profile.{field}"] = [f"{name} is not in the photos archive"]
+                continue
+            archive, info = member
+            if info.file_size > settings.BULK_REGISTRATION_MAX_PHOTO_BYTES:
+                errors[f"profile.{field}"] = [f"{name} is larger than {settings.BULK_REGISTRATION_MAX_PHOTO_BYTES} bytes"]
+                continue
+            try:
+                validate_image_file_extension(ContentFile(b"", name=info.filename))
+            except ValidationError as error:
+                errors[f"profile.{field}"] = error.messages
+                continue
+            images[field] = (archive, info)
+
+        if errors:
+            self._fail(index, ref, errors)
+            return None
+        return self._prepare({
+            "index": index, "ref": ref, "account_type": account_type,
+            "parent": user_data.get("parent"), "parent_ref": user_data.get("parent_ref"),
+            "guardian_nid": profile.guardian_nid, "password": password,
+            "user": user, "profile": profile, "address": address, "images": images,
+        })
+
+    def _prepare(self, entry):
+        """Hook for subclasses to adjust a validated entry before it is inserted."""
+        return entry
+
+    # set-based checks
+
+    def _reject(self, entries, rejected):
+        """Drop the entries whose index is in ``rejected`` (index -> errors) from ``entries``."""
+        for entry in entries:
+            if entry["index"] in rejected:
+                self._fail(entry["index"], entry["ref"], rejected[entry["index"]])
+        entries[:] = [entry for entry in entries if entry["index"] not in rejected]
+
+    def _check_contacts(self, entries):
+        """Main-account email/phone must be unique across the database and the batch."""
+        main = [entry for entry in entries if entry["account_type"] == "public"]
+        phones = Counter(entry["user"].phone_normalized for entry in main if entry["user"].phone_normalized)
+        emails = Counter(entry["user"].email_normalized for entry in main if entry["user"].email_normalized)
+        taken_phones = set(User.objects.filter(
+            parent__isnull=True, phone_normalized__in=list(phones),
+        ).values_list("phone_normalized", flat=True)) if phones else set()
+        taken_emails = set(User.objects.filter(
+            parent__isnull=True, email_normalized__in=list(emails),
+        ).values_list("email_normalized", flat=True)) if emails else set()
+
+        rejected = {}
+        for entry in main:
+            user, errors = entry["user"], {}
+            if user.phone_normalized in taken_phones:
+                errors["user.phone"] = ["Phone number must be unique for main users (non-sub users)."]
+            elif user.phone_normalized and phones[user.phone_normalized] > 1:
+                errors["user.phone"] = ["Phone number appears more than once in this batch."]
+            if user.email_normalized in taken_emails:
+                errors["user.email"] = ["Email must be unique for main users (non-sub users)."]
+            elif user.email_normalized and emails[user.email_normalized] > 1:
+                errors["user.email"] = ["Email appears more than once in this batch."]
+            if errors:
+                rejected[entry["index"]] = errors
+
+        refs = Counter(entry["ref"] for entry in main if entry["ref"] is not None)
+        for entry in main:
+            if entry["ref"] is not None and refs[entry["ref"]] > 1:
+                rejected.setdefault(entry["index"], {})["ref"] = ["ref appears more than once in this batch."]
+        self._reject(entries, rejected)
+
+    def _check_addresses(self, entries):
+        """Every referenced division/zilla/... must exist; one query per level."""
+        existing = {
+            field: _existing_ids(model, [getattr(entry["address"], f"{field}_id") for entry in entries if entry["address"]])
+            for field, model in ADDRESS_MODELS.items()
+        }
+        rejected = {}
+        for entry in entries:
+            address = entry["address"]
+            if address is None:
+                continue
+            for field in ADDRESS_MODELS:
+                value = getattr(address, f"{field}_id")
+                if value is not None and value not in existing[field]:
+                    rejected.setdefault(entry["index"], {})[f"profile.address.{field}"] = [f"{field} {value} does not exist"]
+        self._reject(entries, rejected)
+
+    def _check_parents(self, entries, created_by_ref):
+        """Resolve each sub-account's parent: by id (NID must match) or by a public row of this batch."""
+        parent_ids = {_as_int(entry["parent"]) for entry in entries if entry["parent"]} - {None}
+        parents = {
+            parent.pk: parent
+            for parent in User.objects.filter(pk__in=parent_ids, parent__isnull=True).select_related("profile")
+        } if parent_ids else {}
+
+        rejected = {}
+        for entry in entries:
+            if entry["parent_ref"] is not None:
+                parent_entry = created_by_ref.get(entry["parent_ref"])
+                if parent_entry is None:
+                    rejected[entry["index"]] = {"user.parent_ref": ["No registered public row with this ref in the batch"]}
+                    continue
+                entry["user"].parent = parent_entry["user"]
+                if not entry["profile"].guardian_nid:
+                    entry["profile"].guardian_nid = parent_entry["profile"].nid
+                continue
+
+            parent = parents.get(_as_int(entry["parent"]))
+            profile = getattr(parent, "profile", None) if parent else None
+            if profile is None or not profile.nid or profile.nid != entry["guardian_nid"]:
+                rejected[entry["index"]] = {"user.parent": ["Parent account not found or NID mismatch."]}
+                continue
+            entry["user"].parent = parent
+        self._reject(entries, rejected)
+
+    def _check_usernames(self, entries):
+        """Sub-account usernames must be unique across the database and the batch."""
+        usernames = Counter(entry["user"].username for entry in entries)
+        taken = set(User.objects.filter(
+            username__in=list(usernames),
+        ).values_list("username", flat=True)) if usernames else set()
+
+        rejected = {}
+        for entry in entries:
+            username = entry["user"].username
+            if username in taken:
+                rejected[entry["index"]] = {"user.username": [f"Username {username} is already taken."]}
+            elif usernames[username] > 1:
+                rejected[entry["index"]] = {"user.username": [f"Username {username} appears more than once in this batch."]}
+        self._reject(entries, rejected)
+
+    # writing
+
+    def _insert(self, entries):
+        """Insert ``entries`` chunk by chunk; returns the ones that were created."""
+        created = []
+        size = settings.BULK_REGISTRATION_CHUNK_SIZE
+        for start in range(0, len(entries), size):
+            chunk = entries[start:start + size]
+            try:
+                self._insert_chunk(chunk)
+            except DatabaseError:
+                logger.warning("Bulk registration chunk failed, retrying row by row", exc_info=True)
+                for entry in chunk:
+                    self._reset(entry)
+                    try:
+                        self._insert_chunk([entry])
+                    except DatabaseError:
+                        logger.exception("Bulk registration row %s failed", entry["index"])
+                        self._reset(entry)
+                        self._fail(entry["index"], entry["ref"], {"row": ["Could not be saved; it conflicts with an existing record."]})
+                        continue
+                    created.append(entry)
+                continue
+            created.extend(chunk)
+        return created
+
+    def _reset(self, entry):
+        """Forget primary keys assigned by a rolled-back insert and remove its stored files."""
+        for key in ("user", "profile", "address"):
+            if entry[key] is not None:
+                entry[key].pk = None
+                entry[key]._state.adding = True
+        for field in IMAGE_FIELDS:
+            image = getattr(entry["profile"], field)
+            if image:
+                image.delete(save=False)
+
+    def _insert_chunk(self, chunk):
+        for entry in chunk:
+            for field, (archive, info) in entry["images"].items():
+                getattr(entry["profile"], field).save(
+                    os.path.basename(info.filename), ContentFile(archive.read(info)), save=False,
+                )
+
+        with transaction.atomic():
+            users = [entry["user"] for entry in chunk]
+            User.objects.bulk_create(users)
+            Address.objects.bulk_create([entry["address"] for entry in chunk if entry["address"] is not None])
+            for entry in chunk:
+                entry["profile"].user = entry["user"]
+                entry["profile"].address = entry["address"]
+            UserProfile.objects.bulk_create([entry["profile"] for entry in chunk])
+
+            _account_for_bulk_users(users, self.collector)
+
+        for entry in chunk:
+            self.results[entry["index"]] = {
+                "row": entry["index"], "ref": entry["ref"], "status": "created",
+                "user_id": entry["user"].pk, "profile_id": entry["profile"].pk,
+                "application_id": entry["user"].pk, "name": entry["user"].get_full_name(),
+            }
+            if entry["password"] is not None:
+                self.results[entry["index"]].update(
+                    username=entry["user"].username, temporary_password=entry["password"],
+                )
+
+
+def _account_for_bulk_users(users, collector):
+    """What the User post_save receivers would have done for each of ``users``."""
+    from apps.statistic_table.counters import invalidate_counters
+    from apps.statistic_table.models import DailyUserRollup, bump_rollup
+
+    per_day_and_role = Counter((timezone.localdate(user.created), user.role.name) for user in users)
+    for (day, role), count in per_day_and_role.items():
+        bump_rollup(DailyUserRollup, {"day": day, "role": role}, count=count)
+    if counters_enabled():
+        CollectorCounter.refresh([collector.pk])
+    invalidate_counters(system=True, applications=True, collector_ids=[collector.pk])
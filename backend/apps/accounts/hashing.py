@@ -0,0 +1,66 @@
+import contextlib
+import functools
+import logging
+import threading
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+logger = logging.getLogger(__name__)
+
+
+class VerificationBusy(Exception):
+    """Every verification slot stayed taken for ``PASSWORD_VERIFY_TIMEOUT`` seconds."""
+
+
+class PolicyPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2-SHA256 with a per-instance iteration budget (same encoded format)."""
+
+    def __init__(self, iterations):
+        self.iterations = iterations
+
+
+@functools.lru_cache(maxsize=None)
+def _hasher(iterations):
+    return PolicyPBKDF2PasswordHasher(iterations)
+
+
+def hasher_for_role(role_name):
+    """Preferred hasher for a role; unknown roles get Django's default budget."""
+    policy = getattr(settings, "PASSWORD_HASH_ITERATIONS_BY_ROLE", {})
+    return _hasher(policy.get(role_name, PBKDF2PasswordHasher.iterations))
+
+
+_verify_slots = threading.BoundedSemaphore(max(settings.PASSWORD_VERIFY_CONCURRENCY, 1))
+
+
+@contextlib.contextmanager
+def _verify_slot():
+    if not _verify_slots.acquire(timeout=settings.PASSWORD_VERIFY_TIMEOUT):
+        logger.warning("Password verification slots exhausted, rejecting login")
+        raise VerificationBusy()
+    try:
+        yield
+    finally:
+        _verify_slots.release()
+
+
+def verify_password(user, raw_password):
+    """
+    ``user.check_password`` bounded to ``PASSWORD_VERIFY_CONCURRENCY`` concurrent
+    hashes per process, so a login burst cannot pin every worker thread on PBKDF2.
+    Raises ``VerificationBusy`` when no slot frees up in time.
+    """
+    with _verify_slot():
+        return user.check_password(raw_password)
+
+
+def find_password_owner(users, raw_password):
+    """
+    First of ``users`` whose password is ``raw_password``, or None. All candidates
+    are checked under a single slot, so one login costs one slot however many
+    accounts share its contact.
+    """
+    with _verify_slot():
+        return next((user for user in users if user.check_password(raw_password)), None)
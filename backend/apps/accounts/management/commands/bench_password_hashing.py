@@ -0,0 +1,67 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.management.base import BaseCommand
+
+from apps.accounts.hashing import VerificationBusy, hasher_for_role, verify_password
+
+
+class _Credential:
+    """Stands in for a User so the gate can be measured without touching the database."""
+
+    def __init__(self, hasher, encoded):
+        self.hasher = hasher
+        self.encoded = encoded
+
+    def check_password(self, raw_password):
+        return self.hasher.verify(raw_password, self.encoded)
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure password verification throughput for every role in "
+        "PASSWORD_HASH_ITERATIONS_BY_ROLE: logins/sec on one core and through the "
+        "bounded verification gate under concurrent load."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--samples", type=int, default=20, help="verifications per policy and mode")
+        parser.add_argument("--threads", type=int, default=os.cpu_count() or 1, help="concurrent login threads")
+
+    def handle(self, *args, **options):
+        password = "bench-password"
+        policies = dict(settings.PASSWORD_HASH_ITERATIONS_BY_ROLE)
+        policies.setdefault("(default)", PBKDF2PasswordHasher.iterations)
+
+        self.stdout.write(
+            f"gate: {settings.PASSWORD_VERIFY_CONCURRENCY} slots, {options['threads']} threads\n"
+            f"{'role':<16}{'iterations':>12}{'ms/login':>10}{'logins/s/core':>15}{'logins/s gated':>16}{'busy':>6}"
+        )
+        for role, iterations in policies.items():
+            hasher = hasher_for_role(role)
+            credential = _Credential(hasher, hasher.encode(password, hasher.salt()))
+
+            started = time.perf_counter()
+            for _ in range(options["samples"]):
+                credential.check_password(password)
+            per_login = (time.perf_counter() - started) / options["samples"]
+
+            def login(_):
+                try:
+                    return verify_password(credential, password)
+                except VerificationBusy:
+                    return None
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options["threads"]) as pool:
+                results = list(pool.map(login, range(options["samples"])))
+            elapsed = time.perf_counter() - started
+            busy = results.count(None)
+
+            self.stdout.write(
+                f"{role:<16}{iterations:>12}{per_login * 1000:>10.1f}{1 / per_login:>15.1f}"
+                f"{(len(results) - busy) / elapsed:>16.1f}{busy:>6}"
+            )
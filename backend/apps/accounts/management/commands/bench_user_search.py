@@ -0,0 +1,96 @@
+import random
+import statistics
+import string
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from apps.accounts.models import Role, User
+from apps.accounts.search import search_users
+from core.utils.contact import normalize_email, normalize_phone
+
+
+SEED_PREFIX = "search-bench-"
+SYLLABLES = ("ra", "hi", "mo", "na", "sa", "ku", "de", "li", "ja", "bo", "ta", "ri", "fa", "zu", "me", "an")
+
+
+def _name(rng):
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed synthetic public users (bulk_create, no signals: run against a scratch "
+        "database) and time search_users for id, phone, email and name terms."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=0, help="synthetic users to add before benchmarking (e.g. 1000000)")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--runs", type=int, default=20, help="timed runs per term")
+        parser.add_argument("--page-size", type=int, default=10)
+        parser.add_argument("--explain", action="store_true", help="print the query plan of each term")
+
+    def handle(self, *args, **options):
+        if options["seed"]:
+            self._seed(options["seed"], options["batch_size"])
+
+        fields = ("id", "first_name", "email", "phone")
+        last = User.objects.order_by("-id").values_list("id", flat=True).first() or 0
+        sample = (
+            User.objects.filter(id__gte=random.randint(0, last)).order_by("id").values(*fields).first()
+            or User.objects.values(*fields).first()
+        )
+        if not sample:
+            self.stderr.write("No users to search; pass --seed N")
+            return
+
+        terms = {
+            "id": str(sample["id"]),
+            "phone": sample["phone"] or "01700000000",
+            "email": sample["email"] or "nobody@example.com",
+            "email fragment": (sample["email"] or "example").split("@")[0][2:8],
+            "name fragment": (sample["first_name"] or "ra")[1:5].lower(),
+        }
+
+        self.stdout.write(
+            f"{connection.vendor}, {User.objects.count():,} users\n"
+            f"{'term':<16}{'value':<28}{'p50 ms':>10}{'p95 ms':>10}{'hits':>8}"
+        )
+        for label, term in terms.items():
+            queryset = search_users(User.objects.all(), term)
+            if options["explain"]:
+                self.stdout.write(queryset[:options["page_size"]].explain())
+            latencies = []
+            for _ in range(options["runs"]):
+                started = time.perf_counter()
+                hits = len(list(queryset[:options["page_size"]].values_list("id", flat=True)))
+                latencies.append((time.perf_counter() - started) * 1000)
+            latencies.sort()
+            p95 = latencies[max(int(len(latencies) * 0.95) - 1, 0)]
+            self.stdout.write(
+                f"{label:<16}{term[:27]:<28}{statistics.median(latencies):>10.2f}{p95:>10.2f}{hits:>8}"
+            )
+
+    def _seed(self, total, batch_size):
+        rng = random.Random(total)
+        role = Role.objects.filter(name="public").first()
+        offset = User.objects.filter(username__startswith=SEED_PREFIX).count()
+        created = 0
+        started = time.perf_counter()
+        while created < total:
+            batch = []
+            for n in range(offset + created, offset + min(created + batch_size, total)):
+                email = f"{_name(rng).lower()}.{n}@{rng.choice(('gmail.com', 'yahoo.com', 'example.org'))}"
+                phone = "01" + "".join(rng.choice(string.digits) for _ in range(9))
+                batch.append(User(
+                    username=f"{SEED_PREFIX}{n}", first_name=_name(rng), last_name=_name(rng),
+                    email=email, phone=phone, role=role, password="!",
+                    email_normalized=normalize_email(email), phone_normalized=normalize_phone(phone),
+                ))
+            with transaction.atomic():
+                User.objects.bulk_create(batch)
+            created += len(batch)
+            self.stdout.write(f"seeded {created:,}/{total:,}", ending="\r")
+        self.stdout.write(f"seeded {created:,} users in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.3 on 2026-10-18 08:08
+
+import re
+
+import apps.accounts.models
+from django.db import migrations, models
+
+
+# Frozen copies of core.utils.contact.normalize_email / normalize_phone as of
+# this migration, so later changes there can't alter what the backfill wrote.
+def normalize_email(value):
+    if not value:
+        return None
+    value = value.strip().lower()
+    return value or None
+
+
+def normalize_phone(value):
+    if not value:
+        return None
+    digits = re.sub(r"\D", "", str(value))
+    if digits.startswith("880") and len(digits) == 13:
+        digits = "0" + digits[3:]
+    return digits if len(digits) == 11 else None
+
+
+def backfill_normalized_contacts(apps, schema_editor):
+    User = apps.get_model('accounts', 'User')
+    users = User.objects.only('id', 'email', 'phone')
+    batch = []
+    for user in users.iterator(chunk_size=2000):
+        user.email_normalized = normalize_email(user.email)
+        user.phone_normalized = normalize_phone(user.phone)
+        batch.append(user)
+        if len(batch) >= 2000:
+            User.objects.bulk_update(batch, ['email_normalized', 'phone_normalized'])
+            batch = []
+    if batch:
+        User.objects.bulk_update(batch, ['email_normalized', 'phone_normalized'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0019_alter_userprofile_user'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='user',
+            managers=[
+                ('objects', apps.accounts.models.UserManager()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='email_normalized',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=254, null=True),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='phone_normalized',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=11, null=True),
+        ),
+        migrations.RunPython(backfill_normalized_contacts, migrations.RunPython.noop),
+    ]
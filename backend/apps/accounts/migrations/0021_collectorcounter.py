@@ -0,0 +1,59 @@
+# Generated by Django 5.2.3 on 2026-10-18 08:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_collector_counters(apps, schema_editor):
+    User = apps.get_model('accounts', 'User')
+    CollectorCounter = apps.get_model('accounts', 'CollectorCounter')
+    rows = (
+        User.objects.filter(addBy__isnull=False)
+        .values('addBy_id')
+        .annotate(
+            total=Count('id'),
+            paid=Count('id', filter=Q(payment_status='Paid')),
+            pending=Count('id', filter=~Q(payment_status='Paid')),
+            verified=Count('id', filter=Q(email_verified=True) | Q(phone_verified=True)),
+        )
+        .order_by()
+    )
+    CollectorCounter.objects.bulk_create(
+        (
+            CollectorCounter(
+                collector_id=row['addBy_id'], total=row['total'], paid=row['paid'],
+                pending=row['pending'], verified=row['verified'],
+            )
+            for row in rows.iterator(chunk_size=2000)
+        ),
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0020_user_contact_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CollectorCounter',
+            fields=[
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('collector', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='registration_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('paid', models.PositiveIntegerField(default=0)),
+                ('pending', models.PositiveIntegerField(default=0)),
+                ('verified', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-created'],
+                'abstract': False,
+            },
+        ),
+        migrations.RunPython(backfill_collector_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.3 on 2026-10-18 08:35
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0023_client_uuid'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='user',
+            name='email_code',
+        ),
+        migrations.RemoveField(
+            model_name='user',
+            name='phone_code',
+        ),
+    ]
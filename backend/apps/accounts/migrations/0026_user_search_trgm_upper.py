@@ -0,0 +1,55 @@
+# Generated by Django 5.2.3 on 2026-10-18 11:20
+
+from django.db import migrations
+
+
+SEARCH_FIELDS = ('first_name', 'last_name', 'email', 'phone')
+
+
+def _old_index_name(field):
+    return f'accounts_user_{field}_trgm'
+
+
+def _index_name(field):
+    return f'accounts_user_{field}_upper_trgm'
+
+
+def create_upper_trigram_indexes(apps, schema_editor):
+    # __icontains compiles to UPPER("col"::text) LIKE UPPER(%s) on PostgreSQL, so
+    # the index has to be on that expression for the planner to use it.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    table = schema_editor.quote_name(apps.get_model('accounts', 'User')._meta.db_table)
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for field in SEARCH_FIELDS:
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {_index_name(field)} '
+            f'ON {table} USING gin ((UPPER({schema_editor.quote_name(field)}::text)) gin_trgm_ops)'
+        )
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {_old_index_name(field)}')
+
+
+def restore_raw_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    table = schema_editor.quote_name(apps.get_model('accounts', 'User')._meta.db_table)
+    for field in SEARCH_FIELDS:
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {_old_index_name(field)} '
+            f'ON {table} USING gin ({schema_editor.quote_name(field)} gin_trgm_ops)'
+        )
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {_index_name(field)}')
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('accounts', '0025_verificationcode'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_upper_trigram_indexes, restore_raw_trigram_indexes),
+    ]
@@ -1,9 +1,17 @@
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.hashers import check_password, make_password
+from django.contrib.auth.models import AbstractUser, UserManager as DjangoUserManager
 from core.utils.modeler import BaseModel
-from django.db import models
-from django.db.models import Q
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F, Q
+from django.db.models.base import DEFERRED
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
 from apps.address.models import Address
 from core.validators import phone_validator
+from core.utils.contact import normalize_contact, normalize_email, normalize_phone
+from apps.accounts.hashing import hasher_for_role
 
 class Role(BaseModel):
     name = models.CharField(max_length=50, unique=True)
@@ -13,6 +21,31 @@ class Role(BaseModel):
         return self.label
 
 
+class UserQuerySet(models.QuerySet):
+    def by_contact(self, contact):
+        """Users whose own email/phone matches ``contact`` (one index probe)."""
+        kind, value = normalize_contact(contact)
+        if kind is None:
+            return self.none()
+        return self.filter(**{f"{kind}_normalized": value})
+
+    def by_parent_contact(self, contact):
+        """Sub-users whose parent account's email/phone matches ``contact``."""
+        kind, value = normalize_contact(contact)
+        if kind is None:
+            return self.none()
+        return self.filter(**{f"parent__{kind}_normalized": value})
+
+
+class UserManager(DjangoUserManager.from_queryset(UserQuerySet)):
+    def _create_user_object(self, username, email, password, **extra_fields):
+        # hash once, with the role's policy instead of the global default
+        user = super()._create_user_object(username, email, None, **extra_fields)
+        if password is not None:
+            user.set_password(password)
+        return user
+
+
 class User(AbstractUser, BaseModel):
     phone = models.CharField(
         max_length=11,
@@ -61,9 +94,6 @@ class User(AbstractUser, BaseModel):
     email_verified = models.BooleanField(default=False)
     phone_verified = models.BooleanField(default=False)
 
-    email_code = models.CharField(max_length=6, null=True, blank=True)
-    phone_code = models.CharField(max_length=6, null=True, blank=True)
-
     payment_status = models.CharField(max_length=10, choices=[('Paid', 'Paid'), ('Pending', 'Pending'), ('Failed', 'Failed')], default='Pending')
     approved = models.BooleanField(default=False)
     approved_by = models.ForeignKey(
@@ -86,6 +116,15 @@ class User(AbstractUser, BaseModel):
         null=True
     )
 
+    # Lower-cased email and canonical 11-digit phone, kept in sync on save();
+    # every contact based lookup goes through these indexed columns.
+    email_normalized = models.CharField(max_length=254, null=True, blank=True, db_index=True, editable=False)
+    phone_normalized = models.CharField(max_length=11, null=True, blank=True, db_index=True, editable=False)
+    # set when the account was registered by an offline client (see apps.accounts.sync)
+    client_uuid = models.UUIDField(null=True, blank=True, unique=True, editable=False)
+
+    objects = UserManager()
+
     class Meta:
         constraints = [
             models.UniqueConstraint(
@@ -99,6 +138,45 @@ class User(AbstractUser, BaseModel):
                 name='unique_main_phone'
             ),
         ]
+        indexes = [
+            # keyset pagination of the admin user table
+            models.Index(fields=['-created', '-id'], name='user_created_id_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.email_normalized = normalize_email(self.email)
+        self.phone_normalized = normalize_phone(self.phone)
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if "email" in update_fields:
+                update_fields.add("email_normalized")
+            if "phone" in update_fields:
+                update_fields.add("phone_normalized")
+            kwargs["update_fields"] = update_fields
+        return super().save(*args, **kwargs)
+
+    def password_hasher(self):
+        """Preferred hasher under ``PASSWORD_HASH_ITERATIONS_BY_ROLE``."""
+        return hasher_for_role(self.role.name if self.role_id else None)
+
+    def set_password(self, raw_password):
+        self.password = make_password(raw_password, hasher=self.password_hasher())
+        self._password = raw_password
+
+    def check_password(self, raw_password):
+        """
+        Verify against whatever hasher produced the stored hash and re-encode it
+        when it no longer matches the role's policy.
+        """
+        def setter(raw_password):
+            self.set_password(raw_password)
+            # Password hash upgrades shouldn't be considered password changes.
+            self._password = None
+            self.save(update_fields=["password"])
+
+        return check_password(raw_password, self.password, setter, preferred=self.password_hasher())
 
     def __str__(self):
         return self.username or self.email or self.phone or f"User-{self.pk}"
@@ -147,6 +225,7 @@ class UserProfile(BaseModel):
 
     photo = models.ImageField(upload_to='photos/', blank=True, null=True)
     signature = models.ImageField(upload_to='signatures/', blank=True, null=True)
+    client_uuid = models.UUIDField(null=True, blank=True, unique=True, editable=False)
 
     def __str__(self):
         return f"{self.name_en} / {self.name_bn}"
@@ -172,4 +251,197 @@ class UserProfile(BaseModel):
 
     @property
     def division(self):
-        return self.zilla.division if self.zilla else None
\ No newline at end of file
+        return self.zilla.division if self.zilla else None
+
+
+class CollectorCounter(BaseModel):
+    """Registration counters of a data collector, kept current from the User signals below."""
+    collector = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name='registration_counter'
+    )
+    total = models.PositiveIntegerField(default=0)
+    paid = models.PositiveIntegerField(default=0)
+    pending = models.PositiveIntegerField(default=0)
+    verified = models.PositiveIntegerField(default=0)
+
+    AGGREGATES = {
+        "total": Count('id'),
+        "paid": Count('id', filter=Q(payment_status="Paid")),
+        "pending": Count('id', filter=~Q(payment_status="Paid")),
+        "verified": Count('id', filter=Q(email_verified=True) | Q(phone_verified=True)),
+    }
+
+    def __str__(self):
+        return f"{self.collector_id}: {self.total} registered"
+
+    @classmethod
+    def refresh(cls, collector_ids):
+        """
+        Recount the registrations of every collector in ``collector_ids``.
+
+        The counter row is locked before counting, so of two concurrent writers
+        the second counts after the first has committed and neither overwrites
+        the other with a stale total.
+        """
+        for collector_id in set(collector_ids) - {None, DEFERRED}:
+            if not User.objects.filter(pk=collector_id).exists():
+                continue
+            with transaction.atomic():
+                cls.objects.bulk_create([cls(collector_id=collector_id)], ignore_conflicts=True)
+                cls.objects.select_for_update().filter(collector_id=collector_id).exists()
+                counts = User.objects.filter(addBy_id=collector_id).aggregate(**cls.AGGREGATES)
+                cls.objects.filter(collector_id=collector_id).update(updated=timezone.now(), **counts)
+
+    @staticmethod
+    def _contribution(state):
+        """What one user in counted ``state`` adds to its collector's counters."""
+        _add_by_id, payment_status, email_verified, phone_verified = state
+        return {
+            "total": 1,
+            "paid": int(payment_status == "Paid"),
+            "pending": int(payment_status != "Paid"),
+            "verified": int(bool(email_verified or phone_verified)),
+        }
+
+    @classmethod
+    def apply_change(cls, old_state, new_state):
+        """
+        Move one user's contribution from ``old_state`` to ``new_state`` (either
+        None for an insert/delete) with signed ``F()`` increments, which the
+        database applies atomically however many writers race. Collectors whose
+        state is only partly loaded (``only()``/``defer()``) are recounted instead.
+        """
+        deltas = {}
+        for state, sign in ((old_state, -1), (new_state, 1)):
+            if state is None or state[0] is None:
+                continue
+            if DEFERRED in state:
+                cls.refresh([state[0]])
+                continue
+            delta = deltas.setdefault(state[0], dict.fromkeys(cls.AGGREGATES, 0))
+            for name, value in cls._contribution(state).items():
+                delta[name] += sign * value
+        for collector_id, delta in deltas.items():
+            changes = {name: F(name) + value for name, value in delta.items() if value}
+            if not changes:
+                continue
+            if not cls.objects.filter(collector_id=collector_id).update(updated=timezone.now(), **changes):
+                # no counter yet: start it from a full count
+                cls.refresh([collector_id])
+
+    @classmethod
+    def statistics(cls, collector):
+        """``{"total", "paid", "pending", "verified"}`` for one collector in a single query."""
+        if counters_enabled():
+            counts = cls.objects.filter(collector=collector).values(*cls.AGGREGATES).first()
+            return counts or dict.fromkeys(cls.AGGREGATES, 0)
+        return User.objects.filter(addBy=collector).aggregate(**cls.AGGREGATES)
+
+    @classmethod
+    async def astatistics(cls, collector):
+        if counters_enabled():
+            counts = await cls.objects.filter(collector=collector).values(*cls.AGGREGATES).afirst()
+            return counts or dict.fromkeys(cls.AGGREGATES, 0)
+        return await User.objects.filter(addBy=collector).aaggregate(**cls.AGGREGATES)
+
+
+def counters_enabled():
+    return getattr(settings, "COLLECTOR_COUNTERS_ENABLED", True)
+
+
+_COUNTED_FIELDS = ("addBy_id", "payment_status", "email_verified", "phone_verified")
+_COUNTED_NAMES = {"addBy", *_COUNTED_FIELDS}
+
+
+def _stored_state(pk, lock):
+    """Counted fields as currently stored; locked for the transaction when ``lock``."""
+    rows = User.objects.filter(pk=pk)
+    if lock and transaction.get_connection().in_atomic_block:
+        rows = rows.select_for_update()
+    return rows.values_list(*_COUNTED_FIELDS).first()
+
+
+@receiver(pre_save, sender=User)
+def remember_counted_state(sender, instance, raw=False, update_fields=None, **kwargs):
+    # read from the row rather than the instance, which may be stale; the lock
+    # serializes concurrent saves of the same user so each sees the other's result
+    instance._counted_before = None
+    if raw or not counters_enabled() or instance.pk is None or instance._state.adding:
+        return
+    if update_fields is not None and not _COUNTED_NAMES & set(update_fields):
+        return
+    instance._counted_before = _stored_state(instance.pk, lock=True)
+
+
+@receiver(post_save, sender=User)
+def refresh_collector_counter_on_save(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    before, instance._counted_before = getattr(instance, "_counted_before", None), None
+    if raw or not counters_enabled():
+        return
+    if created:
+        CollectorCounter.apply_change(None, tuple(getattr(instance, field) for field in _COUNTED_FIELDS))
+        return
+    if before is None:
+        return
+    written = update_fields
+    after = tuple(
+        # only loaded fields listed in update_fields were written; the rest kept their stored value
+        old if instance.__dict__.get(field, DEFERRED) is DEFERRED
+        or (written is not None and field not in written and field.removesuffix("_id") not in written)
+        else instance.__dict__[field]
+        for field, old in zip(_COUNTED_FIELDS, before)
+    )
+    if after != before:
+        CollectorCounter.apply_change(before, after)
+
+
+@receiver(pre_delete, sender=User)
+def remember_deleted_collector(sender, instance, origin=None, **kwargs):
+    instance._counted_before = None
+    if not counters_enabled():
+        return
+    if origin is instance:
+        # a direct delete() may hold a stale instance; cascades load fresh rows
+        instance._counted_before = _stored_state(instance.pk, lock=False)
+    else:
+        instance._counted_before = tuple(instance.__dict__.get(field, DEFERRED) for field in _COUNTED_FIELDS)
+        if DEFERRED in instance._counted_before:
+            instance._counted_before = _stored_state(instance.pk, lock=False)
+
+
+@receiver(post_delete, sender=User)
+def refresh_collector_counter_on_delete(sender, instance, origin=None, **kwargs):
+    before = getattr(instance, "_counted_before", None)
+    if not counters_enabled() or before is None:
+        return
+    # deleting a collector cascades to their registrations; no counter left to keep
+    if isinstance(origin, User) and origin.pk == before[0]:
+        return
+    CollectorCounter.apply_change(before, None)
+
+
+class VerificationCode(BaseModel):
+    """
+    The outstanding verification code of one user for one channel (see
+    ``apps.accounts.otp``). Kept apart from ``User`` so issuing and checking
+    codes never writes to the user row; only a hash of the code is stored.
+    """
+    CHANNELS = (
+        ('email', 'Email'),
+        ('phone', 'Phone'),
+    )
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='verification_codes')
+    channel = models.CharField(max_length=5, choices=CHANNELS)
+    code_hash = models.CharField(max_length=64)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    expires_at = models.DateTimeField()
+    resend_at = models.DateTimeField()
+
+    class Meta(BaseModel.Meta):
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'channel'], name='verification_code_user_channel'),
+        ]
+
+    def __str__(self):
+        return f"{self.channel} code for {self.user_id}"
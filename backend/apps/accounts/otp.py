@@ -0,0 +1,153 @@
+"""
+One-time codes for contact verification, kept off the ``accounts_user`` row.
+
+``issue(user_id, channel)`` returns a fresh code and stores only its keyed
+hash, valid for ``OTP_TTL`` seconds; a new code for the same user and channel
+replaces the old one but may not be issued again for ``OTP_RESEND_COOLDOWN``
+seconds. ``verify()`` allows ``OTP_MAX_ATTEMPTS`` guesses per code and
+consumes the code on success.
+
+With a shared cache (``REDIS_URL``) codes live there and expire on their own:
+the cooldown is an ``add()``, guesses an ``incr()`` and consumption a
+``delete()``, all atomic on the server. With the process-local fallback the
+codes go to the ``VerificationCode`` table instead, where guesses are counted
+with a conditional ``UPDATE``. Either way the limits hold across every worker
+and process.
+"""
+import math
+import secrets
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare, salted_hmac
+
+from apps.permissions.cache import PROCESS_LOCAL_BACKENDS
+
+from .models import VerificationCode
+
+
+CHANNELS = ('email', 'phone')
+
+
+class OTPCooldown(Exception):
+    """A code was issued too recently; ``retry_after`` is in seconds."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Try again in {retry_after} seconds")
+        self.retry_after = retry_after
+
+
+def _check_channel(channel):
+    if channel not in CHANNELS:
+        raise ValueError(f"Unknown OTP channel {channel!r}")
+
+
+def _digest(user_id, channel, code):
+    return salted_hmac("apps.accounts.otp", f"{user_id}:{channel}:{code}").hexdigest()
+
+
+class DatabaseCodes:
+    """Codes in ``VerificationCode``, one row per user and channel."""
+
+    def issue(self, user_id, channel, code_hash):
+        now = timezone.now()
+        values = {
+            'code_hash': code_hash,
+            'attempts': 0,
+            'expires_at': now + timedelta(seconds=settings.OTP_TTL),
+            'resend_at': now + timedelta(seconds=settings.OTP_RESEND_COOLDOWN),
+        }
+        with transaction.atomic():
+            current = VerificationCode.objects.select_for_update().filter(user_id=user_id, channel=channel).first()
+            if current is None:
+                try:
+                    with transaction.atomic():
+                        VerificationCode.objects.create(user_id=user_id, channel=channel, **values)
+                except IntegrityError:
+                    # a concurrent request issued one first
+                    raise OTPCooldown(settings.OTP_RESEND_COOLDOWN)
+                return
+            if current.resend_at > now:
+                raise OTPCooldown(max(math.ceil((current.resend_at - now).total_seconds()), 1))
+            VerificationCode.objects.filter(pk=current.pk).update(updated=now, **values)
+
+    def discard(self, user_id, channel):
+        VerificationCode.objects.filter(user_id=user_id, channel=channel).delete()
+
+    def verify(self, user_id, channel, code_hash):
+        outstanding = VerificationCode.objects.filter(user_id=user_id, channel=channel, expires_at__gt=timezone.now())
+        # count the guess first; a code that is expired or out of attempts matches no row
+        if not outstanding.filter(attempts__lt=settings.OTP_MAX_ATTEMPTS).update(attempts=F('attempts') + 1):
+            return False
+        stored = outstanding.values_list('code_hash', flat=True).first()
+        if stored is None or not constant_time_compare(stored, code_hash):
+            return False
+        # deleting is what makes the code single-use under concurrent guesses
+        return outstanding.filter(code_hash=stored).delete()[0] > 0
+
+
+class CacheCodes:
+    """Codes in the default cache under ``otp:<user>:<channel>:{code,attempts,resend}``."""
+
+    def _keys(self, user_id, channel):
+        prefix = f"otp:{user_id}:{channel}"
+        return f"{prefix}:code", f"{prefix}:attempts", f"{prefix}:resend"
+
+    def issue(self, user_id, channel, code_hash):
+        code_key, attempts_key, resend_key = self._keys(user_id, channel)
+        resend_at = time.time() + settings.OTP_RESEND_COOLDOWN
+        if not cache.add(resend_key, resend_at, timeout=settings.OTP_RESEND_COOLDOWN):
+            retry_after = (cache.get(resend_key) or resend_at) - time.time()
+            raise OTPCooldown(max(math.ceil(retry_after), 1))
+        cache.set_many({code_key: code_hash, attempts_key: 0}, timeout=settings.OTP_TTL)
+
+    def discard(self, user_id, channel):
+        cache.delete_many(self._keys(user_id, channel))
+
+    def verify(self, user_id, channel, code_hash):
+        code_key, attempts_key, _resend_key = self._keys(user_id, channel)
+        # count the guess first; an expired or consumed code has no counter left
+        try:
+            attempts = cache.incr(attempts_key)
+        except ValueError:
+            return False
+        if attempts > settings.OTP_MAX_ATTEMPTS:
+            return False
+        stored = cache.get(code_key)
+        if stored is None or not constant_time_compare(stored, code_hash):
+            return False
+        # only one of two concurrent correct guesses gets to delete it
+        if not cache.delete(code_key):
+            return False
+        cache.delete(attempts_key)
+        return True
+
+
+def _codes():
+    if settings.CACHES["default"]["BACKEND"] in PROCESS_LOCAL_BACKENDS:
+        return DatabaseCodes()
+    return CacheCodes()
+
+
+def issue(user_id, channel):
+    """A new code for ``user_id`` on ``channel``; raises ``OTPCooldown`` when resent too soon."""
+    _check_channel(channel)
+    code = f"{secrets.randbelow(10 ** settings.OTP_LENGTH):0{settings.OTP_LENGTH}d}"
+    _codes().issue(user_id, channel, _digest(user_id, channel, code))
+    return code
+
+
+def discard(user_id, channel):
+    """Forget the outstanding code (and its cooldown), e.g. when sending it failed."""
+    _codes().discard(user_id, channel)
+
+
+def verify(user_id, channel, code):
+    """True, consuming the code, when ``code`` is the outstanding one and attempts remain."""
+    _check_channel(channel)
+    return _codes().verify(user_id, channel, _digest(user_id, channel, str(code).strip()))
@@ -0,0 +1,59 @@
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.functions import Greatest
+
+from core.utils.contact import normalize_contact
+
+
+# Columns covered by the pg_trgm GIN indexes on UPPER(col::text), the expression
+# __icontains compiles to on PostgreSQL (migration 0026_user_search_trgm_upper)
+SEARCH_FIELDS = ("first_name", "last_name", "email", "phone")
+
+
+def _contains(term):
+    query = Q()
+    for field in SEARCH_FIELDS:
+        query |= Q(**{f"{field}__icontains": term})
+    return query
+
+
+def _trigram_relevance(term):
+    from django.contrib.postgres.search import TrigramSimilarity
+
+    return Greatest(*(TrigramSimilarity(field, term) for field in SEARCH_FIELDS))
+
+
+def _fallback_relevance(term):
+    """Exact > prefix > substring, for databases without pg_trgm."""
+    whens = []
+    for lookup, score in (("iexact", 3), ("istartswith", 2)):
+        for field in SEARCH_FIELDS:
+            whens.append(When(**{f"{field}__{lookup}": term, "then": Value(score)}))
+    return Case(*whens, default=Value(1), output_field=IntegerField())
+
+
+def search_users(queryset, term):
+    """
+    Filter ``queryset`` to users matching ``term``, best matches first.
+
+    Numeric ids and full phone numbers / emails are exact index probes; anything
+    else is a substring match over name, email and phone, served by the trigram
+    GIN indexes on PostgreSQL and ranked by similarity (prefix/exact ranking
+    elsewhere).
+    """
+    term = (term or "").strip()
+    if not term:
+        return queryset
+
+    kind, _ = normalize_contact(term)
+    if kind == "phone":
+        return queryset.by_contact(term)
+    if kind == "email":
+        matches = queryset.by_contact(term)
+        if matches.exists():
+            return matches
+    if term.isdigit():
+        return queryset.filter(pk=int(term))
+
+    relevance = _trigram_relevance(term) if connection.vendor == "postgresql" else _fallback_relevance(term)
+    return queryset.filter(_contains(term)).annotate(relevance=relevance).order_by("-relevance", "-id")
@@ -1,11 +1,12 @@
 # # accounts/serializers.py
 from rest_framework import serializers
 from .models import User, Role, UserProfile
+from . import otp as otp_service
 from apps.permissions.models import PagePermission
+from apps.permissions.cache import get_role_permissions
 from apps.address.models import Address
 from core.constants import UserRole
 from datetime import datetime
-from django.db.models import Q
 from apps.payment.models import PaymentFee
 
 class PagePermissionSerializer(serializers.ModelSerializer):
@@ -78,10 +79,7 @@ class UserSerializer(serializers.ModelSerializer):
         return f'{obj.addBy.first_name} {obj.addBy.last_name}'
     
     def get_page_permissions(self, obj):
-        if not obj.role:
-            return []
-        permissions = PagePermission.objects.filter(role=obj.role)
-        return PagePermissionSerializer(permissions, many=True).data
+        return get_role_permissions(obj.role_id)
 
     def get_child_contact(self, obj):
 
@@ -112,7 +110,7 @@ class UserSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError({
                     "password": "Passwords do not match."
                 })
-            if not parent and phone and User.objects.filter(phone=phone, parent__isnull=True).exists():
+            if not parent and phone and User.objects.by_contact(phone).filter(parent__isnull=True).exists():
                 raise serializers.ValidationError({"phone": "Phone number must be unique for main users (non-sub users)."})
 
             if not phone and not email:
@@ -306,7 +304,6 @@ class VerifyOTPSerializer(serializers.Serializer):
                 {
                     'contact_type': 'email',
                     'contact_field': user.email,
-                    'code_field': user.email_code,
                     'verified_field': 'email_verified',
                     'error_msg': 'Invalid OTP for email.',
                     'verified_contact_display': 'Email',
@@ -315,25 +312,21 @@ class VerifyOTPSerializer(serializers.Serializer):
                 {
                     'contact_type': 'phone',
                     'contact_field': user.phone,
-                    'code_field': user.phone_code,
                     'verified_field': 'phone_verified',
                     'error_msg': 'Invalid OTP for phone.',
                     'verified_contact_display': 'Phone Number',
                     'verification_method_display': 'Phone Number'
                 }
             ]
+            if contact_type:
+                verification_attempts = [attempt for attempt in verification_attempts if attempt['contact_type'] == contact_type]
 
             for attempt in verification_attempts:
                 if attempt['contact_field'] and not getattr(user, attempt['verified_field']):
-                    if attempt['code_field'] == otp:
-                        # Set verified status
+                    if otp_service.verify(user.id, attempt['contact_type'], otp):
+                        # Set verified status; the code lives in the cache and is already consumed
                         setattr(user, attempt['verified_field'], True)
-                        # Explicitly set code to None
-                        if attempt['contact_type'] == 'email':
-                            user.email_code = None
-                        elif attempt['contact_type'] == 'phone':
-                            user.phone_code = None
-                        user.save() # Save the user object with updated status and cleared code
+                        user.save(update_fields=[attempt['verified_field']])
                         return self._get_verification_success_data(
                             user,
                             attempt['verified_contact_display'],
@@ -363,23 +356,23 @@ class VerifyOTPSerializer(serializers.Serializer):
             contact_type = data.get("contact_type")
             match contact_type:
                 case 'email':
-                    if user.email_code == otp:
-                        user.email_code = None
+                    if otp_service.verify(user.id, 'email', otp):
                         user.email_verified = True
                         user.sub_account_status = "Active"
-                        user.save()
+                        user.save(update_fields=['email_verified', 'sub_account_status'])
                         return self._get_verification_success_data(user, "Email", "Email")
                     else:
                         raise serializers.ValidationError("Invalid OTP for email.")
                 case 'phone':
-                    if user.phone_code == otp:
-                        user.phone_code = None
+                    if otp_service.verify(user.id, 'phone', otp):
                         user.phone_verified = True
                         user.sub_account_status = "Active"
-                        user.save()
+                        user.save(update_fields=['phone_verified', 'sub_account_status'])
                         return self._get_verification_success_data(user, "Phone Number", "Phone Number")
                     else:
                         raise serializers.ValidationError("Invalid OTP for phone.")
+                case _:
+                    raise serializers.ValidationError({"contact_type": "Must be email or phone."})
 
     def _get_verification_success_data(self, user, verified_contact, verification_method):
         fee = None
@@ -408,7 +401,7 @@ class VerifyOTPSerializer(serializers.Serializer):
 
 class SendVerificationSerializer(serializers.Serializer):
     contact = serializers.CharField()
-    contact_type = serializers.CharField()
+    contact_type = serializers.ChoiceField(choices=['email', 'phone'])
     user_id = serializers.IntegerField()
     account_type = serializers.CharField(allow_null=True, required=False)
 
@@ -422,10 +415,7 @@ class SendVerificationSerializer(serializers.Serializer):
             if account_type == "sub-account":
                 user = User.objects.get(id=user_id)
             else:
-                user = User.objects.get(
-                    Q(id=user_id, email=contact) |
-                    Q(id=user_id, phone=contact)
-                )
+                user = User.objects.by_contact(contact).get(id=user_id)
         except User.DoesNotExist:
             raise serializers.ValidationError("User not found.")
 
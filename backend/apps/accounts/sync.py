@@ -0,0 +1,241 @@
+"""
+Idempotent offline sync for data collectors.
+
+A collector's device keys every household it registers with a UUID it
+generates itself and replays the same records until the server acknowledges
+them. A record is a bulk-registration row (see ``apps.accounts.bulk``) with a
+``uuid`` instead of a ``ref``; sub-accounts name their parent with
+``user.parent_uuid``. Applying a batch is an upsert per record:
+
+* unknown uuid: inserted through the bulk path, stamping ``client_uuid`` on the
+  user, its profile and its address (the latter two derived from the user's);
+* known uuid: the sent fields are written over the stored ones, and nothing is
+  written when they already match, so a replayed batch is a no-op.
+
+Lookups are by the indexed ``client_uuid``, one query for the whole batch, and
+the address ids of updated records are checked with one query per level, so a
+sync costs as much as the records it carries.
+"""
+import logging
+import uuid
+
+from django.db import DatabaseError, transaction
+
+from apps.address.models import Address
+
+from .bulk import (
+    ADDRESS_MODELS, PROFILE_FIELDS, USER_FIELDS, BulkRegistration, _as_int, _clean_instance, _existing_ids,
+)
+from .models import User
+
+
+logger = logging.getLogger(__name__)
+
+
+def derived_uuid(user_uuid, kind):
+    """Stable key of the profile/address that belongs to the user keyed ``user_uuid``."""
+    return uuid.uuid5(user_uuid, kind)
+
+
+def _parse_uuid(value):
+    try:
+        return uuid.UUID(str(value))
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+class SyncRegistration(BulkRegistration):
+    """Bulk insert of never-seen records, keyed by their client UUIDs."""
+
+    def _prepare(self, entry):
+        key = uuid.UUID(entry["ref"])
+        entry["user"].client_uuid = key
+        entry["profile"].client_uuid = derived_uuid(key, "profile")
+        if entry["address"] is not None:
+            entry["address"].client_uuid = derived_uuid(key, "address")
+        return entry
+
+
+class OfflineSync:
+    """Apply one batch of client records for ``collector``; ``run()`` returns the per-record report."""
+
+    def __init__(self, records, collector, photos=None):
+        self.records = records
+        self.collector = collector
+        self.photos = photos
+        self.results = [None] * len(records)
+
+    def _fail(self, index, key, errors):
+        self.results[index] = {"row": index, "uuid": key, "status": "error", "errors": errors}
+
+    def run(self):
+        keyed = {}
+        for index, record in enumerate(self.records):
+            key = _parse_uuid(record.get("uuid")) if isinstance(record, dict) else None
+            if key is None:
+                self._fail(index, None, {"uuid": ["A client-generated UUID is required"]})
+            elif key in keyed:
+                self._fail(index, str(key), {"uuid": ["uuid appears more than once in this batch."]})
+            else:
+                keyed[key] = index
+
+        parent_keys = {
+            _parse_uuid((self.records[index].get("user") or {}).get("parent_uuid")) for index in keyed.values()
+        } - {None}
+        known = {
+            user.client_uuid: user
+            for user in User.objects.filter(client_uuid__in=set(keyed) | parent_keys).select_related("profile__address")
+        }
+
+        self.existing_addresses = self._existing_addresses(
+            self.records[index] for key, index in keyed.items() if key in known
+        )
+
+        new_rows, new_indexes = [], []
+        for key, index in keyed.items():
+            record = self.records[index]
+            user = known.get(key)
+            if user is None:
+                row = self._as_bulk_row(index, key, record, keyed, known)
+                if row is not None:
+                    new_rows.append(row)
+                    new_indexes.append(index)
+            elif user.addBy_id != self.collector.pk:
+                self._fail(index, str(key), {"uuid": ["Registered by another collector"]})
+            else:
+                self._update(index, key, user, record)
+
+        if new_rows:
+            self._insert(new_rows, new_indexes)
+        return self.results
+
+    # new records
+
+    def _as_bulk_row(self, index, key, record, keyed, known):
+        row = {field: value for field, value in record.items() if field != "uuid"}
+        row["ref"] = str(key)
+        user_data = dict(row.get("user") or {})
+        if "parent_uuid" in user_data:
+            parent_key = _parse_uuid(user_data.pop("parent_uuid"))
+            parent = known.get(parent_key)
+            if parent_key in keyed and parent is None:
+                user_data["parent_ref"] = str(parent_key)
+            elif parent is not None and parent.addBy_id == self.collector.pk:
+                user_data["parent"] = parent.pk
+                profile = row["profile"] = dict(row.get("profile") or {})
+                parent_profile = getattr(parent, "profile", None)
+                profile.setdefault("guardian_nid", parent_profile.nid if parent_profile else None)
+            else:
+                self._fail(index, str(key), {"user.parent_uuid": ["Unknown parent"]})
+                return None
+        row["user"] = user_data
+        return row
+
+    def _insert(self, rows, indexes):
+        results = SyncRegistration(rows, self.collector, self.photos).run()
+        retry = []
+        for index, result in zip(indexes, results):
+            result = {"row": index, "uuid": result["ref"], **{k: v for k, v in result.items() if k not in ("row", "ref")}}
+            self.results[index] = result
+            if result["status"] == "error" and "row" in result["errors"]:
+                retry.append(index)
+        if not retry:
+            return
+        # a concurrent replay of the same batch may have inserted these first
+        keys = {_parse_uuid(self.results[index]["uuid"]): index for index in retry}
+        for user in User.objects.filter(client_uuid__in=keys, addBy=self.collector).select_related("profile"):
+            index = keys[user.client_uuid]
+            self.results[index] = self._result(index, user, "unchanged")
+
+    # known records
+
+    def _existing_addresses(self, records):
+        """The address ids sent by ``records`` that exist, per level; one query per level."""
+        sent = {field: [] for field in ADDRESS_MODELS}
+        for record in records:
+            address_data = (record.get("profile") or {}).get("address") or {}
+            for field, value in address_data.items():
+                if field in sent:
+                    sent[field].append(_as_int(value))
+        return {field: _existing_ids(ADDRESS_MODELS[field], ids) for field, ids in sent.items()}
+
+    def _result(self, index, user, state):
+        profile = getattr(user, "profile", None)
+        return {
+            "row": index, "uuid": str(user.client_uuid), "status": state,
+            "user_id": user.pk, "profile_id": profile.pk if profile else None,
+            "application_id": user.pk, "name": user.get_full_name(),
+        }
+
+    def _update(self, index, key, user, record):
+        user_data = record.get("user") or {}
+        profile_data = dict(record.get("profile") or {})
+        address_data = profile_data.pop("address", None) or {}
+        profile = getattr(user, "profile", None)
+        errors = {}
+
+        user_changed = _assign(user, user_data, USER_FIELDS)
+        _clean_instance(user, errors, "user", exclude=["role", "parent", "addBy", "rejected_by", "approved_by", "username", "password"])
+        profile_changed = []
+        if profile is not None:
+            profile_changed = _assign(profile, profile_data, PROFILE_FIELDS)
+            _clean_instance(profile, errors, "profile", exclude=["user", "address", "photo", "signature"])
+
+        address = profile.address if profile is not None else None
+        address_values = {}
+        for field, value in address_data.items():
+            if field not in ADDRESS_MODELS:
+                errors[f"profile.address.{field}"] = ["Unknown field"]
+            elif _as_int(value) not in self.existing_addresses[field]:
+                errors[f"profile.address.{field}"] = [f"{field} {value} does not exist"]
+            else:
+                address_values[f"{field}_id"] = _as_int(value)
+        if address is None and address_values and profile is not None:
+            address = Address(client_uuid=derived_uuid(key, "address"))
+        address_changed = _assign(address, address_values, address_values) if address is not None else []
+
+        if user.parent_id is None and ("phone" in user_changed or "email" in user_changed):
+            taken = User.objects.filter(parent__isnull=True).exclude(pk=user.pk)
+            if user.phone and taken.by_contact(user.phone).exists():
+                errors["user.phone"] = ["Phone number must be unique for main users (non-sub users)."]
+            if user.email and taken.by_contact(user.email).exists():
+                errors["user.email"] = ["Email must be unique for main users (non-sub users)."]
+        if errors:
+            self._fail(index, str(key), errors)
+            return
+
+        if not (user_changed or profile_changed or address_changed):
+            self.results[index] = self._result(index, user, "unchanged")
+            return
+        try:
+            with transaction.atomic():
+                if address_changed:
+                    address.save()
+                    if profile.address_id != address.pk:
+                        profile.address = address
+                        profile_changed.append("address")
+                if user_changed:
+                    user.save(update_fields=[*user_changed, "updated"])
+                if profile_changed:
+                    profile.save(update_fields=[*profile_changed, "updated"])
+        except DatabaseError:
+            logger.exception("Offline sync update of %s failed", key)
+            self._fail(index, str(key), {"row": ["Could not be saved; it conflicts with an existing record."]})
+            return
+        self.results[index] = self._result(index, user, "updated")
+
+
+def _assign(instance, data, fields):
+    """Set the ``fields`` present in ``data`` on ``instance``; returns the names that changed."""
+    changed = []
+    for field in fields:
+        if field not in data:
+            continue
+        value = data[field]
+        if field == "email":
+            value = value or ""
+        current = getattr(instance, field)
+        if current != value and str(current if current is not None else "") != str(value if value is not None else ""):
+            setattr(instance, field, value)
+            changed.append(field)
+    return changed
@@ -1,3 +1,594 @@
-from django.test import TestCase
+import importlib
+import json
+import threading
+import unittest
+import uuid
+from datetime import timedelta
+from unittest import mock
+from urllib.parse import parse_qsl, urlsplit
 
-# Create your tests here.
+from django.apps import apps as global_apps
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.address.models import Division, Zilla
+from apps.notifications.models import OutboundMessage
+from apps.notifications.outbox import kick_delivery
+
+from core.utils.contact import normalize_contact, normalize_email, normalize_phone
+from core.utils.testing import api_client, make_roles, make_user
+
+from . import otp
+from .bulk import ADDRESS_MODELS, BulkRegistration, _existing_ids
+from .hashing import hasher_for_role
+from .search import search_users
+from .models import CollectorCounter, User, VerificationCode
+from .views import RegisterUserView
+from .sync import OfflineSync
+
+
+contact_migration = importlib.import_module("apps.accounts.migrations.0020_user_contact_index")
+
+
+def household(ref, phone="01812345678", last_name="Uddin"):
+    return {
+        "ref": ref,
+        "account_type": "public",
+        "user": {"first_name": "Rahim", "last_name": last_name, "phone": phone},
+        "profile": {"name_en": "Rahim", "name_bn": "রহিম", "phone": phone},
+    }
+
+
+def synced(key, **fields):
+    """``household()`` as an offline-sync record keyed by ``key``."""
+    record = household(None, **fields)
+    del record["ref"]
+    record["uuid"] = str(key)
+    return record
+
+
+def stored_counters(collector):
+    return CollectorCounter.objects.filter(collector=collector).values(*CollectorCounter.AGGREGATES).first()
+
+
+def recount(collector):
+    return User.objects.filter(addBy=collector).aggregate(**CollectorCounter.AGGREGATES)
+
+
+class ContactNormalizationTests(SimpleTestCase):
+    def test_phone(self):
+        cases = {
+            "01812345678": "01812345678",
+            "+8801812345678": "01812345678",
+            "8801812345678": "01812345678",
+            "+880 1812-345678": "01812345678",
+            " 018 1234 5678 ": "01812345678",
+            "1812345678": None,
+            "+88001812345678": None,
+            "": None,
+            "   ": None,
+            None: None,
+        }
+        for value, expected in cases.items():
+            with self.subTest(value=value):
+                self.assertEqual(normalize_phone(value), expected)
+
+    def test_email(self):
+        cases = {
+            " User@Example.COM ": "user@example.com",
+            "user@example.com": "user@example.com",
+            "": None,
+            "   ": None,
+            None: None,
+        }
+        for value, expected in cases.items():
+            with self.subTest(value=value):
+                self.assertEqual(normalize_email(value), expected)
+
+    def test_contact_kind(self):
+        self.assertEqual(normalize_contact("User@Example.com"), ("email", "user@example.com"))
+        self.assertEqual(normalize_contact("+8801812345678"), ("phone", "01812345678"))
+        self.assertEqual(normalize_contact("12345"), (None, None))
+        self.assertEqual(normalize_contact(None), (None, None))
+
+
+class PasswordPolicyTests(SimpleTestCase):
+    def test_no_role_defaults_below_djangos_budget(self):
+        for role in settings.PASSWORD_HASH_ITERATIONS_BY_ROLE:
+            with self.subTest(role=role):
+                self.assertGreaterEqual(hasher_for_role(role).iterations, PBKDF2PasswordHasher.iterations)
+
+
+class NormalizedContactTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user("public", "user", email="User@Example.com", phone="+8801812345678")
+
+    def test_save_keeps_normalized_columns_in_step(self):
+        self.assertEqual(
+            User.objects.values_list("email_normalized", "phone_normalized").get(pk=self.user.pk),
+            ("user@example.com", "01812345678"),
+        )
+        self.assertEqual(User.objects.by_contact("USER@example.com ").get(), self.user)
+        self.assertEqual(User.objects.by_contact("01812345678").get(), self.user)
+
+    def test_migration_backfills_normalized_columns(self):
+        User.objects.update(email_normalized=None, phone_normalized=None)
+
+        contact_migration.backfill_normalized_contacts(global_apps, None)
+
+        self.assertEqual(User.objects.by_contact("user@example.com").get(), self.user)
+        self.assertEqual(User.objects.by_contact("8801812345678").get(), self.user)
+
+
+class BulkRegistrationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.roles = make_roles()
+        cls.collector = make_user(cls.roles["dataCollector"], "collector", email="collector@example.com")
+
+    def test_valid_rows_are_inserted_and_counted(self):
+        results = BulkRegistration(
+            [household("hh-1", "01812345678"), household("hh-2", "01812345679")], self.collector,
+        ).run()
+
+        self.assertEqual([result["status"] for result in results], ["created", "created"])
+        self.assertEqual(User.objects.filter(addBy=self.collector).count(), 2)
+        self.assertEqual(stored_counters(self.collector), recount(self.collector))
+
+    def test_phone_repeated_in_batch_rejects_both_rows(self):
+        results = BulkRegistration(
+            [household("hh-1", "01812345678"), household("hh-2", "01812345678")], self.collector,
+        ).run()
+
+        self.assertEqual([result["status"] for result in results], ["error", "error"])
+        self.assertFalse(User.objects.filter(addBy=self.collector).exists())
+
+    def test_phone_already_registered_is_rejected(self):
+        BulkRegistration([household("hh-1", "01812345678")], self.collector).run()
+
+        results = BulkRegistration([household("hh-2", "01812345678")], self.collector).run()
+
+        self.assertEqual(results[0]["status"], "error")
+        self.assertIn("user.phone", results[0]["errors"])
+
+    def sub_account(self, ref, parent_ref):
+        return {
+            "ref": ref, "account_type": "sub_account",
+            "user": {"first_name": "Karim", "last_name": "Uddin", "parent_ref": parent_ref},
+            "profile": {"name_en": "Karim", "name_bn": "করিম"},
+        }
+
+    def test_sub_accounts_get_a_username_and_a_temporary_password(self):
+        results = BulkRegistration([household("hh-1"), self.sub_account("hh-1-a", "hh-1")], self.collector).run()
+
+        self.assertEqual([result["status"] for result in results], ["created", "created"])
+        self.assertNotIn("temporary_password", results[0])
+        self.assertEqual(results[1]["username"], "Karim-Uddin")
+        sub_user = User.objects.get(pk=results[1]["user_id"])
+        self.assertEqual(sub_user.username, "Karim-Uddin")
+        self.assertTrue(sub_user.check_password(results[1]["temporary_password"]))
+
+    def test_sub_account_username_must_be_free(self):
+        BulkRegistration([household("hh-1"), self.sub_account("hh-1-a", "hh-1")], self.collector).run()
+
+        results = BulkRegistration(
+            [household("hh-2", "01812345679"), self.sub_account("hh-2-a", "hh-2"), self.sub_account("hh-2-b", "hh-2")],
+            self.collector,
+        ).run()
+
+        self.assertEqual([result["status"] for result in results], ["created", "error", "error"])
+        self.assertIn("user.username", results[1]["errors"])
+
+
+class OfflineSyncTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.roles = make_roles()
+        cls.collector = make_user(cls.roles["dataCollector"], "collector", email="collector@example.com")
+
+    def test_replayed_batch_is_a_no_op(self):
+        key = uuid.uuid4()
+        records = [synced(key)]
+
+        first = OfflineSync(records, self.collector).run()
+        self.assertEqual(first[0]["status"], "created")
+        user = User.objects.get(client_uuid=key)
+        updated = user.updated
+
+        replay = OfflineSync(records, self.collector).run()
+        self.assertEqual(replay[0]["status"], "unchanged")
+        self.assertEqual(replay[0]["user_id"], user.pk)
+        self.assertEqual(User.objects.filter(client_uuid=key).count(), 1)
+        user.refresh_from_db()
+        self.assertEqual(user.updated, updated)
+        self.assertEqual(stored_counters(self.collector)["total"], 1)
+
+    def test_changed_record_is_updated_in_place(self):
+        key = uuid.uuid4()
+        OfflineSync([synced(key)], self.collector).run()
+
+        results = OfflineSync([synced(key, last_name="Mia")], self.collector).run()
+
+        self.assertEqual(results[0]["status"], "updated")
+        self.assertEqual(User.objects.get(client_uuid=key).last_name, "Mia")
+        self.assertEqual(User.objects.filter(addBy=self.collector).count(), 1)
+
+    def test_updated_addresses_are_checked_once_per_level(self):
+        dhaka = Division.objects.create(name_en="Dhaka", name_bn="ঢাকা")
+        gazipur = Zilla.objects.create(name_en="Gazipur", name_bn="গাজীপুর", division=dhaka)
+        records = [synced(uuid.uuid4()), synced(uuid.uuid4(), phone="01812345679")]
+        OfflineSync(records, self.collector).run()
+        records[0]["profile"]["address"] = {"division": dhaka.pk, "zilla": gazipur.pk}
+        records[1]["profile"]["address"] = {"division": dhaka.pk, "zilla": gazipur.pk + 1}
+
+        with mock.patch("apps.accounts.sync._existing_ids", wraps=_existing_ids) as existing_ids:
+            results = OfflineSync(records, self.collector).run()
+
+        self.assertEqual(existing_ids.call_count, len(ADDRESS_MODELS))
+        self.assertEqual([result["status"] for result in results], ["updated", "error"])
+        self.assertEqual(list(results[1]["errors"]), ["profile.address.zilla"])
+        self.assertEqual(User.objects.get(pk=results[0]["user_id"]).profile.address.zilla, gazipur)
+
+    def test_sub_account_names_parent_in_the_same_batch(self):
+        parent_key, child_key = uuid.uuid4(), uuid.uuid4()
+        child = {
+            "uuid": str(child_key),
+            "account_type": "sub_account",
+            "user": {"first_name": "Karim", "last_name": "Uddin", "parent_uuid": str(parent_key)},
+            "profile": {"name_en": "Karim", "name_bn": "করিম"},
+        }
+
+        results = OfflineSync([child, synced(parent_key)], self.collector).run()
+
+        self.assertEqual([result["status"] for result in results], ["created", "created"])
+        parent = User.objects.get(client_uuid=parent_key)
+        self.assertEqual(User.objects.get(client_uuid=child_key).parent, parent)
+
+    def test_duplicate_uuid_in_batch_is_rejected(self):
+        key = uuid.uuid4()
+        results = OfflineSync([synced(key), synced(key, phone="01812345679")], self.collector).run()
+
+        self.assertEqual(results[0]["status"], "created")
+        self.assertEqual(results[1]["status"], "error")
+        self.assertIn("uuid", results[1]["errors"])
+
+    def test_record_of_another_collector_is_not_touched(self):
+        key = uuid.uuid4()
+        OfflineSync([synced(key)], self.collector).run()
+        other = make_user(self.roles["dataCollector"], "other", email="other@example.com")
+
+        results = OfflineSync([synced(key, last_name="Mia")], other).run()
+
+        self.assertEqual(results[0]["status"], "error")
+        self.assertEqual(User.objects.get(client_uuid=key).last_name, "Uddin")
+
+    def test_replay_over_the_api(self):
+        client = api_client(self.collector)
+        body = {"records": [synced(uuid.uuid4())]}
+
+        first = client.post(reverse("offline-sync"), body, format="json")
+        replay = client.post(reverse("offline-sync"), body, format="json")
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.data["summary"], {"total": 1, "created": 1})
+        self.assertEqual(replay.data["summary"], {"total": 1, "unchanged": 1})
+        self.assertEqual(User.objects.filter(addBy=self.collector).count(), 1)
+
+
+class UserDetailsAsyncTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.collector = make_user("dataCollector", "collector", email="collector@example.com")
+        for i in range(3):
+            make_user("public", f"member-{i}", phone=f"0181234567{i}", addBy=cls.collector)
+
+    def setUp(self):
+        self.api = api_client(self.collector)
+
+    def get_both(self, path, query):
+        sync = self.api.get(f"/accounts/{path}", query)
+        asynchronous = self.api.get(f"/accounts/async/{path}", query)
+        self.assertEqual(asynchronous.status_code, sync.status_code)
+        # same body, links included, apart from the /async/ path prefix
+        self.assertEqual(json.loads(asynchronous.content.decode().replace("/async/", "/")), sync.json())
+        return asynchronous
+
+    def test_pages_match_the_sync_keyset_envelope(self):
+        first = self.get_both("user-details", {"page_size": 2}).json()
+
+        self.assertEqual(set(first), {"next", "previous", "results"})
+        self.assertEqual([user["username"] for user in first["results"]], ["member-2", "member-1"])
+        self.assertIsNone(first["previous"])
+
+        second = self.get_both("user-details", dict(parse_qsl(urlsplit(first["next"]).query))).json()
+
+        self.assertEqual([user["username"] for user in second["results"]], ["member-0"])
+        self.assertIsNone(second["next"])
+        self.assertIsNotNone(second["previous"])
+
+    def test_malformed_cursor_is_a_404(self):
+        response = self.get_both("user-details", {"cursor": "not-a-cursor"})
+
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(COLLECTOR_COUNTERS_ENABLED=True)
+class CollectorCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.roles = make_roles()
+        cls.collector = make_user(cls.roles["dataCollector"], "collector", email="collector@example.com")
+
+    def register(self, username, **fields):
+        return make_user(self.roles["public"], username, addBy=self.collector, **fields)
+
+    def test_counters_follow_create_update_and_delete(self):
+        first = self.register("u1")
+        second = self.register("u2", email_verified=True)
+        self.assertEqual(stored_counters(self.collector), {"total": 2, "paid": 0, "pending": 2, "verified": 1})
+
+        first.payment_status = "Paid"
+        first.save()
+        self.assertEqual(stored_counters(self.collector), {"total": 2, "paid": 1, "pending": 1, "verified": 1})
+
+        second.delete()
+        self.assertEqual(stored_counters(self.collector), recount(self.collector))
+
+    def test_interleaved_saves_from_stale_instances(self):
+        user = self.register("u1")
+        # two requests load the same user before either writes
+        one, two = User.objects.get(pk=user.pk), User.objects.get(pk=user.pk)
+
+        one.payment_status = "Paid"
+        one.save()
+        two.phone_verified = True
+        two.save(update_fields=["phone_verified"])
+
+        self.assertEqual(stored_counters(self.collector), recount(self.collector))
+        self.assertEqual(stored_counters(self.collector), {"total": 1, "paid": 1, "pending": 0, "verified": 1})
+
+    def test_moving_a_user_between_collectors(self):
+        other = make_user(self.roles["dataCollector"], "other", email="other@example.com")
+        user = self.register("u1")
+
+        user.addBy = other
+        user.save()
+
+        self.assertEqual(stored_counters(self.collector)["total"], 0)
+        self.assertEqual(stored_counters(other)["total"], 1)
+
+    def test_deferred_instance_falls_back_to_recount(self):
+        self.register("u1")
+        user = User.objects.only("id", "payment_status").get(username="u1")
+
+        user.payment_status = "Paid"
+        user.save()
+
+        self.assertEqual(stored_counters(self.collector), recount(self.collector))
+
+
+@override_settings(COLLECTOR_COUNTERS_ENABLED=True)
+@skipUnlessDBFeature("has_select_for_update")
+class ConcurrentCollectorCounterTests(TransactionTestCase):
+    """Real concurrent writers; needs a database with row locks (PostgreSQL)."""
+    workers = 8
+
+    def test_concurrent_payments_keep_counters_exact(self):
+        roles = make_roles()
+        collector = make_user(roles["dataCollector"], "collector", email="collector@example.com")
+        users = [make_user(roles["public"], f"u{index}", addBy=collector) for index in range(self.workers)]
+        barrier = threading.Barrier(self.workers)
+        errors = []
+
+        def pay(pk):
+            try:
+                barrier.wait()
+                with transaction.atomic():
+                    user = User.objects.get(pk=pk)
+                    user.payment_status = "Paid"
+                    user.save()
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=pay, args=(user.pk,)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(stored_counters(collector), recount(collector))
+        self.assertEqual(stored_counters(collector)["paid"], self.workers)
+
+
+class SearchUsersTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        roles = make_roles()
+        cls.exact = make_user(roles["public"], "exact", first_name="Rahim", last_name="Uddin", phone="01812345678")
+        cls.prefix = make_user(roles["public"], "prefix", first_name="Rahima", last_name="Khatun")
+        cls.substring = make_user(roles["public"], "substring", first_name="Abdur", last_name="Ibrahim")
+        cls.other = make_user(roles["public"], "other", first_name="Karim", email="Karim@Example.com")
+
+    def search(self, term):
+        return list(search_users(User.objects.all(), term))
+
+    def test_names_are_matched_anywhere_best_first(self):
+        results = self.search("rahim")
+
+        self.assertEqual(set(results), {self.exact, self.prefix, self.substring})
+        self.assertEqual(results[0], self.exact)
+        if connection.vendor != "postgresql":
+            self.assertEqual(results, [self.exact, self.prefix, self.substring])
+
+    def test_contacts_and_ids_are_exact_probes(self):
+        self.assertEqual(self.search("+880 1812-345678"), [self.exact])
+        self.assertEqual(self.search("karim@example.COM"), [self.other])
+        self.assertEqual(self.search(str(self.prefix.pk)), [self.prefix])
+        self.assertEqual(self.search("  "), list(User.objects.all()))
+
+    @unittest.skipUnless(connection.vendor == "postgresql", "pg_trgm similarity is PostgreSQL only")
+    def test_trigram_similarity_ranks_closer_names_first(self):
+        results = search_users(User.objects.all(), "Rahim")
+
+        relevance = [user.relevance for user in results]
+        self.assertEqual(relevance, sorted(relevance, reverse=True))
+        self.assertEqual(results[0], self.exact)
+
+
+class SendVerificationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user("public", "member", phone="01711111111")
+
+    def send(self, contact_type):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(
+                reverse("send-otp"),
+                {"user_id": self.user.pk, "contact": "01711111111", "contact_type": contact_type},
+                content_type="application/json",
+            )
+        return response, callbacks
+
+    def test_code_and_message_commit_before_delivery_is_kicked(self):
+        response, callbacks = self.send("phone")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(callbacks, [kick_delivery])
+        self.assertEqual(list(OutboundMessage.objects.values_list("channel", "recipient")), [("sms", "01711111111")])
+        self.assertTrue(VerificationCode.objects.filter(user=self.user, channel="phone").exists())
+
+    def test_nothing_is_kept_without_a_recipient(self):
+        response, callbacks = self.send("email")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(callbacks, [])
+        self.assertFalse(OutboundMessage.objects.exists())
+        self.assertFalse(VerificationCode.objects.exists())
+
+
+class RegistrationWelcomeTests(TestCase):
+    def welcome(self, contact_type, contact):
+        RegisterUserView()._send_complete_registration_message_async(None, contact_type, contact)
+        return list(OutboundMessage.objects.values_list("channel", "recipient"))
+
+    @override_settings(SEND_REGISTRATION_WELCOME=True)
+    def test_welcome_is_queued_on_the_registered_channel(self):
+        self.assertEqual(self.welcome("phone", "+8801711111111"), [("sms", "01711111111")])
+        OutboundMessage.objects.all().delete()
+        self.assertEqual(self.welcome("email", "member@example.com"), [("email", "member@example.com")])
+
+    @override_settings(SEND_REGISTRATION_WELCOME=False)
+    def test_nothing_is_queued_when_disabled(self):
+        self.assertEqual(self.welcome("phone", "01711111111"), [])
+
+
+@override_settings(OTP_MAX_ATTEMPTS=3, OTP_RESEND_COOLDOWN=60, OTP_TTL=300)
+class OTPTests(TestCase):
+    """Codes in the ``VerificationCode`` table, as with the process-local cache."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user("dataCollector", "collector", email="collector@example.com")
+
+    def wrong(self, code):
+        return f"{(int(code) + 1) % 10 ** len(code):0{len(code)}d}"
+
+    def expire(self):
+        VerificationCode.objects.filter(user=self.user).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+    def end_cooldown(self):
+        VerificationCode.objects.filter(user=self.user).update(resend_at=timezone.now() - timedelta(seconds=1))
+
+    def test_correct_code_verifies_once(self):
+        code = otp.issue(self.user.pk, "email")
+
+        self.assertTrue(otp.verify(self.user.pk, "email", code))
+        self.assertFalse(otp.verify(self.user.pk, "email", code))
+
+    def test_wrong_attempts_burn_the_code(self):
+        code = otp.issue(self.user.pk, "email")
+
+        for _ in range(3):
+            self.assertFalse(otp.verify(self.user.pk, "email", self.wrong(code)))
+
+        self.assertFalse(otp.verify(self.user.pk, "email", code))
+
+    def test_correct_code_on_last_attempt_verifies(self):
+        code = otp.issue(self.user.pk, "email")
+        otp.verify(self.user.pk, "email", self.wrong(code))
+        otp.verify(self.user.pk, "email", self.wrong(code))
+
+        self.assertTrue(otp.verify(self.user.pk, "email", code))
+
+    def test_expired_code_is_rejected(self):
+        code = otp.issue(self.user.pk, "email")
+        self.expire()
+
+        self.assertFalse(otp.verify(self.user.pk, "email", code))
+
+    def test_resend_within_cooldown_is_refused(self):
+        otp.issue(self.user.pk, "phone")
+
+        with self.assertRaises(otp.OTPCooldown) as raised:
+            otp.issue(self.user.pk, "phone")
+        self.assertGreater(raised.exception.retry_after, 0)
+        # channels are independent
+        otp.issue(self.user.pk, "email")
+
+    def test_resend_after_cooldown_replaces_the_code(self):
+        old = otp.issue(self.user.pk, "phone")
+        self.end_cooldown()
+
+        new = otp.issue(self.user.pk, "phone")
+
+        if new != old:
+            self.assertFalse(otp.verify(self.user.pk, "phone", old))
+        self.assertTrue(otp.verify(self.user.pk, "phone", new))
+
+    def test_discard_clears_code_and_cooldown(self):
+        code = otp.issue(self.user.pk, "email")
+        otp.discard(self.user.pk, "email")
+
+        self.assertFalse(otp.verify(self.user.pk, "email", code))
+        otp.issue(self.user.pk, "email")
+
+
+class CacheOTPTests(OTPTests):
+    """The same behaviour with codes in the cache, as with ``REDIS_URL``."""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        patcher = mock.patch.object(otp, "_codes", otp.CacheCodes)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def expire(self):
+        for channel in otp.CHANNELS:
+            cache.delete_many(otp.CacheCodes()._keys(self.user.pk, channel)[:2])
+
+    def end_cooldown(self):
+        for channel in otp.CHANNELS:
+            cache.delete(otp.CacheCodes()._keys(self.user.pk, channel)[2])
+
+    def test_nothing_is_written_to_the_table(self):
+        otp.issue(self.user.pk, "email")
+
+        self.assertFalse(VerificationCode.objects.exists())
+
+
+class OTPStoreTests(SimpleTestCase):
+    def test_store_follows_the_cache_backend(self):
+        self.assertIsInstance(otp._codes(), otp.DatabaseCodes)
+        redis = {"default": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": "redis://localhost"}}
+        with override_settings(CACHES=redis):
+            self.assertIsInstance(otp._codes(), otp.CacheCodes)
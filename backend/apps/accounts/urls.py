@@ -3,6 +3,8 @@ from . import views
 
 urlpatterns = [
     path('register', views.RegisterUserView.as_view(), name='register'),
+    path('register/bulk', views.BulkRegisterUserView.as_view(), name='register-bulk'),
+    path('sync', views.OfflineSyncView.as_view(), name='offline-sync'),
     path('verify-otp', views.VerifyOTPView.as_view(), name='verify-otp'),
     path('send-otp', views.SendVerificationView.as_view(), name='send-otp'),
 
@@ -11,4 +13,8 @@ urlpatterns = [
     path('last-user-details', views.UserLastDetail.as_view(), name='last-user'),
     path("user-statistics", views.UserStatisticsView.as_view(), name="user-statistics"),
     path("public-user", views.publicUserView.as_view(), name="public-user"),
+
+    # async (ASGI) variants of the hot read endpoints
+    path('async/user-details', views.user_details_async, name='user-async'),
+    path("async/user-statistics", views.user_statistics_async, name="user-statistics-async"),
 ]
\ No newline at end of file
@@ -1,32 +1,64 @@
 import re
 from .models import Role, User
+from .bulk import BulkRegistration, BulkRegistrationError, open_photos, read_rows
+from .search import search_users
+from . import otp as otp_service
+from .sync import OfflineSync
+from apps.address.sync import BadSyncToken, address_changes, read_token
+from apps.statistic_table.counters import acollector_counters, collector_counters
 from apps.address.models import Address
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.exceptions import NotFound
 from django.db.models import ExpressionWrapper, Q, BooleanField,Count, OuterRef, Subquery, IntegerField, Exists
 from .serializers import UserSerializer, VerifyOTPSerializer, SendVerificationSerializer
 from apps.address.serializers import AddressSerializer, UserProfileSerializer
-from core.authentication.auth import JWTAuthentication
-from core.pagination.user_pagination import UserPagination
+from core.authentication.auth import JWTAuthentication, async_jwt_required
+from core.pagination.keyset_pagination import KeysetPagination
 from rest_framework.permissions import IsAuthenticated
 from core.utils.emailer import EmailSender
+from apps.notifications.outbox import enqueue
 from rest_framework.permissions import AllowAny
-from django.core.cache import cache
 from django.shortcuts import get_object_or_404
 from functools import lru_cache
 from typing import Dict, Callable, Any
 from core.utils.code_generate import generate_verification_code
 from django.db import transaction
-from concurrent.futures import ThreadPoolExecutor
-from rest_framework.parsers import MultiPartParser, FormParser
+from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+from asgiref.sync import sync_to_async
+from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
 import json
 import random, string
+from collections import Counter
 import logging
 
 
 logger = logging.getLogger(__name__)
 
+
+@lru_cache(maxsize=32)
+def _get_role(role_name: str):
+    """Roles are never deleted (PROTECT) or renamed at runtime; misses (404) aren't cached."""
+    return get_object_or_404(Role, name=role_name)
+
+
+def _queue_email(subject, message, recipient):
+    """Queue in the notification outbox; delivered once the surrounding transaction commits."""
+    EmailSender()\
+        .set_subject(subject)\
+        .set_message(message)\
+        .set_recipients(recipient)\
+        .queue()
+
+
+def _queue_sms(message, phone):
+    """Queue in the notification outbox; delivered once the surrounding transaction commits."""
+    enqueue('sms', phone, message)
+
+
 class RegisterUserView(APIView):
     """
     FASTEST & MOST OPTIMIZED approach for Django REST API
@@ -44,13 +76,6 @@ class RegisterUserView(APIView):
             'sub_account': self._setup_sub_account,
         }
 
-        # Thread pool for background tasks
-        self.thread_pool = ThreadPoolExecutor(max_workers=3, thread_name_prefix='email-sender')
-    
-        
-        # Cache role objects to avoid repeated DB queries
-        self._role_cache = {}
-
 
     def get_parser_classes(self):
         account_type = self.request.query_params.get("for_account")
@@ -59,10 +84,9 @@ class RegisterUserView(APIView):
         return [JSONParser]
 
     
-    @lru_cache(maxsize=32)
     def _get_role_cached(self, role_name: str):
-        """Cache role objects to avoid repeated DB queries"""
-        return get_object_or_404(Role, name=role_name)
+        """Role lookups are cached per process, across requests"""
+        return _get_role(role_name)
 
     
     def post(self, request, *args, **kwargs):
@@ -214,8 +238,8 @@ class RegisterUserView(APIView):
         
         user = serializer.save()
         
-        #! Send welcome message, verify contact, and pay fee for complete registration in background thread (non-blocking)
-        # self._send_complete_registration_message_async(user, contact_type, contact)
+        # Welcome message: verify contact, and pay fee for complete registration
+        self._send_complete_registration_message_async(user, contact_type, contact)
         
         respose_data = {
             "user_id": user.id,
@@ -371,71 +395,43 @@ class RegisterUserView(APIView):
 
     
     def _send_sub_account_registration_permission_message(self, user, contact_type, contact,password):
-        def send_content(user, contact_type, contact, password):
-            match contact_type:
-                case 'phone':
-                    ...
-                case 'email':
-                    try:
-                        recipient = contact
-                        
-                        if recipient:
-                            # Send email in background thread
-                            EmailSender()\
-                                .set_subject("Permission for Sub Account Registration")\
-                                .set_message(
-                                    f"A sub-user account has been created and is awaiting your approval. "
-                                    f"To authorize this sub-account, please verify the OTP sent to your {contact_type}. "
-                                    f"Sub-user Username: {user.username}, Temporary Password: {password}. "
-                                    f"Complete the verification to enable access."
-                                )\
-                                .set_recipients(recipient)\
-                                ()
-                            
-                            logger.info(f"Verification email sent to {recipient}")
-                            
-                    except Exception as e:
-                        logger.error(f"Background email sending failed: {str(e)}")
-
-        #! Method 1: Using ThreadPoolExecutor (RECOMMENDED)
-        self.thread_pool.submit(send_content, user, contact_type, contact, password)
-
+        match contact_type:
+            case 'phone':
+                if contact:
+                    _queue_sms(
+                        f"A sub-account ({user.username}) awaits your approval. Verify the OTP we send you to enable it. "
+                        f"Temporary password: {password}",
+                        contact,
+                    )
+            case 'email':
+                if contact:
+                    _queue_email(
+                        "Permission for Sub Account Registration",
+                        f"A sub-user account has been created and is awaiting your approval. "
+                        f"To authorize this sub-account, please verify the OTP sent to your {contact_type}. "
+                        f"Sub-user Username: {user.username}, Temporary Password: {password}. "
+                        f"Complete the verification to enable access.",
+                        contact,
+                    )
 
         logger.info(f"Welcome message sent to {contact}")
 
 
     def _send_complete_registration_message_async(self, user, contact_type, contact):
-        def send_content(user, contact_type, contact):
-            match contact_type:
-                case 'phone':
-                    ...
-                case 'email':
-                    try:
-                        recipient = contact
-                        
-                        if recipient:
-                            # Send email in background thread
-                            EmailSender()\
-                                .set_subject("Complete Registration")\
-                                .set_message(f"Welcome to our platform! You should verify your {contact_type} and pay fee to complete registration")\
-                                .set_recipients(recipient)\
-                                ()
-                            
-                            logger.info(f"Verification email sent to {recipient}")
-                            
-                    except Exception as e:
-                        logger.error(f"Background email sending failed: {str(e)}")
-
-        #! Method 1: Using ThreadPoolExecutor (RECOMMENDED)
-        # self.thread_pool.submit(send_content, user, contact_type, contact)
-        
-        logger.info(f"Welcome message sent to {contact}")
+        """Queue the welcome message in the outbox when SEND_REGISTRATION_WELCOME is on"""
+        if not settings.SEND_REGISTRATION_WELCOME or not contact:
+            return
+        match contact_type:
+            case 'phone':
+                _queue_sms("Welcome! Verify your phone and pay the fee to complete your registration.", contact)
+            case 'email':
+                _queue_email(
+                    "Complete Registration",
+                    f"Welcome to our platform! You should verify your {contact_type} and pay fee to complete registration",
+                    contact,
+                )
+        logger.info(f"Welcome message queued for {contact}")
 
-    
-    def __del__(self):
-        """Clean up thread pool when view is destroyed"""
-        if hasattr(self, 'thread_pool'):
-            self.thread_pool.shutdown(wait=False)
     def _error_response(self, message: str, status_code: int):
         """Optimized error response"""
         return Response(
@@ -444,13 +440,86 @@ class RegisterUserView(APIView):
         )
 
 
+class BulkRegisterUserView(APIView):
+    """
+    Register a batch of public users and sub-accounts for the calling data
+    collector. Accepts ``{"rows": [...]}`` as JSON, or multipart with a ``rows``
+    file (.json/.csv) and an optional ``photos`` zip; see ``apps.accounts.bulk``.
+    Answers 201 when every row was created, 207 with the per-row report when
+    only some were, 400 when none were.
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+    parser_classes = [JSONParser, MultiPartParser, FormParser]
+
+    def post(self, request):
+        if request.user.role.name != 'dataCollector':
+            return Response({"status": "error", "message": "Only data collectors can register users"}, status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            rows = read_rows(request.data, request.FILES)
+            photos = open_photos(request.FILES)
+        except BulkRegistrationError as e:
+            return Response({"status": "error", "message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = BulkRegistration(rows, request.user, photos).run()
+        created = sum(1 for result in results if result["status"] == "created")
+        summary = {"total": len(results), "created": created, "failed": len(results) - created}
+
+        if created == len(results):
+            code = status.HTTP_201_CREATED
+        elif created:
+            code = status.HTTP_207_MULTI_STATUS
+        else:
+            code = status.HTTP_400_BAD_REQUEST
+        return Response({"status": "success" if created else "error", "summary": summary, "results": results}, status=code)
+
+
+class OfflineSyncView(APIView):
+    """
+    Offline sync for data collectors: upserts a batch of UUID-keyed household
+    records (see ``apps.accounts.sync``) and returns the address-hierarchy
+    changes since the client's last ``token`` together with the next token.
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+    parser_classes = [JSONParser, MultiPartParser, FormParser]
+
+    def post(self, request):
+        if request.user.role.name != 'dataCollector':
+            return Response({"status": "error", "message": "Only data collectors can register users"}, status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            since = read_token(request.data.get('token'))
+        except BadSyncToken as e:
+            return Response({"status": "error", "message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = []
+        if request.data.get('records') or 'records' in request.FILES:
+            try:
+                records = read_rows(request.data, request.FILES, field='records')
+                photos = open_photos(request.FILES)
+            except BulkRegistrationError as e:
+                return Response({"status": "error", "message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            results = OfflineSync(records, request.user, photos).run()
+
+        changes, token = address_changes(since)
+        summary = Counter(result["status"] for result in results)
+        return Response({
+            "status": "success",
+            "token": token,
+            "summary": {"total": len(results), **summary},
+            "results": results,
+            "changes": changes,
+        }, status=status.HTTP_200_OK)
+
+
 ''' 
 Data collector email or phone verification view
 
 '''
 class VerifyOTPView(APIView):
     def post(self, request):
-        print("request.data", request.data)
         serializer = VerifyOTPSerializer(data=request.data)
         if serializer.is_valid():
             return Response(data = serializer.validated_data, status=status.HTTP_200_OK)
@@ -458,30 +527,32 @@ class VerifyOTPView(APIView):
 
 
 class SendVerificationView(APIView):
-    def __init__(self):
-        super().__init__()
-        self.thread_pool = ThreadPoolExecutor(max_workers=3, thread_name_prefix='email-sender')
-
     def post(self, request):
         serializer = SendVerificationSerializer(data=request.data)
         if serializer.is_valid():
-            print("serializer.validated_data", serializer.validated_data)
             user = serializer.validated_data['user']
             contact_type = serializer.validated_data['contact_type']
             account_type = serializer.validated_data.get('account_type', None)
             contact = serializer.validated_data['contact']
-            # Generate OTP
-            otp = generate_verification_code()
-             # send otp via email or phone
-            match contact_type:
-                case 'phone':
-                    user.phone_code = otp
-                    ...
-                case 'email':
-                    user.email_code = otp
-                    self._send_verification_async(user, otp, account_type,contact)
-            
-            user.save(update_fields=['phone_code' if contact_type == 'phone' else 'email_code'])
+            try:
+                # the code, its outbox message (or its discard) commit together, and
+                # delivery is kicked only once they have
+                with transaction.atomic():
+                    otp = otp_service.issue(user.id, contact_type)
+                    sent = self._send_verification_async(user, otp, account_type, contact, contact_type)
+                    if not sent:
+                        otp_service.discard(user.id, contact_type)
+            except otp_service.OTPCooldown as error:
+                return Response(
+                    {"status": "error", "message": f"A code was sent recently. Try again in {error.retry_after} seconds."},
+                    status=status.HTTP_429_TOO_MANY_REQUESTS,
+                    headers={"Retry-After": str(error.retry_after)},
+                )
+            if not sent:
+                return Response(
+                    {"status": "error", "message": f"No {contact_type} on record to send the code to."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
             return Response({
                 "send_otp": True,
                 "user_id": user.id,
@@ -489,41 +560,58 @@ class SendVerificationView(APIView):
             }, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-    def _send_verification_async(self, user, otp, account_type,contact):
+    def _send_verification_async(self, user, otp, account_type, contact, contact_type):
+        """Queue the code by email or SMS in the outbox; False when there is no one to send it to"""
+        if account_type != 'sub-account':
+            recipient = getattr(user, contact_type)
+        else:
+            recipient = contact
 
-        """Send verification using threading for better performance"""
-        def send_email_task():
-            try:
-                verification_code = otp
-                if account_type != 'sub-account':
-                    recipient = user.phone or user.email
-                else:
-                    recipient = contact
-                
-                if recipient:
-                    # Cache the verification code for later validation
-                    cache_key = f"verification_{user.id}"
-                    cache.set(cache_key, verification_code, timeout=300)  # 5 minutes
-                    
-                    # Send email in background thread
-                    EmailSender()\
-                        .set_subject("Verify Your Account")\
-                        .set_message(f"Your verification code is {verification_code}")\
-                        .set_recipients(recipient)\
-                        ()
-                    
-                    logger.info(f"Verification email sent to {recipient}")
-                    
-            except Exception as e:
-                logger.error(f"Background email sending failed: {str(e)}")
-        
-        #! Method 1: Using ThreadPoolExecutor (RECOMMENDED)
-        self.thread_pool.submit(send_email_task)
+        if not recipient:
+            return False
+        if contact_type == 'phone':
+            _queue_sms(f"Your verification code is {otp}", recipient)
+        else:
+            _queue_email("Verify Your Account", f"Your verification code is {otp}", recipient)
+        return True
+
+
+def _user_details_queryset(user, params):
+    """Registrations of ``user`` filtered/ordered by the user-details query parameters."""
+    # Base queryset
+    queryset = User.objects.filter(addBy=user, parent__isnull=True).order_by('-id')
+
+    # Filter: payment_status
+    payment_status = params.get('payment_status')
+    if payment_status and payment_status.lower() != 'all':
+        queryset = queryset.filter(payment_status=payment_status)
+
+    # Filter: verification_status
+    verification_status = params.get('verification_status')
+    if verification_status == 'verified':
+        queryset = queryset.filter(Q(email_verified=True) | Q(phone_verified=True))
+    elif verification_status == 'unverified':
+        queryset = queryset.filter(Q(email_verified=False) & Q(phone_verified=False))
+
+    # Annotate verification_status (True/False based on email or phone verified)
+    queryset = queryset.annotate(
+        verification_status=ExpressionWrapper(
+            Q(email_verified=True) | Q(phone_verified=True),
+            output_field=BooleanField()
+        )
+    )
 
-    def __del__(self):
-        """Clean up thread pool when view is destroyed"""
-        if hasattr(self, 'thread_pool'):
-            self.thread_pool.shutdown(wait=False)
+    # Ordering
+    ordering_field = params.get('ordering', '-id')  # default to newest
+    if ordering_field.lstrip('-') == 'verification_status':
+        queryset = queryset.order_by(ordering_field)  # supports both asc and desc
+    else:
+        # Safe fallback for known fields only (prevent SQL injection-style abuse)
+        allowed_order_fields = ['id', 'first_name', 'last_name', 'email', 'payment_status']
+        field_name = ordering_field.lstrip('-')
+        if field_name in allowed_order_fields:
+            queryset = queryset.order_by(ordering_field)
+    return queryset
 
 
 class UserDetailView(APIView):
@@ -531,50 +619,28 @@ class UserDetailView(APIView):
     permission_classes = [AllowAny]
 
     def get(self, request):
-        user = request.user
-
-        # Base queryset
-        queryset = User.objects.filter(addBy=user, parent__isnull=True).order_by('-id')
-
-        # Filter: payment_status
-        payment_status = request.GET.get('payment_status')
-        if payment_status and payment_status.lower() != 'all':
-            queryset = queryset.filter(payment_status=payment_status)
-
-        # Filter: verification_status
-        verification_status = request.GET.get('verification_status')
-        if verification_status == 'verified':
-            queryset = queryset.filter(Q(email_verified=True) | Q(phone_verified=True))
-        elif verification_status == 'unverified':
-            queryset = queryset.filter(Q(email_verified=False) & Q(phone_verified=False))
-
-        # Annotate verification_status (True/False based on email or phone verified)
-        queryset = queryset.annotate(
-            verification_status=ExpressionWrapper(
-                Q(email_verified=True) | Q(phone_verified=True),
-                output_field=BooleanField()
-            )
-        )
-
-        # Ordering
-        ordering_field = request.query_params.get('ordering', '-id')  # default to newest
-        if ordering_field.lstrip('-') == 'verification_status':
-            queryset = queryset.order_by(ordering_field)  # supports both asc and desc
-        else:
-            # Safe fallback for known fields only (prevent SQL injection-style abuse)
-            allowed_order_fields = ['id', 'first_name', 'last_name', 'email', 'payment_status']
-            field_name = ordering_field.lstrip('-')
-            if field_name in allowed_order_fields:
-                queryset = queryset.order_by(ordering_field)
+        queryset = _user_details_queryset(request.user, request.query_params)
 
         # Pagination
-        paginator = UserPagination()
+        paginator = KeysetPagination()
         paginated_users = paginator.paginate_queryset(queryset, request)
         serializer = UserSerializer(paginated_users, many=True)
-        print("serializer.data", serializer.data)
         return paginator.get_paginated_response(serializer.data)
 
 
+@require_GET
+@async_jwt_required
+async def user_details_async(request):
+    """ASGI variant of ``UserDetailView``."""
+    queryset = _user_details_queryset(request.user, request.GET)
+    try:
+        users, payload = await KeysetPagination().apaginate_queryset(queryset, request)
+    except NotFound as e:
+        return JsonResponse({"detail": str(e.detail)}, status=e.status_code)
+    payload["results"] = await sync_to_async(lambda: UserSerializer(users, many=True).data)()
+    return JsonResponse(payload)
+
+
 class UserLastDetail(APIView):
     authentication_classes = [JWTAuthentication]
     permission_classes = [AllowAny]
@@ -597,20 +663,28 @@ class UserStatisticsView(APIView):
     def get(self, request):
         user = request.user
 
-        # Filter users added by current user
-        base_queryset = User.objects.filter(addBy=user)
-
-        total_registered = base_queryset.count()
-        paid_users = base_queryset.filter(payment_status="Paid").count()
-        pending_payments = base_queryset.exclude(payment_status="Paid").count()
+        # Registrations added by current user
+        counts = collector_counters(user.id)
 
         return Response({
-            "total_registered": total_registered,
-            "paid_users": paid_users,
-            "pending_payments": pending_payments
+            "total_registered": counts["total"],
+            "paid_users": counts["paid"],
+            "pending_payments": counts["pending"]
         })
 
 
+@require_GET
+@async_jwt_required
+async def user_statistics_async(request):
+    """ASGI variant of ``UserStatisticsView``."""
+    counts = await acollector_counters(request.user.id)
+    return JsonResponse({
+        "total_registered": counts["total"],
+        "paid_users": counts["paid"],
+        "pending_payments": counts["pending"],
+    })
+
+
 class publicUserView(APIView):
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
@@ -618,25 +692,17 @@ class publicUserView(APIView):
     def get(self, request):
         param = request.GET.get('param')
 
-        # Prepare safe ID filter
-        id_filter = Q()
-        if param and str(param).isdigit():
-            id_filter = Q(id=int(param))
-
         # Main user query with role filtering and parent check
-        user_qs = User.objects.annotate(
+        users = User.objects.annotate(
             child_count=Count('children', distinct=True)
         ).filter(
-            (
-                Q(phone=param) |
-                Q(email=param) |
-                Q(first_name__icontains=param) |
-                Q(last_name__icontains=param) |
-                id_filter
-            ) &
             ~Q(role__name__in=['dataCollector', 'admin']) &
             Q(parent__isnull=True)
-        ).values("id", "first_name", "last_name", "phone", "email", "child_count").first()
+        )
+        fields = ("id", "first_name", "last_name", "phone", "email", "child_count")
+
+        # Exact id/phone/email hits are index probes; names go through the trigram search
+        user_qs = search_users(users, param).values(*fields).first() if param else None
 
         if not user_qs:
             return Response({"detail": "User not found"}, status=status.HTTP_404_NOT_FOUND)
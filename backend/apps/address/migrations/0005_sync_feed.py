@@ -0,0 +1,64 @@
+# Generated by Django 5.2.3 on 2026-10-18 08:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('address', '0004_alter_address_options_alter_division_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AddressTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('model', models.CharField(max_length=20)),
+                ('object_id', models.BigIntegerField()),
+            ],
+            options={
+                'ordering': ['-created'],
+                'abstract': False,
+            },
+        ),
+        migrations.AddField(
+            model_name='address',
+            name='client_uuid',
+            field=models.UUIDField(blank=True, editable=False, null=True, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='division',
+            index=models.Index(fields=['updated'], name='division_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='para',
+            index=models.Index(fields=['updated'], name='para_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='postoffice',
+            index=models.Index(fields=['updated'], name='postoffice_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='union',
+            index=models.Index(fields=['updated'], name='union_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='upazila',
+            index=models.Index(fields=['updated'], name='upazila_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='village',
+            index=models.Index(fields=['updated'], name='village_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='zilla',
+            index=models.Index(fields=['updated'], name='zilla_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='addresstombstone',
+            index=models.Index(fields=['created'], name='addresstombstone_created_idx'),
+        ),
+    ]
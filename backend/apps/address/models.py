@@ -1,10 +1,14 @@
 from django.db import models
+from django.db.models.signals import post_delete
 from core.utils.modeler import BaseModel
 
 class Division(BaseModel):
     name_bn = models.CharField(max_length=100, unique=True)
     name_en = models.CharField(max_length=100, unique=True)
 
+    class Meta(BaseModel.Meta):
+        indexes = [models.Index(fields=['updated'], name='division_updated_idx')]
+
     def __str__(self):
         return self.name_en
 
@@ -16,6 +20,7 @@ class Zilla(BaseModel):
 
     class Meta:
         unique_together = ('name_en', 'division')  # Same-named zilla can exist in different divisions
+        indexes = [models.Index(fields=['updated'], name='zilla_updated_idx')]
 
     def __str__(self):
         return self.name_en
@@ -28,6 +33,7 @@ class Upazila(BaseModel):
 
     class Meta:
         unique_together = ('name_en', 'zilla')
+        indexes = [models.Index(fields=['updated'], name='upazila_updated_idx')]
 
     def __str__(self):
         return self.name_en
@@ -40,6 +46,7 @@ class Union(BaseModel):
 
     class Meta:
         unique_together = ('name_en', 'upazila')
+        indexes = [models.Index(fields=['updated'], name='union_updated_idx')]
 
     def __str__(self):
         return self.name_en
@@ -51,6 +58,7 @@ class PostOffice(BaseModel):
 
     class Meta:
         unique_together = ('name', 'union')
+        indexes = [models.Index(fields=['updated'], name='postoffice_updated_idx')]
 
     def __str__(self):
         return f"{self.name} ({self.postal_code})"
@@ -61,6 +69,9 @@ class Village(BaseModel):
     name_en = models.CharField(max_length=100)
     union = models.ForeignKey("Union", on_delete=models.CASCADE, related_name="villages")
 
+    class Meta(BaseModel.Meta):
+        indexes = [models.Index(fields=['updated'], name='village_updated_idx')]
+
     def __str__(self):
         return self.name_en
 
@@ -70,6 +81,9 @@ class Para(BaseModel):
     name_en = models.CharField(max_length=100)
     village = models.ForeignKey("Village", on_delete=models.CASCADE, related_name="paras")
 
+    class Meta(BaseModel.Meta):
+        indexes = [models.Index(fields=['updated'], name='para_updated_idx')]
+
     def __str__(self):
         return self.name_en
 
@@ -82,6 +96,42 @@ class Address(BaseModel):
     post_office = models.ForeignKey(PostOffice, on_delete=models.SET_NULL, null=True)
     village = models.ForeignKey(Village, on_delete=models.SET_NULL, null=True)
     para = models.ForeignKey(Para, on_delete=models.SET_NULL, null=True)
+    # set when the address was created by an offline client (see apps.accounts.sync)
+    client_uuid = models.UUIDField(null=True, blank=True, unique=True, editable=False)
 
     def __str__(self):
         return f"{self.para}, {self.village}, {self.union}, {self.upazila}, {self.zilla}, {self.division}"
+
+
+class AddressTombstone(BaseModel):
+    """A deleted address-hierarchy row, kept so offline clients can sync deletions."""
+    model = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+
+    class Meta(BaseModel.Meta):
+        indexes = [models.Index(fields=['created'], name='addresstombstone_created_idx')]
+
+    def __str__(self):
+        return f"{self.model} {self.object_id}"
+
+
+# The offline delta feed (apps.address.sync) reads rows by `updated`; deletions
+# leave a tombstone instead. Cascades send post_delete for every removed child.
+SYNCED_HIERARCHY = {
+    'divisions': Division,
+    'zillas': Zilla,
+    'upazilas': Upazila,
+    'unions': Union,
+    'postoffices': PostOffice,
+    'villages': Village,
+    'paras': Para,
+}
+
+
+def record_address_tombstone(sender, instance, **kwargs):
+    name = next(name for name, model in SYNCED_HIERARCHY.items() if model is sender)
+    AddressTombstone.objects.create(model=name, object_id=instance.pk)
+
+
+for _model in SYNCED_HIERARCHY.values():
+    post_delete.connect(record_address_tombstone, sender=_model, dispatch_uid=f"address_tombstone_{_model.__name__}")
@@ -1,3 +1,43 @@
+import json
+from unittest import mock
+
 from django.test import TestCase
 
-# Create your tests here.
+from core.pagination.user_pagination import UserPagination
+
+from .models import Division, Zilla
+from .views import ZillaListCreateView
+
+
+class AsyncListViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dhaka = Division.objects.create(name_en="Dhaka", name_bn="ঢাকা")
+        cls.khulna = Division.objects.create(name_en="Khulna", name_bn="খুলনা")
+        for name in ("Gazipur", "Narsingdi", "Tangail"):
+            Zilla.objects.create(name_en=name, name_bn=name, division=cls.dhaka)
+        Zilla.objects.create(name_en="Jessore", name_bn="যশোর", division=cls.khulna)
+
+    def assertSameBody(self, query):
+        sync = self.client.get("/address/zillas/", query)
+        asynchronous = self.client.get("/address/async/zillas/", query)
+        self.assertEqual((sync.status_code, asynchronous.status_code), (200, 200))
+        # same body, links included, apart from the /async/ path prefix
+        self.assertEqual(json.loads(asynchronous.content.decode().replace("/async/", "/")), sync.json())
+        return asynchronous.json()
+
+    def test_unpaginated_list_matches_the_sync_view(self):
+        body = self.assertSameBody({"division": self.dhaka.pk})
+
+        self.assertEqual(sorted(row["name_en"] for row in body), ["Gazipur", "Narsingdi", "Tangail"])
+
+    def test_paginated_list_matches_the_sync_view(self):
+        with mock.patch.object(ZillaListCreateView, "pagination_class", UserPagination):
+            first = self.assertSameBody({"division": self.dhaka.pk, "page_size": 2})
+            second = self.assertSameBody({"division": self.dhaka.pk, "page_size": 2, "page": 2})
+
+        self.assertEqual(first["count"], 3)
+        self.assertEqual(len(first["results"]), 2)
+        self.assertIsNotNone(first["next"])
+        self.assertEqual(len(second["results"]), 1)
+        self.assertIsNone(second["next"])
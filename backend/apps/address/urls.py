@@ -19,4 +19,16 @@ urlpatterns = [
     path('villages/<int:pk>/', views.VillageDetailView.as_view()),
     path('paras/<int:pk>/', views.ParaDetailView.as_view()),
     path('postoffices/<int:pk>/', views.PostOfficeDetailView.as_view()),
+
+    # Offline sync delta feed
+    path('changes/', views.AddressChangesView.as_view()),
+
+    # Async (ASGI) list variants
+    path('async/divisions/', views.division_list_async),
+    path('async/zillas/', views.zilla_list_async),
+    path('async/upazilas/', views.upazila_list_async),
+    path('async/unions/', views.union_list_async),
+    path('async/villages/', views.village_list_async),
+    path('async/paras/', views.para_list_async),
+    path('async/postoffices/', views.postoffice_list_async),
 ]
@@ -1,5 +1,11 @@
-from rest_framework import generics
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+from rest_framework import generics, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from core.pagination.user_pagination import apaginate_queryset
 from .models import Division, Zilla, Upazila, Union, Village, Para, PostOffice
+from .sync import BadSyncToken, address_changes, read_token
 from .serializers import (
     DivisionSerializer, ZillaSerializer, UpazilaSerializer,
     UnionSerializer, VillageSerializer, ParaSerializer, PostOfficeSerializer
@@ -115,4 +121,46 @@ class VillageDetailView(generics.RetrieveUpdateDestroyAPIView):
 # Para
 class ParaDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Para.objects.all()
-    serializer_class = ParaSerializer
\ No newline at end of file
+    serializer_class = ParaSerializer
+
+# Delta feed for offline clients: rows changed and ids deleted since ?token=
+class AddressChangesView(APIView):
+    def get(self, request):
+        try:
+            since = read_token(request.query_params.get('token'))
+        except BadSyncToken as e:
+            return Response({"status": "error", "message": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        changes, token = address_changes(since)
+        return Response({"token": token, "changes": changes}, status=status.HTTP_200_OK)
+
+
+# Async (ASGI) list variants: read-only, projected straight from the queryset and
+# paginated (or not) by the same pagination class as the sync view they mirror
+def _async_list_view(list_view, filter_param=None):
+    serializer_class = list_view.serializer_class
+    model = serializer_class.Meta.model
+    fields = serializer_class.Meta.fields
+
+    @require_GET
+    async def view(request):
+        queryset = model.objects.all()
+        value = request.GET.get(filter_param) if filter_param else None
+        if value:
+            queryset = queryset.filter(**{f"{filter_param}_id": value})
+        queryset = queryset.values(*fields)
+        if list_view.pagination_class is None:
+            return JsonResponse([row async for row in queryset], safe=False)
+        rows, payload = await apaginate_queryset(queryset, request, list_view.pagination_class)
+        payload["results"] = rows
+        return JsonResponse(payload)
+    view.__name__ = f"{model.__name__.lower()}_list_async"
+    return view
+
+
+division_list_async = _async_list_view(DivisionListCreateView)
+zilla_list_async = _async_list_view(ZillaListCreateView, 'division')
+upazila_list_async = _async_list_view(UpazilaListCreateView, 'zilla')
+union_list_async = _async_list_view(UnionListCreateView, 'upazila')
+postoffice_list_async = _async_list_view(PostOfficeListCreateView, 'union')
+village_list_async = _async_list_view(VillageListCreateView, 'union')
+para_list_async = _async_list_view(ParaListCreateView, 'village')
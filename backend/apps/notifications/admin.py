@@ -0,0 +1,16 @@
+from django.contrib import admin
+from .models import OutboundMessage
+
+
+@admin.register(OutboundMessage)
+class OutboundMessageAdmin(admin.ModelAdmin):
+    list_display = ('channel', 'recipient', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at', 'delivery_status')
+    list_filter = ('channel', 'status', 'delivery_status')
+    search_fields = ('recipient', 'provider_message_id')
+    # bodies hold OTPs and temporary passwords until sent
+    exclude = ('body', 'lease_token')
+    readonly_fields = ('status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at', 'provider_message_id', 'delivery_status', 'delivered_at')
+
+    def has_add_permission(self, request):
+        # messages are only created through apps.notifications.outbox
+        return False
@@ -0,0 +1,170 @@
+"""
+Outbox delivery.
+
+A run claims due messages in batches and hands each batch to its channel's
+sender, which delivers the whole batch over one connection (SMTP) or a few
+multi-recipient requests on pooled connections (SMS, see ``.sms``). Claiming takes a
+lease: the rows move to ``sending`` until ``NOTIFICATION_LEASE_SECONDS`` from
+now, so a worker that dies mid-batch only delays its messages, and concurrent
+workers never claim the same row (``SKIP LOCKED`` where the database has it,
+plus a per-claim token). Failures are retried with exponential backoff and
+jitter; after ``NOTIFICATION_MAX_ATTEMPTS`` attempts a message becomes a dead
+letter and stays in the table for inspection or ``--requeue-dead``. Bodies are blanked once
+sent, and sent or dead rows are purged after ``NOTIFICATION_RETENTION_DAYS``.
+"""
+import logging
+import random
+import smtplib
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection as db_connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import OutboundMessage
+from .sms import get_backend as get_sms_backend
+
+
+logger = logging.getLogger(__name__)
+
+
+def retry_delay(attempts):
+    """Seconds to wait after the ``attempts``-th failed attempt."""
+    delay = min(settings.NOTIFICATION_RETRY_BASE * 2 ** max(attempts - 1, 0), settings.NOTIFICATION_RETRY_MAX)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def _due(now):
+    # pending and due, or claimed by a worker whose lease ran out
+    return Q(status='pending', next_attempt_at__lte=now) | Q(status='sending', next_attempt_at__lte=now)
+
+
+def claim_batch(channel, limit):
+    """Lease up to ``limit`` due messages of ``channel`` to this worker."""
+    now = timezone.now()
+    token = uuid.uuid4().hex
+    with transaction.atomic():
+        # a lease that ran out on the last allowed attempt is not retried again
+        OutboundMessage.objects.filter(
+            _due(now), status='sending', channel=channel, attempts__gte=settings.NOTIFICATION_MAX_ATTEMPTS,
+        ).update(status='dead', last_error='Delivery lease expired', updated=now)
+
+        candidates = OutboundMessage.objects.filter(_due(now), channel=channel).order_by('next_attempt_at')
+        if db_connection.features.has_select_for_update_skip_locked:
+            candidates = candidates.select_for_update(skip_locked=True)
+        ids = list(candidates.values_list('pk', flat=True)[:limit])
+        if not ids:
+            return []
+        OutboundMessage.objects.filter(_due(now), pk__in=ids).update(
+            status='sending',
+            attempts=F('attempts') + 1,
+            next_attempt_at=now + timedelta(seconds=settings.NOTIFICATION_LEASE_SECONDS),
+            lease_token=token,
+            updated=now,
+        )
+    return list(OutboundMessage.objects.filter(pk__in=ids, status='sending', lease_token=token))
+
+
+def send_email_batch(messages):
+    """Send every message over one SMTP connection; returns ``{pk: error or None}``."""
+    outcomes = {}
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as error:
+        return {message.pk: error for message in messages}
+    try:
+        for message in messages:
+            email = EmailMessage(
+                message.subject, message.body, settings.DEFAULT_FROM_EMAIL, [message.recipient],
+                connection=connection,
+            )
+            try:
+                email.send()
+            except smtplib.SMTPServerDisconnected:
+                # the server dropped an idle or long-lived connection; reconnect once
+                try:
+                    connection.close()
+                    connection.open()
+                    email.send()
+                except Exception as error:
+                    outcomes[message.pk] = error
+                    continue
+            except Exception as error:
+                outcomes[message.pk] = error
+                continue
+            outcomes[message.pk] = None
+    finally:
+        connection.close()
+    return outcomes
+
+
+def send_sms_batch(messages):
+    """Hand the batch to ``SMS_BACKEND``; returns ``{pk: error or None}``."""
+    try:
+        backend = get_sms_backend()
+    except Exception as error:
+        return {message.pk: error for message in messages}
+    return backend.send_messages(messages)
+
+
+SENDERS = {
+    'email': send_email_batch,
+    'sms': send_sms_batch,
+}
+
+
+def _record(messages, outcomes):
+    now = timezone.now()
+    for message in messages:
+        error = outcomes.get(message.pk, RuntimeError("No outcome reported"))
+        message.updated = now
+        if error is None:
+            message.status, message.sent_at, message.last_error = 'sent', now, ''
+            # bodies carry OTPs and temporary passwords; nothing needs them once sent
+            message.body = ''
+        elif message.attempts >= settings.NOTIFICATION_MAX_ATTEMPTS or getattr(error, 'permanent', False):
+            message.status, message.last_error = 'dead', repr(error)
+            logger.error(f"Notification {message.pk} to {message.recipient} dead-lettered: {error!r}")
+        else:
+            message.status, message.last_error = 'pending', repr(error)
+            message.next_attempt_at = now + timedelta(seconds=retry_delay(message.attempts))
+    OutboundMessage.objects.bulk_update(
+        messages, ['status', 'body', 'sent_at', 'last_error', 'next_attempt_at', 'provider_message_id', 'updated'],
+    )
+
+
+def deliver_pending(channels=None, batch_size=None, max_batches=None):
+    """Drain the due messages; returns ``{"sent", "retry", "dead"}`` counts for this run."""
+    batch_size = batch_size or settings.NOTIFICATION_BATCH_SIZE
+    totals = {'sent': 0, 'retry': 0, 'dead': 0}
+    for channel in channels or SENDERS:
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            messages = claim_batch(channel, batch_size)
+            if not messages:
+                break
+            batches += 1
+            _record(messages, SENDERS[channel](messages))
+            for message in messages:
+                totals['retry' if message.status == 'pending' else message.status] += 1
+    return totals
+
+
+def purge_finished(days=None):
+    """Delete sent and dead messages last touched more than ``days`` ago; returns the count."""
+    days = settings.NOTIFICATION_RETENTION_DAYS if days is None else days
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = OutboundMessage.objects.filter(status__in=['sent', 'dead'], updated__lt=cutoff).delete()
+    return deleted
+
+
+def requeue_dead(channel=None):
+    """Give every dead letter a fresh set of attempts."""
+    dead = OutboundMessage.objects.filter(status='dead')
+    if channel:
+        dead = dead.filter(channel=channel)
+    return dead.update(status='pending', attempts=0, next_attempt_at=timezone.now(), updated=timezone.now())
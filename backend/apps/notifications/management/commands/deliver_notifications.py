@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.notifications.delivery import SENDERS, deliver_pending, purge_finished, requeue_dead
+
+
+PURGE_INTERVAL = 3600
+
+
+class Command(BaseCommand):
+    help = (
+        "Deliver due messages from the notification outbox in batches, one connection "
+        "per batch. Run once from cron, or with --loop as a long-lived worker. Sent and "
+        "dead messages older than NOTIFICATION_RETENTION_DAYS are purged on the way."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--channel", choices=list(SENDERS), action="append", help="only this channel (repeatable)")
+        parser.add_argument("--batch-size", type=int, default=None, help="messages per connection")
+        parser.add_argument("--loop", action="store_true", help="keep polling instead of exiting when drained")
+        parser.add_argument("--interval", type=float, default=5.0, help="seconds between polls with --loop")
+        parser.add_argument("--requeue-dead", action="store_true", help="retry dead letters before delivering")
+
+    def handle(self, *args, **options):
+        if options["requeue_dead"]:
+            for channel in options["channel"] or [None]:
+                requeued = requeue_dead(channel)
+                self.stdout.write(f"Requeued {requeued} dead letter(s)")
+
+        purged_at = None
+        while True:
+            if purged_at is None or time.monotonic() - purged_at >= PURGE_INTERVAL:
+                purged = purge_finished()
+                purged_at = time.monotonic()
+                if purged:
+                    self.stdout.write(f"Purged {purged} finished message(s)")
+            totals = deliver_pending(channels=options["channel"], batch_size=options["batch_size"])
+            if any(totals.values()) or not options["loop"]:
+                self.stdout.write(
+                    self.style.SUCCESS(f"Sent {totals['sent']}, retrying {totals['retry']}, dead {totals['dead']}")
+                )
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
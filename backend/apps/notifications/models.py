@@ -0,0 +1,61 @@
+from django.db import models
+from django.db.models import Q
+
+from core.utils.modeler import BaseModel
+
+
+class OutboundMessage(BaseModel):
+    """
+    One message to one recipient, written in the same transaction as the change
+    that caused it and delivered later by ``apps.notifications.delivery``.
+    """
+    CHANNELS = (
+        ('email', 'Email'),
+        ('sms', 'SMS'),
+    )
+
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('dead', 'Dead letter'),
+    )
+
+    DELIVERY_CHOICES = (
+        ('delivered', 'Delivered'),
+        ('failed', 'Failed'),
+    )
+
+    channel = models.CharField(max_length=10, choices=CHANNELS, default='email')
+    recipient = models.CharField(max_length=254)
+    subject = models.CharField(max_length=255, blank=True, default='')
+    body = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # pending: not before this; sending: the claim expires (worker died) at this
+    next_attempt_at = models.DateTimeField()
+    # identifies the delivery run holding the claim
+    lease_token = models.CharField(max_length=32, blank=True, default='')
+    last_error = models.TextField(blank=True, default='')
+    sent_at = models.DateTimeField(null=True, blank=True)
+    # gateway's id for the message and what its delivery receipt reported (SMS)
+    provider_message_id = models.CharField(max_length=64, blank=True, default='')
+    delivery_status = models.CharField(max_length=10, choices=DELIVERY_CHOICES, blank=True, default='')
+    delivered_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta(BaseModel.Meta):
+        indexes = [
+            models.Index(
+                fields=['next_attempt_at'],
+                condition=Q(status__in=['pending', 'sending']),
+                name='outbound_due_idx',
+            ),
+            models.Index(
+                fields=['provider_message_id'],
+                condition=~Q(provider_message_id=''),
+                name='outbound_provider_id_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.channel} to {self.recipient}: {self.subject or self.body[:30]} ({self.status})"
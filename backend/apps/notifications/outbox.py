@@ -0,0 +1,46 @@
+"""
+Writing to the notification outbox.
+
+``enqueue()`` only inserts rows, so call it inside the transaction that makes
+the message true (the OTP was stored, the account was created): the message is
+sent if and only if that transaction commits. Once it does, a delivery run is
+kicked on the background executor; ``deliver_notifications`` (or its Celery
+task) picks up anything the kick missed.
+"""
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+
+from core.background import BackgroundQueueFull
+from core.utils.contact import normalize_phone
+
+from .models import OutboundMessage
+
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(channel, recipients, body, subject=''):
+    """Queue ``body`` for each of ``recipients`` on ``channel``; returns the created rows."""
+    if isinstance(recipients, str):
+        recipients = [recipients]
+    if channel == 'sms':
+        recipients = [normalize_phone(recipient) or recipient for recipient in recipients]
+    now = timezone.now()
+    messages = OutboundMessage.objects.bulk_create([
+        OutboundMessage(channel=channel, recipient=recipient, subject=subject, body=body, next_attempt_at=now)
+        for recipient in dict.fromkeys(recipients) if recipient
+    ])
+    if messages:
+        transaction.on_commit(kick_delivery)
+    return messages
+
+
+def kick_delivery():
+    from .tasks import deliver_outbox
+
+    try:
+        deliver_outbox.delay()
+    except BackgroundQueueFull:
+        logger.warning("Background queue full; outbox left for the delivery worker")
@@ -0,0 +1,224 @@
+"""
+SMS delivery backends.
+
+The outbox hands each claimed batch of ``sms`` messages to the backend named
+by ``SMS_BACKEND`` (a dotted path, like ``EMAIL_BACKEND``):
+
+* ``HttpSmsBackend`` talks to a JSON HTTP gateway over a small pool of
+  keep-alive connections. Messages with the same text are merged into one
+  multi-recipient request of up to ``SMS_MAX_RECIPIENTS`` numbers, and at most
+  ``SMS_MAX_CONNECTIONS`` requests per process are in flight at once.
+* ``FakeSmsBackend`` keeps what it "sent" in ``FakeSmsBackend.outbox`` for
+  tests and local development, with gateway ids the receipt endpoint accepts.
+
+Gateway contract (``HttpSmsBackend``)::
+
+    POST SMS_GATEWAY_URL   {"sender": ..., "to": ["8801XXXXXXXXX", ...], "message": ...}
+    200                    {"messages": [{"to": ..., "id": ..., "status": "accepted"|"rejected", "error": ...}]}
+
+Delivery receipts are POSTed back to ``notifications/sms/receipts`` as
+``{"receipts": [{"id": ..., "status": ..., "error": ...}]}``.
+"""
+import http.client
+import itertools
+import json
+import queue
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from core.utils.contact import BD_COUNTRY_CODE, normalize_phone
+
+
+DELIVERED_STATUSES = {'delivered', 'delivrd', 'success'}
+FAILED_STATUSES = {'failed', 'undelivered', 'undeliv', 'rejected', 'expired'}
+
+
+class SmsError(Exception):
+    pass
+
+
+class InvalidRecipient(SmsError):
+    # retrying cannot help; the outbox dead-letters it straight away
+    permanent = True
+
+
+def international(phone):
+    """``01XXXXXXXXX`` as the gateway's ``8801XXXXXXXXX``; None when not a valid number."""
+    phone = normalize_phone(phone)
+    return BD_COUNTRY_CODE + phone[1:] if phone else None
+
+
+def receipt_status(value):
+    """Gateway receipt status as ``"delivered"``, ``"failed"`` or None (still in transit)."""
+    value = str(value or '').strip().lower()
+    if value in DELIVERED_STATUSES:
+        return 'delivered'
+    if value in FAILED_STATUSES:
+        return 'failed'
+    return None
+
+
+class BaseSmsBackend:
+    def __init__(self):
+        self.max_recipients = max(settings.SMS_MAX_RECIPIENTS, 1)
+
+    def send_messages(self, messages):
+        """
+        Deliver outbox ``messages`` to the gateway; returns ``{pk: error or None}``
+        and sets ``provider_message_id`` on the accepted ones.
+        """
+        outcomes = {}
+        requests = []
+        for message in messages:
+            number = international(message.recipient)
+            if number is None:
+                outcomes[message.pk] = InvalidRecipient(f"Invalid phone number {message.recipient!r}")
+            else:
+                requests.append((message.body, number, message))
+
+        for body, group in itertools.groupby(sorted(requests, key=lambda item: item[0]), key=lambda item: item[0]):
+            chunk = {}
+            for _body, number, message in group:
+                # the same number twice in one request would be ambiguous in the reply
+                if number in chunk or len(chunk) >= self.max_recipients:
+                    self._send_chunk(body, chunk, outcomes)
+                    chunk = {}
+                chunk[number] = message
+            if chunk:
+                self._send_chunk(body, chunk, outcomes)
+        return outcomes
+
+    def _send_chunk(self, body, chunk, outcomes):
+        try:
+            results = self.send(body, list(chunk))
+        except Exception as error:
+            for message in chunk.values():
+                outcomes[message.pk] = error
+            return
+        for number, message in chunk.items():
+            provider_id, error = results.get(number, (None, SmsError("Missing from gateway reply")))
+            if error is None:
+                message.provider_message_id = provider_id or ''
+            outcomes[message.pk] = error
+
+    def send(self, body, numbers):
+        """Send one text to ``numbers``; returns ``{number: (provider_id, error or None)}``."""
+        raise NotImplementedError
+
+    def parse_receipts(self, data):
+        """``[(provider_id, "delivered"|"failed"|None, error)]`` from a receipt callback body."""
+        receipts = data.get('receipts', [data]) if isinstance(data, dict) else data
+        parsed = []
+        for receipt in receipts or []:
+            if isinstance(receipt, dict) and receipt.get('id'):
+                parsed.append((str(receipt['id']), receipt_status(receipt.get('status')), str(receipt.get('error') or '')))
+        return parsed
+
+
+class _ConnectionPool:
+    """Keep-alive connections to one host; ``size`` also caps the requests in flight."""
+
+    def __init__(self, url, size, timeout):
+        parts = urlsplit(url)
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.host, self.port = parts.hostname, parts.port
+        self.path = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    @contextmanager
+    def connection(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise SmsError("All SMS gateway connections are busy")
+        try:
+            try:
+                conn, reused = self._idle.get_nowait(), True
+            except queue.Empty:
+                conn, reused = self.connection_class(self.host, self.port, timeout=self.timeout), False
+            try:
+                yield conn, reused
+            except BaseException:
+                conn.close()
+                raise
+            self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    def post(self, payload, headers):
+        body = json.dumps(payload).encode()
+        headers = {'Content-Type': 'application/json', 'Accept': 'application/json', **headers}
+        with self.connection() as (conn, reused):
+            try:
+                conn.request('POST', self.path, body=body, headers=headers)
+                response = conn.getresponse()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                if not reused:
+                    raise
+                # the gateway closed an idle keep-alive connection; retry on a fresh one
+                conn.close()
+                conn.request('POST', self.path, body=body, headers=headers)
+                response = conn.getresponse()
+            data = response.read()
+        if response.status >= 400:
+            raise SmsError(f"Gateway answered {response.status}: {data[:200]!r}")
+        try:
+            return json.loads(data or b'{}')
+        except ValueError:
+            raise SmsError(f"Gateway answered with invalid JSON: {data[:200]!r}")
+
+
+class HttpSmsBackend(BaseSmsBackend):
+    def __init__(self):
+        super().__init__()
+        if not settings.SMS_GATEWAY_URL:
+            raise SmsError("SMS_GATEWAY_URL is not configured")
+        self.pool = _ConnectionPool(settings.SMS_GATEWAY_URL, settings.SMS_MAX_CONNECTIONS, settings.SMS_TIMEOUT)
+
+    def send(self, body, numbers):
+        reply = self.pool.post(
+            {'sender': settings.SMS_SENDER_ID, 'to': numbers, 'message': body},
+            {'Authorization': f'Bearer {settings.SMS_API_KEY}'},
+        )
+        results = {}
+        for item in reply.get('messages', []):
+            number = international(item.get('to'))
+            if str(item.get('status', 'accepted')).lower() == 'rejected':
+                results[number] = (None, SmsError(item.get('error') or "Rejected by gateway"))
+            else:
+                results[number] = (str(item.get('id') or ''), None)
+        return results
+
+
+class FakeSmsBackend(BaseSmsBackend):
+    """Records requests in ``outbox`` instead of sending; numbers in ``fail_numbers`` are rejected."""
+    outbox = []
+    fail_numbers = set()
+    _ids = itertools.count(1)
+
+    def send(self, body, numbers):
+        results = {}
+        for number in numbers:
+            if number in self.fail_numbers:
+                results[number] = (None, SmsError("Rejected by fake gateway"))
+            else:
+                results[number] = (f'fake-{next(self._ids)}', None)
+        self.outbox.append({'to': list(numbers), 'message': body, 'results': results})
+        return results
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend():
+    """The process-wide instance of ``SMS_BACKEND`` (it owns the connection pool)."""
+    path = settings.SMS_BACKEND
+    with _backends_lock:
+        if path not in _backends:
+            _backends[path] = import_string(path)()
+        return _backends[path]
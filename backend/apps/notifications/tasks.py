@@ -0,0 +1,17 @@
+import logging
+
+from core.background import background_task
+
+from .delivery import deliver_pending
+
+
+logger = logging.getLogger(__name__)
+
+
+@background_task("notifications.deliver")
+def deliver_outbox(max_batches=None):
+    """Drain the notification outbox (kicked after each commit that queues messages)."""
+    totals = deliver_pending(max_batches=max_batches)
+    if any(totals.values()):
+        logger.info(f"Outbox delivery: {totals}")
+    return totals
@@ -0,0 +1,207 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core import mail
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import delivery
+from .models import OutboundMessage
+from .outbox import enqueue, kick_delivery
+from .sms import FakeSmsBackend, SmsError
+
+
+def past(seconds=1):
+    return timezone.now() - timedelta(seconds=seconds)
+
+
+@override_settings(
+    EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+    SMS_BACKEND="apps.notifications.sms.FakeSmsBackend",
+    NOTIFICATION_MAX_ATTEMPTS=3,
+    NOTIFICATION_LEASE_SECONDS=300,
+    NOTIFICATION_RETRY_BASE=30,
+    NOTIFICATION_RETRY_MAX=3600,
+)
+class OutboxDeliveryTests(TestCase):
+    def setUp(self):
+        FakeSmsBackend.outbox = []
+        FakeSmsBackend.fail_numbers = set()
+
+    def test_enqueue_skips_blank_and_repeated_recipients(self):
+        messages = enqueue("sms", ["01711111111", "+8801711111111", ""], "Your code is 123456")
+
+        self.assertEqual([message.recipient for message in messages], ["01711111111"])
+        self.assertEqual(messages[0].status, "pending")
+
+    def test_delivery_is_kicked_once_the_transaction_commits(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            enqueue("sms", "01711111111", "Hello")
+            enqueue("sms", [""], "Hello")
+
+        self.assertEqual(callbacks, [kick_delivery])
+
+    def test_claim_leases_rows_to_one_worker(self):
+        enqueue("email", ["a@example.com", "b@example.com"], "Hello", subject="Hi")
+
+        claimed = delivery.claim_batch("email", 10)
+        self.assertEqual(len(claimed), 2)
+        self.assertEqual({message.status for message in claimed}, {"sending"})
+        self.assertEqual({message.attempts for message in claimed}, {1})
+        self.assertEqual(len({message.lease_token for message in claimed}), 1)
+        self.assertTrue(all(message.next_attempt_at > timezone.now() for message in claimed))
+
+        # leased rows are invisible to a second worker until the lease runs out
+        self.assertEqual(delivery.claim_batch("email", 10), [])
+
+    def test_claim_respects_limit_and_channel(self):
+        enqueue("email", ["a@example.com", "b@example.com", "c@example.com"], "Hello")
+        enqueue("sms", "01711111111", "Hello")
+
+        self.assertEqual(len(delivery.claim_batch("email", 2)), 2)
+        self.assertEqual(len(delivery.claim_batch("email", 2)), 1)
+        self.assertEqual([message.channel for message in delivery.claim_batch("sms", 10)], ["sms"])
+
+    def test_expired_lease_is_claimed_again(self):
+        enqueue("email", "a@example.com", "Hello")
+        first = delivery.claim_batch("email", 10)[0]
+        # the worker died; its lease runs out
+        OutboundMessage.objects.filter(pk=first.pk).update(next_attempt_at=past())
+
+        second = delivery.claim_batch("email", 10)
+
+        self.assertEqual([message.pk for message in second], [first.pk])
+        self.assertEqual(second[0].attempts, 2)
+        self.assertNotEqual(second[0].lease_token, first.lease_token)
+
+    def test_expired_lease_on_last_attempt_is_dead_lettered(self):
+        enqueue("email", "a@example.com", "Hello")
+        OutboundMessage.objects.update(status="sending", attempts=3, next_attempt_at=past())
+
+        self.assertEqual(delivery.claim_batch("email", 10), [])
+        message = OutboundMessage.objects.get()
+        self.assertEqual(message.status, "dead")
+        self.assertEqual(message.last_error, "Delivery lease expired")
+
+    def test_sent_message_loses_its_body(self):
+        enqueue("email", "a@example.com", "Your code is 123456", subject="Verify")
+
+        totals = delivery.deliver_pending()
+
+        self.assertEqual(totals, {"sent": 1, "retry": 0, "dead": 0})
+        self.assertEqual(mail.outbox[0].body, "Your code is 123456")
+        message = OutboundMessage.objects.get()
+        self.assertEqual((message.status, message.body), ("sent", ""))
+        self.assertIsNotNone(message.sent_at)
+
+    def test_failure_is_retried_with_backoff_then_dead_lettered(self):
+        enqueue("email", "a@example.com", "Hello")
+        failing = {"email": lambda messages: {message.pk: OSError("connection refused") for message in messages}}
+
+        with mock.patch.dict(delivery.SENDERS, failing):
+            self.assertEqual(delivery.deliver_pending(), {"sent": 0, "retry": 1, "dead": 0})
+            message = OutboundMessage.objects.get()
+            self.assertEqual(message.status, "pending")
+            self.assertIn("connection refused", message.last_error)
+            self.assertGreater(message.next_attempt_at, timezone.now() + timedelta(seconds=20))
+
+            # not due yet
+            self.assertEqual(delivery.deliver_pending(), {"sent": 0, "retry": 0, "dead": 0})
+
+            for expected in ({"sent": 0, "retry": 1, "dead": 0}, {"sent": 0, "retry": 0, "dead": 1}):
+                OutboundMessage.objects.update(next_attempt_at=past())
+                self.assertEqual(delivery.deliver_pending(), expected)
+
+        message = OutboundMessage.objects.get()
+        self.assertEqual((message.status, message.attempts), ("dead", 3))
+
+    def test_retry_delay_grows_and_is_capped(self):
+        with mock.patch("apps.notifications.delivery.random.uniform", return_value=1):
+            self.assertEqual([delivery.retry_delay(attempt) for attempt in (1, 2, 3)], [30, 60, 120])
+            self.assertEqual(delivery.retry_delay(20), 3600)
+
+    def test_requeue_dead_resets_attempts(self):
+        enqueue("email", "a@example.com", "Hello")
+        OutboundMessage.objects.update(status="dead", attempts=3)
+
+        self.assertEqual(delivery.requeue_dead(), 1)
+        self.assertEqual(delivery.deliver_pending(), {"sent": 1, "retry": 0, "dead": 0})
+
+    def test_purge_removes_only_old_finished_messages(self):
+        enqueue("email", ["old@example.com", "new@example.com", "queued@example.com"], "Hello")
+        OutboundMessage.objects.exclude(recipient="queued@example.com").update(status="sent")
+        OutboundMessage.objects.filter(recipient__in=["old@example.com", "queued@example.com"]).update(
+            updated=timezone.now() - timedelta(days=8),
+        )
+
+        self.assertEqual(delivery.purge_finished(days=7), 1)
+        self.assertEqual(
+            set(OutboundMessage.objects.values_list("recipient", flat=True)), {"new@example.com", "queued@example.com"},
+        )
+
+
+@override_settings(
+    SMS_BACKEND="apps.notifications.sms.FakeSmsBackend",
+    SMS_RECEIPT_TOKEN="gateway-secret",
+    NOTIFICATION_MAX_ATTEMPTS=3,
+)
+class SmsDeliveryTests(TestCase):
+    def setUp(self):
+        FakeSmsBackend.outbox = []
+        FakeSmsBackend.fail_numbers = set()
+
+    def test_same_text_is_sent_as_multi_recipient_requests(self):
+        enqueue("sms", ["01711111111", "01711111112", "01711111113"], "Hello")
+        enqueue("sms", "01711111114", "Your code is 123456")
+
+        with override_settings(SMS_MAX_RECIPIENTS=2):
+            outcomes = FakeSmsBackend().send_messages(list(OutboundMessage.objects.order_by("pk")))
+
+        self.assertEqual(set(outcomes.values()), {None})
+        self.assertEqual(
+            [(request["message"], len(request["to"])) for request in FakeSmsBackend.outbox],
+            [("Hello", 2), ("Hello", 1), ("Your code is 123456", 1)],
+        )
+
+    def test_invalid_sms_recipient_is_dead_lettered_at_once(self):
+        enqueue("sms", ["01711111111", "12345"], "Hello")
+
+        self.assertEqual(delivery.deliver_pending(), {"sent": 1, "retry": 0, "dead": 1})
+        self.assertEqual(OutboundMessage.objects.get(recipient="12345").attempts, 1)
+        self.assertEqual(FakeSmsBackend.outbox[0]["to"], ["8801711111111"])
+
+    def test_rejected_sms_is_retried(self):
+        FakeSmsBackend.fail_numbers = {"8801711111111"}
+        enqueue("sms", "01711111111", "Hello")
+
+        self.assertEqual(delivery.deliver_pending(), {"sent": 0, "retry": 1, "dead": 0})
+        self.assertIn(SmsError.__name__, OutboundMessage.objects.get().last_error)
+
+    def test_receipts_update_delivery_status(self):
+        enqueue("sms", ["01711111111", "01711111112"], "Hello")
+        delivery.deliver_pending()
+        delivered, failed = OutboundMessage.objects.order_by("recipient")
+        body = {"receipts": [
+            {"id": delivered.provider_message_id, "status": "DELIVRD"},
+            {"id": failed.provider_message_id, "status": "undelivered", "error": "absent subscriber"},
+        ]}
+
+        response = self.client.post(
+            reverse("sms-receipts"), body, content_type="application/json", HTTP_X_GATEWAY_TOKEN="gateway-secret",
+        )
+
+        self.assertEqual(response.json(), {"status": "success", "received": 2, "updated": 2})
+        delivered.refresh_from_db()
+        failed.refresh_from_db()
+        self.assertEqual(delivered.delivery_status, "delivered")
+        self.assertIsNotNone(delivered.delivered_at)
+        self.assertEqual((failed.delivery_status, failed.last_error), ("failed", "absent subscriber"))
+
+    def test_receipts_need_the_gateway_token(self):
+        response = self.client.post(
+            reverse("sms-receipts"), {"receipts": [{"id": "fake-1", "status": "delivered"}]},
+            content_type="application/json", HTTP_X_GATEWAY_TOKEN="wrong",
+        )
+
+        self.assertEqual(response.status_code, 403)
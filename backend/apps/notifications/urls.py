@@ -0,0 +1,6 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('sms/receipts', views.SmsReceiptView.as_view(), name='sms-receipts'),
+]
@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from rest_framework import status
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .models import OutboundMessage
+from .sms import get_backend
+
+
+class SmsReceiptView(APIView):
+    """
+    Delivery receipts from the SMS gateway. Authenticated by the shared
+    ``SMS_RECEIPT_TOKEN``, sent as the ``X-Gateway-Token`` header or ``?token=``.
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        token = request.headers.get('X-Gateway-Token') or request.query_params.get('token') or ''
+        if not settings.SMS_RECEIPT_TOKEN or not constant_time_compare(token, settings.SMS_RECEIPT_TOKEN):
+            return Response({"status": "error", "message": "Invalid gateway token"}, status=status.HTTP_403_FORBIDDEN)
+
+        receipts = get_backend().parse_receipts(request.data)
+        if not receipts:
+            return Response({"status": "error", "message": "No receipts in request"}, status=status.HTTP_400_BAD_REQUEST)
+
+        now = timezone.now()
+        by_outcome = {}
+        for provider_id, outcome, error in receipts:
+            if outcome is not None:
+                by_outcome.setdefault((outcome, error), []).append(provider_id)
+        updated = 0
+        # one UPDATE per distinct outcome, over the indexed provider id
+        for (outcome, error), provider_ids in by_outcome.items():
+            changes = {'delivery_status': outcome, 'updated': now}
+            if outcome == 'delivered':
+                changes['delivered_at'] = now
+            else:
+                changes['last_error'] = error or 'Reported undelivered by gateway'
+            updated += OutboundMessage.objects.filter(
+                channel='sms', provider_message_id__in=provider_ids,
+            ).update(**changes)
+        return Response({"status": "success", "received": len(receipts), "updated": updated}, status=status.HTTP_200_OK)
@@ -0,0 +1,112 @@
+import csv
+import gzip
+import io
+import os
+from datetime import datetime, time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from apps.payment import partitions
+from apps.payment.models import PaymentLog
+
+
+ARCHIVE_COLUMNS = ("id", "message", "created_at", "created", "updated", "payment_id")
+
+
+class Command(BaseCommand):
+    help = (
+        "Rolling PaymentLog maintenance: create the upcoming monthly partitions, then "
+        "dump every month older than the retention window to a gzipped CSV file and "
+        "remove it from the database (detach + drop on PostgreSQL, DELETE elsewhere). "
+        "Old rows in the default partition are archived the same way."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--keep-months", type=int, default=settings.PAYMENT_LOG_RETENTION_MONTHS,
+            help="months to keep online, counting the current one",
+        )
+        parser.add_argument(
+            "--months-ahead", type=int, default=3, help="future monthly partitions to pre-create",
+        )
+        parser.add_argument(
+            "--output-dir", default=settings.PAYMENT_LOG_ARCHIVE_DIR, help="where the .csv.gz files go",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="only list what would be archived")
+
+    def handle(self, *args, **options):
+        if options["keep_months"] < 1:
+            raise CommandError("--keep-months must be at least 1")
+        this_month = partitions.month_start(timezone.localdate())
+        cutoff = partitions.add_months(this_month, -(options["keep_months"] - 1))
+        os.makedirs(options["output_dir"], exist_ok=True)
+
+        if partitions.is_partitioned():
+            if not options["dry_run"]:
+                for name in partitions.ensure_partitions(
+                    this_month, partitions.add_months(this_month, options["months_ahead"])
+                ):
+                    self.stdout.write(f"created {name}")
+            months = [
+                (name, lower, self._archive_partition)
+                for name, lower, upper in partitions.list_partitions() if upper <= cutoff
+            ]
+            # rows that fell outside every monthly partition age out too
+            if partitions.has_default_rows_before(cutoff):
+                name = f"{partitions.DEFAULT_PARTITION}_before_{cutoff:%Y_%m}"
+                months.append((name, cutoff, self._archive_default))
+        else:
+            months = [(name, month, self._archive_rows) for name, month in self._months_before(cutoff)]
+
+        for name, month, archive in months:
+            path = os.path.join(options["output_dir"], f"{name}.csv.gz")
+            if options["dry_run"]:
+                self.stdout.write(f"would archive {name} -> {path}")
+                continue
+            archive(name, month, path)
+            self.stdout.write(f"archived {name} -> {path}")
+        self.stdout.write(self.style.SUCCESS(f"Archived {len(months)} month(s) older than {cutoff}"))
+
+    def _write_atomically(self, path, write):
+        # dump to a temp file first so a failed run never leaves a truncated archive behind
+        partial = f"{path}.partial"
+        with gzip.open(partial, "wb") as stream:
+            write(stream)
+        os.replace(partial, path)
+
+    def _archive_partition(self, name, month, path):
+        self._write_atomically(path, lambda stream: partitions.copy_table(name, stream))
+        with transaction.atomic():
+            partitions.detach_partition(name)
+            partitions.drop_table(name)
+
+    def _archive_default(self, name, cutoff, path):
+        self._write_atomically(path, lambda stream: partitions.copy_default_rows_before(cutoff, stream))
+        partitions.delete_default_rows_before(cutoff)
+
+    def _months_before(self, cutoff):
+        months = PaymentLog.objects.filter(created__lt=_aware(cutoff)).dates("created", "month")
+        return [(partitions.partition_name(month), month) for month in months]
+
+    def _archive_rows(self, name, month, path):
+        rows = PaymentLog.objects.filter(
+            created__gte=_aware(month), created__lt=_aware(partitions.add_months(month, 1)),
+        ).order_by()
+
+        def write(stream):
+            text = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+            writer = csv.writer(text)
+            writer.writerow(ARCHIVE_COLUMNS)
+            writer.writerows(rows.values_list(*ARCHIVE_COLUMNS).iterator(chunk_size=2000))
+            text.flush()
+            text.detach()
+
+        self._write_atomically(path, write)
+        rows.delete()
+
+
+def _aware(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.3 on 2026-10-18 09:00
+
+from django.db import migrations
+
+
+def partition_paymentlog(apps, schema_editor):
+    from apps.payment.partitions import partition_table
+
+    partition_table(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0002_alter_paymentfee_options_alter_paymentlog_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='paymentlog',
+            options={'ordering': ['-created', '-id']},
+        ),
+        # PostgreSQL only; the partitioned table keeps the same columns, so
+        # reversing leaves it partitioned rather than copying every row back.
+        migrations.RunPython(partition_paymentlog, migrations.RunPython.noop),
+    ]
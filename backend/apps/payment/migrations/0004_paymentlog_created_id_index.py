@@ -0,0 +1,17 @@
+# Generated by Django 5.2.3 on 2026-10-18 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payment', '0003_partition_paymentlog'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='paymentlog',
+            index=models.Index(fields=['-created', '-id'], name='paymentlog_created_id_idx'),
+        ),
+    ]
@@ -31,10 +31,23 @@ class Payment(BaseModel):
         return f"{self.user.email}'s payment of {self.amount} via {self.payment_method}"
 
 class PaymentLog(BaseModel):
+    """
+    Append-only gateway event log. On PostgreSQL the table is range-partitioned
+    by month on ``created`` (see ``apps.payment.partitions``), so always filter
+    on ``created`` to let the planner prune partitions.
+    """
     payment = models.ForeignKey(Payment, on_delete=models.CASCADE, related_name='logs')
     message = models.TextField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True, null=True)
 
+    class Meta(BaseModel.Meta):
+        ordering = ['-created', '-id']
+        indexes = [
+            # keyset pagination of the payment log table; created on the
+            # partitioned parent, so every monthly partition gets its own copy
+            models.Index(fields=['-created', '-id'], name='paymentlog_created_id_idx'),
+        ]
+
 
 class PaymentFee(BaseModel):
     role = models.OneToOneField(Role, on_delete=models.CASCADE, related_name='payment_fee')
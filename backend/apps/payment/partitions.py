@@ -0,0 +1,205 @@
+"""
+Monthly range partitions for ``PaymentLog`` on PostgreSQL.
+
+The parent table ``payment_paymentlog`` is ``PARTITION BY RANGE (created)``
+with one child per calendar month (``payment_paymentlog_p2025_07``) and a
+``_default`` catch-all. Django still sees a plain table with ``id`` as its
+primary key; at the database level the key is ``(id, created)`` because
+PostgreSQL requires the partition column in every unique constraint. The
+``(created, id)`` index from ``PaymentLog.Meta.indexes`` lives on the parent,
+so PostgreSQL adds it to every partition, present and future. On other
+backends the table stays unpartitioned and these helpers fall back to plain
+row ranges.
+"""
+from datetime import date
+
+from django.db import connection, transaction
+
+
+TABLE = "payment_paymentlog"
+DEFAULT_PARTITION = f"{TABLE}_default"
+ID_SEQUENCE = f"{TABLE}_part_id_seq"
+COLUMNS = '"id", "message", "created_at", "created", "updated", "payment_id"'
+
+
+def is_partitioned(using=connection):
+    if using.vendor != "postgresql":
+        return False
+    with using.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid "
+            "WHERE c.relname = %s AND pg_table_is_visible(c.oid)",
+            [TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"{TABLE}_p{month:%Y_%m}"
+
+
+def _create_partition_sql(month):
+    return (
+        f'CREATE TABLE IF NOT EXISTS "{partition_name(month)}" PARTITION OF "{TABLE}" '
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    )
+
+
+def ensure_partitions(start, end, using=connection):
+    """
+    Create the monthly partitions covering ``start`` .. ``end``; returns the names created.
+
+    PostgreSQL refuses to create a partition while the default partition holds
+    rows in its range, so in that case the default is detached for the
+    duration, those rows are moved into the new partitions and it is attached
+    again, all in one transaction.
+    """
+    if not is_partitioned(using):
+        return []
+    existing = {name for name, _, _ in list_partitions(using)}
+    missing = []
+    month = month_start(start)
+    while month <= end:
+        if partition_name(month) not in existing:
+            missing.append(month)
+        month = add_months(month, 1)
+    if not missing:
+        return []
+
+    # existing partitions already take everything else in between
+    lower, upper = missing[0].isoformat(), add_months(missing[-1], 1).isoformat()
+    with transaction.atomic(using=using.alias), using.cursor() as cursor:
+        cursor.execute(
+            f'SELECT 1 FROM "{DEFAULT_PARTITION}" WHERE "created" >= %s AND "created" < %s LIMIT 1',
+            [lower, upper],
+        )
+        stranded = cursor.fetchone() is not None
+        if stranded:
+            cursor.execute(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{DEFAULT_PARTITION}"')
+        for month in missing:
+            cursor.execute(_create_partition_sql(month))
+        if stranded:
+            cursor.execute(
+                f'WITH moved AS (DELETE FROM "{DEFAULT_PARTITION}" '
+                f'WHERE "created" >= %s AND "created" < %s RETURNING {COLUMNS}) '
+                f'INSERT INTO "{TABLE}" ({COLUMNS}) SELECT {COLUMNS} FROM moved',
+                [lower, upper],
+            )
+            cursor.execute(f'ALTER TABLE "{TABLE}" ATTACH PARTITION "{DEFAULT_PARTITION}" DEFAULT')
+    return [partition_name(month) for month in missing]
+
+
+def list_partitions(using=connection):
+    """``(name, lower, upper)`` for every monthly partition, oldest first; the default is skipped."""
+    if not is_partitioned(using):
+        return []
+    with using.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = %s AND c.relname <> %s ORDER BY c.relname",
+            [TABLE, DEFAULT_PARTITION],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    partitions = []
+    for name in names:
+        year, month = name.rsplit("_p", 1)[1].split("_")
+        lower = date(int(year), int(month), 1)
+        partitions.append((name, lower, add_months(lower, 1)))
+    return partitions
+
+
+def detach_partition(name, using=connection):
+    with using.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{name}"')
+
+
+def _copy_out(sql, stream, using):
+    with using.cursor() as cursor:
+        if hasattr(cursor, "copy_expert"):  # psycopg2
+            cursor.copy_expert(sql, stream)
+        else:  # psycopg 3
+            with cursor.copy(sql) as copy:
+                for data in copy:
+                    stream.write(bytes(data))
+
+
+def copy_table(name, stream, using=connection):
+    """Write table ``name`` to the binary ``stream`` as CSV with a header row."""
+    _copy_out(f'COPY "{name}" TO STDOUT WITH (FORMAT csv, HEADER)', stream, using)
+
+
+def has_default_rows_before(day, using=connection):
+    """Whether the default partition holds rows created before ``day``."""
+    with using.cursor() as cursor:
+        cursor.execute(f'SELECT 1 FROM "{DEFAULT_PARTITION}" WHERE "created" < %s LIMIT 1', [day.isoformat()])
+        return cursor.fetchone() is not None
+
+
+def copy_default_rows_before(day, stream, using=connection):
+    """Like ``copy_table`` for the default partition's rows created before ``day``."""
+    _copy_out(
+        f'COPY (SELECT {COLUMNS} FROM "{DEFAULT_PARTITION}" WHERE "created" < \'{day.isoformat()}\') '
+        "TO STDOUT WITH (FORMAT csv, HEADER)",
+        stream, using,
+    )
+
+
+def delete_default_rows_before(day, using=connection):
+    with using.cursor() as cursor:
+        cursor.execute(f'DELETE FROM "{DEFAULT_PARTITION}" WHERE "created" < %s', [day.isoformat()])
+
+
+def drop_table(name, using=connection):
+    with using.cursor() as cursor:
+        cursor.execute(f'DROP TABLE "{name}"')
+
+
+def partition_table(schema_editor, months_ahead=3):
+    """
+    Swap the plain ``payment_paymentlog`` table for a partitioned one, copying
+    every row across. No-op on backends without declarative partitioning.
+    """
+    using = schema_editor.connection
+    if using.vendor != "postgresql" or is_partitioned(using):
+        return
+    today = date.today()
+    with using.cursor() as cursor:
+        cursor.execute(f'SELECT MIN("created") FROM "{TABLE}"')
+        oldest = cursor.fetchone()[0]
+        first = month_start(oldest.date() if oldest else today)
+
+        cursor.execute(f'ALTER TABLE "{TABLE}" RENAME TO "{TABLE}_unpartitioned"')
+        cursor.execute(f'CREATE SEQUENCE "{ID_SEQUENCE}"')
+        cursor.execute(
+            f'CREATE TABLE "{TABLE}" ('
+            f'"id" bigint NOT NULL DEFAULT nextval(\'"{ID_SEQUENCE}"\'), '
+            '"message" text NULL, '
+            '"created_at" timestamp with time zone NULL, '
+            '"created" timestamp with time zone NOT NULL, '
+            '"updated" timestamp with time zone NOT NULL, '
+            '"payment_id" bigint NOT NULL REFERENCES "payments" ("id") DEFERRABLE INITIALLY DEFERRED, '
+            'PRIMARY KEY ("id", "created")'
+            ') PARTITION BY RANGE ("created")'
+        )
+        cursor.execute(f'ALTER SEQUENCE "{ID_SEQUENCE}" OWNED BY "{TABLE}"."id"')
+        cursor.execute(f'CREATE INDEX "{TABLE}_payment_id_idx" ON "{TABLE}" ("payment_id")')
+        cursor.execute(f'CREATE TABLE "{DEFAULT_PARTITION}" PARTITION OF "{TABLE}" DEFAULT')
+
+    ensure_partitions(first, add_months(month_start(today), months_ahead), using)
+
+    with using.cursor() as cursor:
+        cursor.execute(f'INSERT INTO "{TABLE}" ({COLUMNS}) SELECT {COLUMNS} FROM "{TABLE}_unpartitioned"')
+        cursor.execute(
+            f'SELECT setval(\'"{ID_SEQUENCE}"\', COALESCE((SELECT MAX("id") FROM "{TABLE}"), 0) + 1, false)'
+        )
+        cursor.execute(f'DROP TABLE "{TABLE}_unpartitioned"')
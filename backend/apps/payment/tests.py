@@ -1,3 +1,97 @@
+import csv
+import gzip
+import io
+import os
+import tempfile
+import unittest
+import uuid
+from datetime import date, datetime, time
+
+from django.core.management import CommandError, call_command
+from django.db import connection
 from django.test import TestCase
+from django.utils import timezone
+
+from core.utils.testing import make_user
+
+from . import partitions
+from .models import Payment, PaymentLog
+
+
+def month_ago(months):
+    month = partitions.add_months(partitions.month_start(timezone.localdate()), -months)
+    return timezone.make_aware(datetime.combine(month.replace(day=15), time.min))
+
+
+class PartitionHelperTests(unittest.TestCase):
+    def test_month_arithmetic(self):
+        self.assertEqual(partitions.month_start(date(2025, 7, 19)), date(2025, 7, 1))
+        self.assertEqual(partitions.add_months(date(2025, 11, 1), 3), date(2026, 2, 1))
+        self.assertEqual(partitions.add_months(date(2025, 1, 1), -1), date(2024, 12, 1))
+        self.assertEqual(partitions.partition_name(date(2025, 7, 1)), "payment_paymentlog_p2025_07")
+
+
+class ArchivePaymentLogsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = make_user("public", "payer")
+        payment = Payment.objects.create(
+            user=user, amount=100, payment_method="bkash", transaction_id=uuid.uuid4().hex,
+        )
+        cls.logs = {}
+        for months in (0, 1, 5, 6):
+            log = PaymentLog.objects.create(payment=payment, message=f"{months} months ago")
+            PaymentLog.objects.filter(pk=log.pk).update(created=month_ago(months))
+            cls.logs[months] = log
+
+    def setUp(self):
+        output_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(output_dir.cleanup)
+        self.output_dir = output_dir.name
+
+    def archive(self, *args):
+        out = io.StringIO()
+        call_command("archive_payment_logs", "--output-dir", self.output_dir, *args, stdout=out)
+        return out.getvalue()
+
+    def read_archive(self, months):
+        name = partitions.partition_name(month_ago(months).date().replace(day=1))
+        with gzip.open(os.path.join(self.output_dir, f"{name}.csv.gz"), "rt", newline="") as stream:
+            return list(csv.DictReader(stream))
+
+    @unittest.skipIf(connection.vendor == "postgresql", "the partitioned path is covered below")
+    def test_months_past_retention_are_dumped_then_deleted(self):
+        self.archive("--keep-months", "3")
+
+        self.assertEqual(
+            set(PaymentLog.objects.values_list("pk", flat=True)), {self.logs[0].pk, self.logs[1].pk},
+        )
+        for months in (5, 6):
+            rows = self.read_archive(months)
+            self.assertEqual([int(row["id"]) for row in rows], [self.logs[months].pk])
+            self.assertEqual(rows[0]["message"], f"{months} months ago")
+        self.assertEqual(len(os.listdir(self.output_dir)), 2)
+
+    def test_dry_run_changes_nothing(self):
+        output = self.archive("--keep-months", "3", "--dry-run")
+
+        self.assertIn("would archive", output)
+        self.assertEqual(PaymentLog.objects.count(), 4)
+        self.assertEqual(os.listdir(self.output_dir), [])
+
+    def test_keep_months_must_be_positive(self):
+        with self.assertRaises(CommandError):
+            self.archive("--keep-months", "0")
+
+    @unittest.skipUnless(connection.vendor == "postgresql", "declarative partitioning is PostgreSQL only")
+    def test_old_partitions_are_dumped_and_dropped(self):
+        self.assertTrue(partitions.is_partitioned())
+        partitions.ensure_partitions(month_ago(6).date(), timezone.localdate())
+
+        self.archive("--keep-months", "3")
 
-# Create your tests here.
+        names = {name for name, _, _ in partitions.list_partitions()}
+        for months in (5, 6):
+            self.assertNotIn(partitions.partition_name(month_ago(months).date().replace(day=1)), names)
+            self.assertEqual([int(row["id"]) for row in self.read_archive(months)], [self.logs[months].pk])
+        self.assertEqual(PaymentLog.objects.count(), 2)
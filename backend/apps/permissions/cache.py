@@ -0,0 +1,66 @@
+from django.conf import settings
+from django.core.cache import cache
+
+
+PERMISSIONS_VERSION_KEY = "permissions:version"
+ROLE_PERMISSIONS_KEY = "permissions:role:{role_id}:v{version}"
+ROLE_PERMISSIONS_TIMEOUT = 60 * 60 * 24
+
+# Same shape as accounts.serializers.PagePermissionSerializer
+PERMISSION_FIELDS = ("id", "role", "name", "route")
+
+# Backends whose entries (and version bumps) are only visible to this process
+PROCESS_LOCAL_BACKENDS = {"django.core.cache.backends.locmem.LocMemCache"}
+
+
+def shared_timeout(timeout):
+    """``timeout``, capped at LOCAL_CACHE_MAX_TIMEOUT when the default cache is process-local."""
+    if settings.CACHES["default"]["BACKEND"] not in PROCESS_LOCAL_BACKENDS:
+        return timeout
+    return min(timeout, settings.LOCAL_CACHE_MAX_TIMEOUT)
+
+
+def permissions_version():
+    """Current version of the role/permission tables; bumped on every change."""
+    return cache.get_or_set(PERMISSIONS_VERSION_KEY, 1, timeout=None)
+
+
+def bump_permissions_version():
+    cache.add(PERMISSIONS_VERSION_KEY, 1, timeout=None)
+    try:
+        cache.incr(PERMISSIONS_VERSION_KEY)
+    except ValueError:
+        cache.set(PERMISSIONS_VERSION_KEY, 2, timeout=None)
+
+
+def get_role_permissions(role_id):
+    """Serialized page permissions of a role, built once per permissions version."""
+    from .models import PagePermission
+
+    if role_id is None:
+        return []
+    key = ROLE_PERMISSIONS_KEY.format(role_id=role_id, version=permissions_version())
+    permissions = cache.get(key)
+    if permissions is None:
+        permissions = list(
+            PagePermission.objects.filter(role_id=role_id).order_by("id").values(*PERMISSION_FIELDS)
+        )
+        cache.set(key, permissions, timeout=shared_timeout(ROLE_PERMISSIONS_TIMEOUT))
+    return permissions
+
+
+async def aget_role_permissions(role_id):
+    from .models import PagePermission
+
+    if role_id is None:
+        return []
+    version = await cache.aget_or_set(PERMISSIONS_VERSION_KEY, 1, timeout=None)
+    key = ROLE_PERMISSIONS_KEY.format(role_id=role_id, version=version)
+    permissions = await cache.aget(key)
+    if permissions is None:
+        permissions = [
+            permission async for permission in
+            PagePermission.objects.filter(role_id=role_id).order_by("id").values(*PERMISSION_FIELDS)
+        ]
+        await cache.aset(key, permissions, timeout=shared_timeout(ROLE_PERMISSIONS_TIMEOUT))
+    return permissions
@@ -1,5 +1,8 @@
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from apps.accounts.models import Role
+from .cache import bump_permissions_version
 
 # Create your models here.
 class PagePermission(models.Model):
@@ -14,4 +17,11 @@ class PagePermission(models.Model):
         return f"{self.role.name} -> {self.route}"
     
     class Meta:
-        unique_together = ('role', 'route')
\ No newline at end of file
+        unique_together = ('role', 'route')
+
+
+@receiver([post_save, post_delete], sender=PagePermission)
+@receiver([post_save, post_delete], sender=Role)
+def invalidate_role_permissions(sender, **kwargs):
+    # cached permission lists are keyed by version, so a bump orphans all of them
+    bump_permissions_version()
@@ -0,0 +1,105 @@
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+
+COUNTERS_KEY = "counters:{scope}"
+
+APPLICATIONS_SCOPE = "collector-applications"
+SYSTEM_SCOPE = "system:{month}"
+COLLECTOR_SCOPE = "collector:{collector_id}"
+
+
+def _timeout():
+    return getattr(settings, "DASHBOARD_COUNTERS_TIMEOUT", 30)
+
+
+def _key(scope):
+    return COUNTERS_KEY.format(scope=scope)
+
+
+def _system_scope(today=None):
+    today = today or timezone.localdate()
+    return SYSTEM_SCOPE.format(month=today.replace(day=1).isoformat())
+
+
+def get_counters(scope, compute):
+    """Counters of ``scope`` from cache, computed with ``compute()`` on a miss."""
+    key = _key(scope)
+    counters = cache.get(key)
+    if counters is None:
+        counters = compute()
+        cache.set(key, counters, timeout=_timeout())
+    return counters
+
+
+async def aget_counters(scope, acompute):
+    key = _key(scope)
+    counters = await cache.aget(key)
+    if counters is None:
+        counters = await acompute()
+        await cache.aset(key, counters, timeout=_timeout())
+    return counters
+
+
+def collector_application_counters():
+    """Pending review / approved / rejected data collectors in one conditional aggregate."""
+    from apps.accounts.models import User
+
+    def compute():
+        return User.objects.filter(role__name='dataCollector').aggregate(
+            pending_review=Count('id', filter=(
+                Q(approved=False) & Q(rejected=False) & Q(payment_status='Paid') &
+                (Q(email_verified=True) | Q(phone_verified=True))
+            )),
+            approved=Count('id', filter=Q(approved=True)),
+            rejected=Count('id', filter=Q(rejected=True)),
+        )
+
+    return get_counters(APPLICATIONS_SCOPE, compute)
+
+
+def collector_counters(collector_id):
+    """Registrations of one data collector: total / paid / pending / verified."""
+    from apps.accounts.models import CollectorCounter
+
+    return get_counters(
+        COLLECTOR_SCOPE.format(collector_id=collector_id),
+        lambda: CollectorCounter.statistics(collector_id),
+    )
+
+
+async def acollector_counters(collector_id):
+    from apps.accounts.models import CollectorCounter
+
+    return await aget_counters(
+        COLLECTOR_SCOPE.format(collector_id=collector_id),
+        lambda: CollectorCounter.astatistics(collector_id),
+    )
+
+
+def system_counters():
+    """All-time totals plus last month's, served from the daily rollups."""
+    from .rollups import system_totals
+
+    first_day_current_month = timezone.localdate().replace(day=1)
+    first_day_last_month = first_day_current_month - relativedelta(months=1)
+    return get_counters(
+        _system_scope(first_day_current_month),
+        lambda: system_totals(first_day_last_month, first_day_current_month),
+    )
+
+
+def invalidate_counters(system=False, applications=False, collector_ids=()):
+    """Drop the cached scopes once the surrounding transaction commits."""
+    scopes = [COLLECTOR_SCOPE.format(collector_id=collector_id) for collector_id in collector_ids if collector_id]
+    if system:
+        scopes.append(_system_scope())
+    if applications:
+        scopes.append(APPLICATIONS_SCOPE)
+    if scopes:
+        keys = [_key(scope) for scope in scopes]
+        transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,24 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.statistic_table.rollups import rebuild_rollups
+
+
+def _parse_date(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"Invalid date {value!r}, expected YYYY-MM-DD")
+
+
+class Command(BaseCommand):
+    help = "Backfill the daily user and revenue rollups from the source tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", type=_parse_date, default=None, help="first day to rebuild (YYYY-MM-DD)")
+        parser.add_argument("--end", type=_parse_date, default=None, help="last day to rebuild (YYYY-MM-DD)")
+
+    def handle(self, *args, **options):
+        rows = rebuild_rollups(start=options["start"], end=options["end"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} rollup rows"))
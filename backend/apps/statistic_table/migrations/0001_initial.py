@@ -0,0 +1,74 @@
+# Generated by Django 5.2.3 on 2026-10-18 08:12
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def backfill_rollups(apps, schema_editor):
+    User = apps.get_model('accounts', 'User')
+    Payment = apps.get_model('payment', 'Payment')
+    DailyUserRollup = apps.get_model('statistic_table', 'DailyUserRollup')
+    DailyRevenueRollup = apps.get_model('statistic_table', 'DailyRevenueRollup')
+
+    users = (
+        User.objects.annotate(day=TruncDate('created'))
+        .values('day', 'role__name').annotate(count=Count('id')).order_by()
+    )
+    DailyUserRollup.objects.bulk_create(
+        DailyUserRollup(day=row['day'], role=row['role__name'] or '', count=row['count'])
+        for row in users
+    )
+    payments = (
+        Payment.objects.annotate(day=TruncDate('created'))
+        .values('day', 'payment_method').annotate(amount=Sum('amount'), count=Count('id')).order_by()
+    )
+    DailyRevenueRollup.objects.bulk_create(
+        DailyRevenueRollup(day=row['day'], payment_method=row['payment_method'], amount=row['amount'], count=row['count'])
+        for row in payments
+    )
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('accounts', '0020_user_contact_index'),
+        ('payment', '0002_alter_paymentfee_options_alter_paymentlog_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyRevenueRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('day', models.DateField()),
+                ('payment_method', models.CharField(choices=[('bkash', 'bKash'), ('nagad', 'Nagad')], max_length=10)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['day'],
+                'constraints': [models.UniqueConstraint(fields=('day', 'payment_method'), name='unique_daily_revenue_rollup')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyUserRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('day', models.DateField()),
+                ('role', models.CharField(blank=True, default='', max_length=100)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['day'],
+                'constraints': [models.UniqueConstraint(fields=('day', 'role'), name='unique_daily_user_rollup')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,161 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+from django.db.models.base import DEFERRED
+from django.db.models.signals import post_init, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
 
-# Create your models here.
+from core.utils.modeler import BaseModel
+from apps.accounts.models import Role, User
+from apps.payment.models import Payment
+from .counters import invalidate_counters
+
+
+class DailyUserRollup(BaseModel):
+    """New accounts per day and role; summing every day gives the live totals."""
+    day = models.DateField()
+    role = models.CharField(max_length=100, blank=True, default="")
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ["day"]
+        constraints = [
+            models.UniqueConstraint(fields=["day", "role"], name="unique_daily_user_rollup"),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.role or '-'}: {self.count}"
+
+
+class DailyRevenueRollup(BaseModel):
+    """Payments (any status) per day and payment method."""
+    day = models.DateField()
+    payment_method = models.CharField(max_length=10, choices=Payment.PAYMENT_METHODS)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ["day"]
+        constraints = [
+            models.UniqueConstraint(fields=["day", "payment_method"], name="unique_daily_revenue_rollup"),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.payment_method}: {self.amount}"
+
+
+def bump_rollup(model, lookup, **deltas):
+    """Add ``deltas`` to the rollup row identified by ``lookup``, creating it on first use."""
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    increments = {field: F(field) + delta for field, delta in deltas.items()}
+    if model.objects.filter(**lookup).update(updated=timezone.now(), **increments):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **deltas)
+    except IntegrityError:
+        # another writer created the row first
+        model.objects.filter(**lookup).update(updated=timezone.now(), **increments)
+
+
+def _role_name(role_id):
+    if not role_id:
+        return ""
+    return Role.objects.filter(pk=role_id).values_list("name", flat=True).first() or ""
+
+
+# Snapshots are read from __dict__ so instances loaded with only()/defer() don't
+# trigger a query per row; a deferred snapshot means "not loaded, unchanged".
+
+_USER_STATE_FIELDS = (
+    "role_id", "addBy_id", "approved", "rejected", "payment_status", "email_verified", "phone_verified",
+)
+
+
+def _user_state(instance):
+    return tuple(instance.__dict__.get(field, DEFERRED) for field in _USER_STATE_FIELDS)
+
+
+@receiver(post_init, sender=User)
+def remember_user_dashboard_state(sender, instance, **kwargs):
+    instance._dashboard_state = _user_state(instance)
+
+
+@receiver(post_save, sender=User)
+def rollup_user_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old_state, new_state = instance._dashboard_state, _user_state(instance)
+    instance._dashboard_state = new_state
+    old_role_id, role_id = old_state[0], new_state[0]
+    if created:
+        role = instance.role.name if instance.role_id else ""
+        bump_rollup(DailyUserRollup, {"day": timezone.localdate(instance.created), "role": role}, count=1)
+    elif DEFERRED not in (old_role_id, role_id) and old_role_id != role_id:
+        day = timezone.localdate(instance.created)
+        bump_rollup(DailyUserRollup, {"day": day, "role": _role_name(old_role_id)}, count=-1)
+        bump_rollup(DailyUserRollup, {"day": day, "role": _role_name(role_id)}, count=1)
+
+    if created or old_state != new_state:
+        invalidate_counters(system=True, applications=True, collector_ids={old_state[1], new_state[1]} - {DEFERRED})
+
+
+# Deletions are rolled up before the row goes away (still inside the delete's
+# transaction) so deferred fields can be loaded.
+
+@receiver(pre_delete, sender=User)
+def rollup_user_deleted(sender, instance, **kwargs):
+    role_id = instance._dashboard_state[0]
+    if role_id is DEFERRED:
+        role_id = instance.role_id
+    day = timezone.localdate(instance.created)
+    bump_rollup(DailyUserRollup, {"day": day, "role": _role_name(role_id)}, count=-1)
+    invalidate_counters(system=True, applications=True, collector_ids=[instance.addBy_id])
+
+
+# Revenue is every payment whatever its status, the figure the admin statistics
+# have always reported.
+
+def _payment_state(instance):
+    return tuple(instance.__dict__.get(field, DEFERRED) for field in ("amount", "payment_method"))
+
+
+@receiver(post_init, sender=Payment)
+def remember_payment_rollup_state(sender, instance, **kwargs):
+    instance._rollup_state = _payment_state(instance)
+
+
+def _rollup_payment_change(instance, old_state, new_state):
+    """Move the payment's amount/count from ``old_state`` to ``new_state``; None means no row."""
+    day = timezone.localdate(instance.created)
+    old_amount, old_method, old_count = (*old_state, 1) if old_state else (0, instance.payment_method, 0)
+    new_amount, new_method, new_count = (*new_state, 1) if new_state else (0, instance.payment_method, 0)
+    if old_method == new_method:
+        bump_rollup(
+            DailyRevenueRollup, {"day": day, "payment_method": new_method},
+            amount=new_amount - old_amount, count=new_count - old_count,
+        )
+    else:
+        bump_rollup(DailyRevenueRollup, {"day": day, "payment_method": old_method}, amount=-old_amount, count=-old_count)
+        bump_rollup(DailyRevenueRollup, {"day": day, "payment_method": new_method}, amount=new_amount, count=new_count)
+
+
+@receiver(post_save, sender=Payment)
+def rollup_payment_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    old_state = None if created else instance._rollup_state
+    new_state = _payment_state(instance)
+    if DEFERRED not in (old_state or ()) + new_state:
+        _rollup_payment_change(instance, old_state, new_state)
+    if old_state != new_state:
+        invalidate_counters(system=True)
+    instance._rollup_state = new_state
+
+
+@receiver(pre_delete, sender=Payment)
+def rollup_payment_deleted(sender, instance, **kwargs):
+    _rollup_payment_change(instance, (instance.amount, instance.payment_method), None)
+    invalidate_counters(system=True)
@@ -0,0 +1,141 @@
+"""
+Stale-while-revalidate cache for the admin statistic endpoints.
+
+``@stale_while_revalidate`` on an ``APIView.get`` caches successful response
+bodies under the endpoint, the caller's role and the normalized query string:
+
+* younger than ``STATISTICS_CACHE_FRESH`` seconds: served as is (``X-Cache: HIT``);
+* older, but within ``STATISTICS_CACHE_STALE``: served immediately while one
+  background worker recomputes it (``X-Cache: STALE``);
+* missing: one request recomputes under a lock, concurrent ones wait for its
+  result instead of piling onto the database (``X-Cache: MISS``).
+
+Only 200 responses are cached, and the role is part of the key, so a
+permission-denied caller never reads (or seeds) the admin entry.
+
+Use it on aggregate endpoints only: a cached body is up to
+``STATISTICS_CACHE_STALE`` seconds old, which is fine for totals and trends
+but not for tables an admin is editing.
+"""
+import functools
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import RequestFactory
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from core.background import BackgroundQueueFull, run_in_background
+
+
+RESPONSE_KEY = "statistics:response:{digest}"
+LOCK_KEY = "statistics:response-lock:{digest}"
+WAIT_INTERVAL = 0.05
+
+def cache_digest(request):
+    """Endpoint + role + query parameters, order-insensitive and ignoring blank values."""
+    role = getattr(getattr(request.user, "role", None), "name", None)
+    params = sorted(
+        (name, sorted(value for value in request.query_params.getlist(name) if value != ""))
+        for name in request.query_params
+    )
+    params = [(name, values) for name, values in params if values]
+    raw = repr((request.get_host(), request.path, role, params))
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def _store(digest, response):
+    if not isinstance(response, Response) or response.status_code != status.HTTP_200_OK:
+        return
+    entry = {"data": response.data, "computed_at": time.time()}
+    cache.set(RESPONSE_KEY.format(digest=digest), entry, timeout=settings.STATISTICS_CACHE_STALE)
+
+
+def _cached_response(entry, state):
+    response = Response(entry["data"], status=status.HTTP_200_OK)
+    response["X-Cache"] = state
+    response["Age"] = str(int(time.time() - entry["computed_at"]))
+    return response
+
+
+def _snapshot(view, request, args, kwargs):
+    """What a background refresh needs, copied off the live request."""
+    return {
+        "view_class": type(view),
+        "user": request.user,
+        "host": request.get_host(),
+        "path": request.path,
+        "params": request.query_params.copy(),
+        "args": args,
+        "kwargs": kwargs,
+    }
+
+
+def _refresh(get, snapshot, digest):
+    # the original request/view belong to a response that has already been
+    # sent; run the handler on a fresh request built from the snapshot instead
+    lock_key = LOCK_KEY.format(digest=digest)
+    try:
+        wsgi_request = RequestFactory().get(
+            snapshot["path"], data=snapshot["params"], HTTP_HOST=snapshot["host"],
+        )
+        request = Request(wsgi_request)
+        request.user = snapshot["user"]
+        view = snapshot["view_class"]()
+        view.request, view.args, view.kwargs = request, snapshot["args"], snapshot["kwargs"]
+        _store(digest, get(view, request, *snapshot["args"], **snapshot["kwargs"]))
+    finally:
+        cache.delete(lock_key)
+
+
+def _wait_for_entry(digest):
+    deadline = time.monotonic() + settings.STATISTICS_CACHE_LOCK_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_INTERVAL)
+        entry = cache.get(RESPONSE_KEY.format(digest=digest))
+        if entry is not None:
+            return entry
+    return None
+
+
+def stale_while_revalidate(get):
+    @functools.wraps(get)
+    def wrapper(view, request, *args, **kwargs):
+        if not settings.STATISTICS_CACHE_ENABLED:
+            return get(view, request, *args, **kwargs)
+
+        digest = cache_digest(request)
+        lock_key = LOCK_KEY.format(digest=digest)
+        entry = cache.get(RESPONSE_KEY.format(digest=digest))
+
+        if entry is not None:
+            if time.time() - entry["computed_at"] < settings.STATISTICS_CACHE_FRESH:
+                return _cached_response(entry, "HIT")
+            if cache.add(lock_key, 1, timeout=settings.STATISTICS_CACHE_LOCK_TIMEOUT):
+                try:
+                    run_in_background(_refresh, get, _snapshot(view, request, args, kwargs), digest)
+                except BackgroundQueueFull:
+                    # keep serving the stale body; the next request retries the refresh
+                    cache.delete(lock_key)
+            return _cached_response(entry, "STALE")
+
+        if not cache.add(lock_key, 1, timeout=settings.STATISTICS_CACHE_LOCK_TIMEOUT):
+            entry = _wait_for_entry(digest)
+            if entry is not None:
+                return _cached_response(entry, "HIT")
+            # the worker holding the lock is stuck or failed; compute without it
+            response = get(view, request, *args, **kwargs)
+            _store(digest, response)
+            return response
+
+        try:
+            response = get(view, request, *args, **kwargs)
+            _store(digest, response)
+        finally:
+            cache.delete(lock_key)
+        response["X-Cache"] = "MISS"
+        return response
+    return wrapper
@@ -0,0 +1,121 @@
+from datetime import timedelta
+
+from dateutil.relativedelta import relativedelta
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+
+from apps.accounts.models import User
+from apps.payment.models import Payment
+from .models import DailyRevenueRollup, DailyUserRollup
+
+
+TREND_INTERVALS = ("day", "month")
+
+
+def _date_range_filter(prefix, start, end):
+    lookup = {}
+    if start:
+        lookup[f"{prefix}__gte"] = start
+    if end:
+        lookup[f"{prefix}__lte"] = end
+    return lookup
+
+
+@transaction.atomic
+def rebuild_rollups(start=None, end=None):
+    """
+    Recompute the daily rollups from ``User`` and ``Payment`` for ``start``..``end``
+    (inclusive dates, open ended when omitted). Returns the number of rows written.
+    """
+    DailyUserRollup.objects.filter(**_date_range_filter("day", start, end)).delete()
+    DailyRevenueRollup.objects.filter(**_date_range_filter("day", start, end)).delete()
+
+    users = (
+        User.objects.filter(**_date_range_filter("created__date", start, end))
+        .annotate(day=TruncDate("created"))
+        .values("day", "role__name")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+    user_rows = DailyUserRollup.objects.bulk_create(
+        DailyUserRollup(day=row["day"], role=row["role__name"] or "", count=row["count"])
+        for row in users
+    )
+
+    payments = (
+        Payment.objects.filter(**_date_range_filter("created__date", start, end))
+        .annotate(day=TruncDate("created"))
+        .values("day", "payment_method")
+        .annotate(amount=Sum("amount"), count=Count("id"))
+        .order_by()
+    )
+    revenue_rows = DailyRevenueRollup.objects.bulk_create(
+        DailyRevenueRollup(
+            day=row["day"], payment_method=row["payment_method"], amount=row["amount"], count=row["count"]
+        )
+        for row in payments
+    )
+    return len(user_rows) + len(revenue_rows)
+
+
+def system_totals(previous_start, previous_end):
+    """
+    All-time totals plus the totals for accounts/payments created in
+    ``previous_start`` <= day < ``previous_end``; two single-row aggregates.
+    """
+    previous = Q(day__gte=previous_start, day__lt=previous_end)
+    users = DailyUserRollup.objects.exclude(role="admin").aggregate(
+        total_users=Sum("count"),
+        data_collectors=Sum("count", filter=Q(role="dataCollector")),
+        previous_total_users=Sum("count", filter=previous),
+        previous_data_collectors=Sum("count", filter=previous & Q(role="dataCollector")),
+    )
+    revenue = DailyRevenueRollup.objects.aggregate(
+        revenue=Sum("amount"),
+        previous_revenue=Sum("amount", filter=previous),
+    )
+    return {key: value or 0 for key, value in {**users, **revenue}.items()}
+
+
+def _periods(start, end, interval):
+    if interval == "month":
+        period, step = start.replace(day=1), relativedelta(months=1)
+    else:
+        period, step = start, timedelta(days=1)
+    while period <= end:
+        yield period
+        period += step
+
+
+def trend_series(start, end, interval="day"):
+    """Per-period new users, new data collectors and revenue, zero-filled, for start..end."""
+    period = TruncMonth("day") if interval == "month" else F("day")
+    days = Q(day__gte=start, day__lte=end)
+
+    users = {
+        row["period"]: row
+        for row in DailyUserRollup.objects.filter(days).exclude(role="admin")
+        .annotate(period=period).values("period")
+        .annotate(users=Sum("count"), data_collectors=Sum("count", filter=Q(role="dataCollector")))
+        .order_by()
+    }
+    revenue = {
+        row["period"]: row
+        for row in DailyRevenueRollup.objects.filter(days)
+        .annotate(period=period).values("period")
+        .annotate(revenue=Sum("amount"), payments=Sum("count"))
+        .order_by()
+    }
+
+    series = []
+    for day in _periods(start, end, interval):
+        user_row, revenue_row = users.get(day, {}), revenue.get(day, {})
+        series.append({
+            "period": day.isoformat(),
+            "users": user_row.get("users") or 0,
+            "data_collectors": user_row.get("data_collectors") or 0,
+            "revenue": revenue_row.get("revenue") or 0,
+            "payments": revenue_row.get("payments") or 0,
+        })
+    return series
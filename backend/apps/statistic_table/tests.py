@@ -1,3 +1,466 @@
-from django.test import TestCase
+import base64
+import csv
+import gzip
+import io
+import json
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+from urllib.parse import parse_qsl, urlsplit
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from apps.accounts.models import User, UserProfile
+from apps.address.models import Address, Division, Upazila, Zilla
+from apps.payment.models import Payment
+from core.pagination.keyset_pagination import KeysetPagination
+from core.utils.testing import api_client, make_roles, make_user
+
+from .counters import collector_application_counters, collector_counters, system_counters
+from .models import DailyRevenueRollup, DailyUserRollup
+from .rollups import rebuild_rollups, system_totals, trend_series
+
+
+def pay(user, amount, status="completed", method="bkash"):
+    return Payment.objects.create(
+        user=user, amount=Decimal(amount), payment_method=method, status=status, transaction_id=uuid.uuid4().hex,
+    )
+
+
+def cursor(payload):
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        roles = make_roles()
+        created = timezone.now()
+        cls.users = [make_user(roles["public"], f"user{index}") for index in range(7)]
+        # pairs of users share a timestamp so the id tie-breaker matters
+        for index, user in enumerate(cls.users):
+            User.objects.filter(pk=user.pk).update(created=created - timedelta(minutes=index // 2))
+
+    def page(self, params):
+        request = Request(APIRequestFactory().get("/users", params))
+        paginator = KeysetPagination()
+        paginator.page_size = 3
+        rows = paginator.paginate_queryset(User.objects.order_by("-created", "-id"), request)
+        return paginator, [user.pk for user in rows]
+
+    def follow(self, link):
+        return dict(parse_qsl(urlsplit(link).query))
+
+    def test_walks_every_row_once_in_order(self):
+        expected = list(User.objects.order_by("-created", "-id").values_list("pk", flat=True))
+        seen, params = [], {}
+        while True:
+            paginator, ids = self.page(params)
+            seen += ids
+            link = paginator.get_next_link()
+            if link is None:
+                break
+            params = self.follow(link)
+        self.assertEqual(seen, expected)
+
+    def test_previous_link_returns_the_page_before(self):
+        first, first_ids = self.page({})
+        second, _ = self.page(self.follow(first.get_next_link()))
+
+        back, back_ids = self.page(self.follow(second.get_previous_link()))
+
+        self.assertEqual(back_ids, first_ids)
+        self.assertIsNone(back.get_previous_link())
+
+    def test_legacy_page_number_still_served(self):
+        paginator, ids = self.page({"page": 2})
+        self.assertIsNotNone(paginator.legacy)
+        self.assertEqual(len(ids), 3)
+
+
+class MalformedCursorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_user("admin", "admin", email="admin@example.com")
+
+    def setUp(self):
+        self.api = api_client(self.admin)
+
+    def test_malformed_cursors_are_not_found(self):
+        malformed = [
+            "not-base64!",
+            base64.urlsafe_b64encode(b"not json").decode(),
+            cursor([1, 2]),
+            cursor({"p": 5, "r": 0}),
+            cursor({"p": ["2025-01-01T00:00:00+00:00"], "r": 0}),
+            cursor({"p": ["yesterday", 1], "r": 0}),
+            cursor({"p": ["2025-01-01T00:00:00+00:00", "x"], "r": 0}),
+            cursor({"p": ["2025-01-01T00:00:00+00:00", None], "r": 0}),
+            cursor({"p": [["2025"], 1], "r": 0}),
+        ]
+        for value in malformed:
+            with self.subTest(cursor=value):
+                response = self.api.get(reverse("payment-log-table-view"), {"cursor": value})
+                self.assertEqual(response.status_code, 404)
+
+    def test_well_formed_cursor_is_served(self):
+        response = self.api.get(
+            reverse("payment-log-table-view"), {"cursor": cursor({"p": ["2030-01-01T00:00:00+00:00", 1], "r": 0})},
+        )
+        self.assertEqual(response.status_code, 200)
+
+
+class RollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.roles = make_roles()
+
+    def snapshot(self):
+        users = {(row.day, row.role): row.count for row in DailyUserRollup.objects.exclude(count=0)}
+        revenue = {
+            (row.day, row.payment_method): (row.amount, row.count)
+            for row in DailyRevenueRollup.objects.exclude(count=0)
+        }
+        return users, revenue
+
+    def test_incremental_rollups_match_a_rebuild(self):
+        collector = User.objects.create_user(username="c", password=None, role=self.roles["dataCollector"])
+        public = User.objects.create_user(username="p", password=None, role=self.roles["public"])
+        moved = User.objects.create_user(username="m", password=None, role=self.roles["public"])
+        moved.role = self.roles["subUser"]
+        moved.save()
+
+        pending = pay(public, "100.00", status="pending")
+        pay(public, "250.00")
+        pending.amount = Decimal("120.00")
+        pending.status = "completed"
+        pending.save()
+        switched = pay(collector, "60.00", status="failed")
+        switched.payment_method = "nagad"
+        switched.save()
+        refunded = pay(collector, "40.00", method="nagad")
+        refunded.delete()
+        User.objects.create_user(username="gone", password=None, role=self.roles["public"]).delete()
+
+        incremental = self.snapshot()
+        rebuild_rollups()
+        self.assertEqual(self.snapshot(), incremental)
+
+        today = timezone.localdate()
+        self.assertEqual(incremental[0][(today, "subUser")], 1)
+        self.assertEqual(incremental[1][(today, "bkash")], (Decimal("370.00"), 2))
+        self.assertEqual(incremental[1][(today, "nagad")], (Decimal("60.00"), 1))
+
+    def test_revenue_counts_payments_of_every_status(self):
+        public = User.objects.create_user(username="p", password=None, role=self.roles["public"])
+        for status in ("pending", "completed", "failed"):
+            pay(public, "10.00", status=status)
+
+        today = timezone.localdate()
+        totals = system_totals(today - timedelta(days=31), today - timedelta(days=1))
+
+        self.assertEqual(totals["revenue"], sum(Payment.objects.values_list("amount", flat=True)))
+        self.assertEqual(totals["revenue"], Decimal("30.00"))
+
+    def test_totals_and_trend_read_the_rollups(self):
+        User.objects.create_user(username="c", password=None, role=self.roles["dataCollector"])
+        public = User.objects.create_user(username="p", password=None, role=self.roles["public"])
+        pay(public, "100.00")
+        today = timezone.localdate()
+
+        totals = system_totals(today - timedelta(days=31), today - timedelta(days=1))
+        self.assertEqual((totals["total_users"], totals["data_collectors"], totals["revenue"]), (2, 1, Decimal("100.00")))
+        self.assertEqual(totals["previous_total_users"], 0)
+
+        series = trend_series(today - timedelta(days=2), today)
+        self.assertEqual([point["users"] for point in series], [0, 0, 2])
+        self.assertEqual(series[-1]["revenue"], Decimal("100.00"))
+
+        months = trend_series(date(today.year, today.month, 1), today, interval="month")
+        self.assertEqual(len(months), 1)
+        self.assertEqual(months[0]["data_collectors"], 1)
+
+
+class PendingApplicationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.roles = make_roles()
+        cls.admin = make_user(cls.roles["admin"], "admin", email="admin@example.com")
+        division = Division.objects.create(name_en="Dhaka", name_bn="ঢাকা")
+        cls.gazipur = Zilla.objects.create(name_en="Gazipur", name_bn="গাজীপুর", division=division)
+        tangail = Zilla.objects.create(name_en="Tangail", name_bn="টাঙ্গাইল", division=division)
+        kaliakair = Upazila.objects.create(name_en="Kaliakair", name_bn="কালিয়াকৈর", zilla=cls.gazipur)
+
+        cls.applicants = []
+        for index, (zilla, approved) in enumerate([(cls.gazipur, False), (tangail, False), (cls.gazipur, True)]):
+            applicant = make_user(
+                cls.roles["dataCollector"], f"applicant-{index}", email=f"applicant-{index}@example.com",
+                email_verified=True, payment_status="Paid", approved=approved,
+            )
+            address = Address.objects.create(division=division, zilla=zilla, upazila=kaliakair)
+            UserProfile.objects.create(
+                user=applicant, name_en=f"Applicant {index}", name_bn="আবেদনকারী", nid=f"100{index}", address=address,
+            )
+            pay(applicant, "100.00")
+            cls.applicants.append(applicant)
+        # the newest payment is the one shown
+        latest = pay(cls.applicants[0], "500.00")
+        Payment.objects.filter(pk=latest.pk).update(created=timezone.now() + timedelta(minutes=1))
+        # not applicants: unpaid, or unverified
+        make_user(cls.roles["dataCollector"], "unpaid", email="unpaid@example.com", email_verified=True)
+        make_user(cls.roles["dataCollector"], "unverified", email="unverified@example.com", payment_status="Paid")
+
+    def setUp(self):
+        self.api = api_client(self.admin)
+
+    def get(self, **params):
+        response = self.api.get(reverse("pending-application-table-view"), params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_rows_carry_the_latest_payment_and_address(self):
+        rows = {row["id"]: row for row in self.get()["results"]}
+
+        self.assertEqual(set(rows), {applicant.pk for applicant in self.applicants})
+        first = rows[self.applicants[0].pk]
+        self.assertEqual(first["paidAmount"], Decimal("500.00"))
+        self.assertEqual((first["district"], first["upazila"], first["nidNumber"]), ("Gazipur", "Kaliakair", "1000"))
+
+    def test_status_and_district_filters(self):
+        pending_in_gazipur = self.get(status="Pending", district=str(self.gazipur.pk))["results"]
+        by_name = self.get(status="Pending", district="gazipur")["results"]
+
+        self.assertEqual([row["id"] for row in pending_in_gazipur], [self.applicants[0].pk])
+        self.assertEqual(by_name, pending_in_gazipur)
+
+    def test_keyset_pages_cost_the_same_queries_whatever_their_size(self):
+        self.get()  # warm the principal cache
+
+        with CaptureQueriesContext(connection) as single:
+            self.get(page_size=1)
+        with CaptureQueriesContext(connection) as full:
+            page = self.get(page_size=3)
+
+        self.assertEqual(len(full), len(single))
+        self.assertEqual(len(page["results"]), 3)
+        self.assertNotIn("count", page)
+
+    def test_next_link_walks_every_applicant_once(self):
+        seen, params = [], {"page_size": 2}
+        while True:
+            page = self.get(**params)
+            seen += [row["id"] for row in page["results"]]
+            if page["next"] is None:
+                break
+            params = dict(parse_qsl(urlsplit(page["next"]).query))
+
+        self.assertEqual(sorted(seen), sorted(applicant.pk for applicant in self.applicants))
+        self.assertEqual(len(seen), 3)
+
+
+class FamilyRelationshipTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.roles = make_roles()
+        cls.admin = make_user(cls.roles["admin"], "admin", email="admin@example.com")
+        cls.collectors = [
+            make_user(cls.roles["dataCollector"], f"collector-{index}", email=f"collector-{index}@example.com")
+            for index in range(3)
+        ]
+        cls.households = {}
+        for collector in cls.collectors:
+            for index in range(2):
+                head = make_user(cls.roles["public"], f"{collector.username}-head-{index}", addBy=collector)
+                members = [
+                    make_user(cls.roles["subUser"], f"{head.username}-member-{member}", parent=head)
+                    for member in range(index + 1)
+                ]
+                cls.households[head.pk] = [member.pk for member in members]
+
+    def setUp(self):
+        self.api = api_client(self.admin)
+
+    def get(self, **params):
+        response = self.api.get(reverse("family-relationship-view"), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return json.loads(b"".join(response.streaming_content))
+
+    def test_one_query_per_level_whatever_the_tree_size(self):
+        self.get()  # warm the principal cache
+
+        with self.assertNumQueries(3):
+            body = self.get()
+
+        self.assertEqual(len(body["results"]), 3)
+
+    def test_tree_follows_the_page_order(self):
+        body = self.get(page_size=2)
+
+        # newest collectors first, like every keyset page
+        self.assertEqual(
+            [node["collector"]["id"] for node in body["results"]], [self.collectors[2].pk, self.collectors[1].pk],
+        )
+        self.assertIsNotNone(body["next"])
+        for node in body["results"]:
+            households = {
+                family["public_user"]["id"]: [member["id"] for member in family["sub_accounts"]]
+                for family in node["public_users"]
+            }
+            self.assertEqual(households, {
+                head: members for head, members in self.households.items()
+                if User.objects.get(pk=head).addBy_id == node["collector"]["id"]
+            })
+        head = body["results"][0]["public_users"][1]["public_user"]
+        self.assertEqual(head["childCount"], 2)
+        self.assertEqual(
+            set(head), {"id", "name", "email", "phone", "payment_status", "is_active", "date_joined", "childCount"},
+        )
+
+    def test_collector_without_registrations_has_an_empty_subtree(self):
+        newcomer = make_user(self.roles["dataCollector"], "newcomer", email="newcomer@example.com")
+
+        body = self.get(page_size=1)
+
+        self.assertEqual(body["results"][0]["collector"]["id"], newcomer.pk)
+        self.assertEqual(body["results"][0]["public_users"], [])
+
+
+class CounterCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.roles = make_roles()
+        cls.collector = make_user(cls.roles["dataCollector"], "collector", email="collector@example.com")
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cached_counters_cost_no_query(self):
+        collector_application_counters()
+
+        with self.assertNumQueries(0):
+            collector_application_counters()
+
+    def test_approval_invalidates_once_committed(self):
+        applicant = make_user(
+            self.roles["dataCollector"], "applicant", email="applicant@example.com",
+            email_verified=True, payment_status="Paid",
+        )
+        self.assertEqual(collector_application_counters()["pending_review"], 1)
+
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            applicant.approved = True
+            applicant.save()
+            # nothing committed yet: readers still get the cached figures
+            self.assertEqual(collector_application_counters()["pending_review"], 1)
+        for callback in callbacks:
+            callback()
+
+        self.assertEqual(collector_application_counters(), {"pending_review": 0, "approved": 1, "rejected": 0})
+
+    def test_registration_and_payment_invalidate_their_scopes(self):
+        self.assertEqual(collector_counters(self.collector.pk)["total"], 0)
+        self.assertEqual(system_counters()["revenue"], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            public = make_user(self.roles["public"], "public", addBy=self.collector)
+        with self.captureOnCommitCallbacks(execute=True):
+            pay(public, "100.00")
+
+        self.assertEqual(collector_counters(self.collector.pk)["total"], 1)
+        self.assertEqual(system_counters()["revenue"], Decimal("100.00"))
+
+
+class TableExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.roles = make_roles()
+        cls.admin = make_user(cls.roles["admin"], "admin", email="admin@example.com")
+        cls.user = make_user(cls.roles["public"], "user", first_name="=HYPERLINK(\"http://x\")", last_name="-1+2")
+
+    def setUp(self):
+        self.api = api_client(self.admin)
+
+    def export(self, export_format):
+        response = self.api.get(reverse("user-table-export", args=[export_format]))
+        self.assertEqual(response.status_code, 200)
+        return b"".join(response.streaming_content)
+
+    def test_csv_cells_cannot_start_a_formula(self):
+        rows = {row["id"]: row for row in csv.DictReader(io.StringIO(self.export("csv").decode()))}
+
+        row = rows[str(self.user.pk)]
+        self.assertEqual(row["first_name"], "'=HYPERLINK(\"http://x\")")
+        self.assertEqual(row["last_name"], "'-1+2")
+
+    def test_jsonl_keeps_the_raw_values(self):
+        lines = gzip.decompress(self.export("jsonl")).decode().splitlines()
+        rows = {row["id"]: row for row in map(json.loads, lines)}
+
+        self.assertEqual(rows[self.user.pk]["first_name"], "=HYPERLINK(\"http://x\")")
+        self.assertEqual(rows[self.user.pk]["last_name"], "-1+2")
+
+
+def run_now(fn, *args, **kwargs):
+    return fn(*args, **kwargs)
+
+
+@override_settings(STATISTICS_CACHE_ENABLED=True, STATISTICS_CACHE_FRESH=60, STATISTICS_CACHE_STALE=300)
+@mock.patch("apps.statistic_table.response_cache.run_in_background", side_effect=run_now)
+class StaleWhileRevalidateTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.roles = make_roles()
+        cls.admin = make_user(cls.roles["admin"], "admin", email="admin@example.com")
+
+    def setUp(self):
+        cache.clear()
+        self.api = api_client(self.admin)
+
+    def get(self, api=None):
+        return (api or self.api).get(reverse("system-statistics"))
+
+    def register(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            make_user(self.roles["public"], f"user-{User.objects.count()}")
+
+    def test_fresh_body_is_served_from_cache(self, refresh):
+        first = self.get()
+        self.register()
+        second = self.get()
+
+        self.assertEqual((first["X-Cache"], second["X-Cache"]), ("MISS", "HIT"))
+        self.assertEqual(second.data, first.data)
+        refresh.assert_not_called()
+
+    def test_stale_body_is_served_while_it_is_refreshed(self, refresh):
+        first = self.get()
+        self.register()
+
+        with override_settings(STATISTICS_CACHE_FRESH=0):
+            stale = self.get()
+        refreshed = self.get()
+
+        self.assertEqual(stale["X-Cache"], "STALE")
+        self.assertEqual(stale.data, first.data)
+        refresh.assert_called_once()
+        self.assertEqual(refreshed["X-Cache"], "HIT")
+        self.assertNotEqual(refreshed.data, first.data)
+
+    def test_denied_callers_neither_read_nor_seed_the_cache(self, refresh):
+        self.get()
+        collector = api_client(make_user(self.roles["dataCollector"], "collector", email="collector@example.com"))
+
+        denied = [self.get(collector) for _ in range(2)]
+
+        self.assertEqual([response.status_code for response in denied], [403, 403])
+        # never served from the admin's entry, and never stored
+        self.assertEqual([response["X-Cache"] for response in denied], ["MISS", "MISS"])
@@ -3,10 +3,13 @@ from . import views
 
 urlpatterns = [
     path('system-statistics', views.systemStatistic.as_view(), name='system-statistics'),
+    path('system-statistics/trend', views.SystemStatisticTrendView.as_view(), name='system-statistics-trend'),
     path('user-table', views.UserTableView.as_view(), name='user-table-view'),
+    path('user-table/export/<str:export_format>', views.UserTableExportView.as_view(), name='user-table-export'),
     path('collector-table', views.CollectorTableView.as_view(), name='collector-table-view'),
     path('pending-application-table', views.PendingApplicationTableView.as_view(), name='pending-application-table-view'),
     path('payment-log-table', views.PaymentLogTableView.as_view(), name='payment-log-table-view'),
+    path('payment-log-table/export/<str:export_format>', views.PaymentLogTableExportView.as_view(), name='payment-log-table-export'),
     path('family-relationship', views.FamilyRelationshipView.as_view(), name='family-relationship-view'),
     path('collector-app-statistic', views.CollectorAppStatisticView.as_view(), name='data-collector-app-statistic-view'),
 ]
\ No newline at end of file
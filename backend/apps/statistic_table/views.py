@@ -4,55 +4,54 @@ from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 
 from core.authentication.auth import JWTAuthentication
-from core.pagination.user_pagination import UserPagination
+from core.pagination.keyset_pagination import KeysetPagination
+from core.utils.export import EXPORT_FORMATS, streaming_export
 
-from apps.accounts.models import User
+from apps.accounts.models import User, counters_enabled
+from apps.accounts.search import search_users
 from apps.accounts.serializers import UserSerializer
 from apps.payment.models import PaymentLog, Payment
+from apps.payment.partitions import add_months, month_start
 from apps.payment.serializers import PaymentLogSerializer
+from .response_cache import stale_while_revalidate
+from .counters import collector_application_counters, system_counters
+from .rollups import TREND_INTERVALS, trend_series
 
+import json
+from itertools import groupby
+from operator import itemgetter
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
 from django.utils import timezone
-from datetime import timedelta
-from django.db.models import Q, Sum
+from datetime import date, datetime, time, timedelta
+from django.db.models import Case, Count, IntegerField, OuterRef, Q, Subquery, When
+from django.db.models.functions import Coalesce
 from django.utils.timezone import now
-from dateutil.relativedelta import relativedelta
 
 
 class systemStatistic(APIView):
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
 
+    @stale_while_revalidate
     def get(self, request):
         user_role = request.user.role.name
         if user_role != 'admin':
             return Response({"status": "error", "message": "Permission denied"}, status=status.HTTP_403_FORBIDDEN)
 
-        today = now().date()
-        first_day_current_month = today.replace(day=1)
-        first_day_last_month = first_day_current_month - relativedelta(months=1)
+        totals = system_counters()
 
         # Current counts
-        current_total_users = User.objects.exclude(role__name__in=['admin',]).count()
-        current_data_collectors = User.objects.filter(role__name='dataCollector').count()
-        current_revenue = Payment.objects.aggregate(total=Sum('amount'))['total'] or 0
+        current_total_users = totals["total_users"]
+        current_data_collectors = totals["data_collectors"]
+        current_revenue = totals["revenue"]
 
         # Last month counts
-        last_total_users = User.objects.filter(
-            created__gte=first_day_last_month,
-            created__lt=first_day_current_month
-
-        ).exclude(role__name__in=['admin']).count()
-
-        last_data_collectors = User.objects.filter(
-            role__name='dataCollector',
-            created__gte=first_day_last_month,
-            created__lt=first_day_current_month
-        ).count()
-
-        last_revenue = Payment.objects.filter(
-            created__gte=first_day_last_month,
-            created__lt=first_day_current_month
-        ).aggregate(total=Sum('amount'))['total'] or 0
+        last_total_users = totals["previous_total_users"]
+        last_data_collectors = totals["previous_data_collectors"]
+        last_revenue = totals["previous_revenue"]
 
         def format_percent(current, last):
             if last == 0 and current == 0:
@@ -84,10 +83,73 @@ class systemStatistic(APIView):
         return Response({"data": stats}, status=status.HTTP_200_OK)
 
 
+class SystemStatisticTrendView(APIView):
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+    max_days = {"day": 366, "month": 366 * 5}
+
+    @stale_while_revalidate
+    def get(self, request):
+        user_role = request.user.role.name
+        if user_role != 'admin':
+            return Response({"status": "error", "message": "Permission denied"}, status=status.HTTP_403_FORBIDDEN)
+
+        interval = request.query_params.get('interval', 'day')
+        if interval not in TREND_INTERVALS:
+            return Response({"status": "error", "message": f"interval must be one of {', '.join(TREND_INTERVALS)}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            end = date.fromisoformat(request.query_params['end']) if request.query_params.get('end') else now().date()
+            start = date.fromisoformat(request.query_params['start']) if request.query_params.get('start') else end - timedelta(days=29)
+        except ValueError:
+            return Response({"status": "error", "message": "start and end must be dates (YYYY-MM-DD)"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if start > end:
+            return Response({"status": "error", "message": "start must not be after end"}, status=status.HTTP_400_BAD_REQUEST)
+        if (end - start).days >= self.max_days[interval]:
+            return Response({"status": "error", "message": f"Range too large for {interval} interval"}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(
+            {"start": start, "end": end, "interval": interval, "data": trend_series(start, end, interval)},
+            status=status.HTTP_200_OK,
+        )
+
+
+def _user_table_queryset(params):
+    """Non-admin users filtered by the user-table query parameters (roleName, status, term)."""
+    users = User.objects.all().exclude(role__name__in=['admin']).order_by('-id')
+    role = params.get('roleName', None)
+    stats = params.get('status', None)
+    term = params.get('term', None)
+
+    match role:
+        case 'subUser':
+            users = users.filter(Q(role__name__icontains=role))
+        case 'publicUser':
+            users = users.filter(Q(role__name__icontains=role))
+        case 'dataCollector':
+            users = users.filter(Q(role__name__icontains=role))
+
+    match stats:
+        case 'Paid':
+            users = users.filter(Q(payment_status=stats))
+        case 'Pending':
+            users = users.filter(Q(payment_status=stats))
+        case 'verified':
+            users = users.filter(Q(email_verified=True) | Q(phone_verified=True))
+        case 'unverified':
+            users = users.filter(Q(email_verified=False) & Q(phone_verified=False))
+
+    if term:
+        # id / phone / email are exact probes, anything else a ranked trigram search
+        users = search_users(users, term)
+    return users
+
+
 class UserTableView(APIView):
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
-    pagination_class = UserPagination
+    pagination_class = KeysetPagination
 
     def get(self, request):
         user_role = request.user.role.name
@@ -96,41 +158,7 @@ class UserTableView(APIView):
                 {"status": "error", "message": "Permission denied"},
                 status=status.HTTP_403_FORBIDDEN
             )
-        users = User.objects.all().exclude(role__name__in=['admin']).order_by('-id')
-        role = request.query_params.get('roleName', None)
-        stats = request.query_params.get('status', None)
-        term = request.query_params.get('term', None)
-
-
-        match role:
-            
-            case 'subUser':
-                users = users.filter(Q(role__name__icontains=role))
-            case 'publicUser':
-                users = users.filter(Q(role__name__icontains=role))
-            case 'dataCollector':
-                print("role", role)
-                users = users.filter(Q(role__name__icontains=role))
-
-        match stats:
-            case 'Paid':
-                users = users.filter(Q(payment_status=stats))
-            case 'Pending':
-                users = users.filter(Q(payment_status=stats))
-            case 'verified':
-                users = users.filter(Q(email_verified=True) | Q(phone_verified=True))
-            case 'unverified':
-                users = users.filter(Q(email_verified=False) & Q(phone_verified=False))
-            
-
-        if term:
-            try:
-                # Try to filter by ID first
-                term_id = int(term)
-                users = users.filter(Q(pk=term_id))
-            except ValueError:
-                # If not an ID, try filtering by email or phone
-                users = users.filter(Q(email__icontains=term) | Q(phone__icontains=term) | Q(first_name__icontains=term) | Q(last_name__icontains=term))
+        users = _user_table_queryset(request.query_params)
 
         paginator = self.pagination_class()
         result_page = paginator.paginate_queryset(users, request)
@@ -175,7 +203,7 @@ class UserTableView(APIView):
 class CollectorTableView(APIView):
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
-    pagination_class = UserPagination
+    pagination_class = KeysetPagination
 
     def get(self, request):
         user_role = request.user.role.name
@@ -183,12 +211,16 @@ class CollectorTableView(APIView):
             return Response({"status": "error", "message": "Permission denied"}, status=status.HTTP_403_FORBIDDEN)
             
         collectors = User.objects.filter(role__name='dataCollector')
+        if counters_enabled():
+            collectors = collectors.annotate(total_registrations=Coalesce('registration_counter__total', 0))
+        else:
+            collectors = collectors.annotate(total_registrations=Count('added_by'))
         paginator = self.pagination_class()
         result_page = paginator.paginate_queryset(collectors, request)
 
         data = []
         for collector in result_page:
-            total_registrations = User.objects.filter(addBy=collector).count()
+            total_registrations = collector.total_registrations
             verified_status = collector.email_verified or collector.phone_verified
             
             data.append({
@@ -201,9 +233,14 @@ class CollectorTableView(APIView):
             })
         return paginator.get_paginated_response(data)
 
+class ApplicationPagination(KeysetPagination):
+    page_size = 10
+
+
 class PendingApplicationTableView(APIView):
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = ApplicationPagination
 
     def get(self, request):
         if getattr(request.user.role, "name", None) != 'admin':
@@ -212,90 +249,244 @@ class PendingApplicationTableView(APIView):
                 status=status.HTTP_403_FORBIDDEN
             )
 
+        # Latest payment per applicant, resolved inside the same query
+        latest_payment = Payment.objects.filter(user=OuterRef('pk')).order_by('-created')
+
         pending_applications = User.objects.filter(
             (Q(email_verified=True) | Q(phone_verified=True)) &
             Q(payment_status='Paid') &
             Q(role__name='dataCollector')
-        ).select_related('role')  # Optimize DB hit for role access
+        ).annotate(
+            paid_amount=Subquery(latest_payment.values('amount')[:1]),
+            paid_at=Subquery(latest_payment.values('created')[:1]),
+        ).values(
+            'id', 'first_name', 'last_name', 'email', 'phone', 'created', 'approved', 'rejected',
+            'payment_status', 'role__name', 'profile__nid',
+            'profile__address__zilla__name_en', 'profile__address__upazila__name_en',
+            'paid_amount', 'paid_at',
+        )
+
+        application_status = request.query_params.get('status')
+        match application_status:
+            case 'Approved':
+                pending_applications = pending_applications.filter(approved=True)
+            case 'Rejected':
+                pending_applications = pending_applications.filter(rejected=True)
+            case 'Pending':
+                pending_applications = pending_applications.filter(approved=False, rejected=False)
 
-        data = []
+        district = request.query_params.get('district')
+        if district:
+            if district.isdigit():
+                pending_applications = pending_applications.filter(profile__address__zilla_id=int(district))
+            else:
+                pending_applications = pending_applications.filter(profile__address__zilla__name_en__iexact=district)
 
-        for app in pending_applications:
-            # Get related payment info
-            payment_info = Payment.objects.filter(user_id=app.id).order_by('-created').first()
+        paginator = self.pagination_class()
+        result_page = paginator.paginate_queryset(pending_applications, request)
 
-            # Get user profile safely
-            user_profile = getattr(app, 'userprofile', None)
-            address = getattr(user_profile, 'address', None) if user_profile else None
-            zilla = getattr(address, 'zilla', None) if address else None
-            upazila = getattr(address, 'upazila', None) if address else None
+        data = []
 
+        for app in result_page:
             data.append({
-                "id": app.id,
-                "firstName": app.first_name,
-                "lastName": app.last_name,
-                "email": app.email,
-                "phone": app.phone,
-                "district": getattr(zilla, 'name_en', None),
-                "upazila": getattr(upazila, 'name_en', None),
-                "nidNumber": getattr(user_profile, 'nid', None),
-                "appliedAt": app.created.strftime("%Y-%m-%d") if app.created else None,
-                "status": "Approved" if app.approved else "Pending",
-                "paymentStatus": app.payment_status,
-                "paidAmount": getattr(payment_info, 'amount', 0),
-                "paidAt": payment_info.created.strftime("%Y-%m-%d") if payment_info else None,
-                "role": app.role.name,
-                "approved": app.approved,
-                "rejected": app.rejected,
+                "id": app['id'],
+                "firstName": app['first_name'],
+                "lastName": app['last_name'],
+                "email": app['email'],
+                "phone": app['phone'],
+                "district": app['profile__address__zilla__name_en'],
+                "upazila": app['profile__address__upazila__name_en'],
+                "nidNumber": app['profile__nid'],
+                "appliedAt": app['created'].strftime("%Y-%m-%d") if app['created'] else None,
+                "status": "Approved" if app['approved'] else "Pending",
+                "paymentStatus": app['payment_status'],
+                "paidAmount": app['paid_amount'] or 0,
+                "paidAt": app['paid_at'].strftime("%Y-%m-%d") if app['paid_at'] else None,
+                "role": app['role__name'],
+                "approved": app['approved'],
+                "rejected": app['rejected'],
             })
 
-        return Response(data, status=status.HTTP_200_OK)
+        return paginator.get_paginated_response(data)
+
+
 
+def _payment_log_queryset(params):
+    """
+    Payment logs, newest first, limited to the last ``?months=`` calendar months
+    (``PAYMENT_LOG_RECENT_MONTHS`` by default, ``all`` for everything) so the
+    planner only touches the most recent partitions.
+    """
+    payment_logs = PaymentLog.objects.all().order_by('-created', '-id')
+    months = params.get('months') or settings.PAYMENT_LOG_RECENT_MONTHS
+    if months == 'all':
+        return payment_logs
+    try:
+        months = max(int(months), 1)
+    except ValueError:
+        months = settings.PAYMENT_LOG_RECENT_MONTHS
+    today = timezone.localdate()
+    since = add_months(month_start(today), -(months - 1))
+    return payment_logs.filter(created__gte=timezone.make_aware(datetime.combine(since, time.min)))
 
 
 class PaymentLogTableView(APIView):
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
-    pagination_class = UserPagination
+    pagination_class = KeysetPagination
 
     def get(self, request):
         user_role = request.user.role.name
         if user_role != 'admin':
             return Response({"status": "error", "message": "Permission denied"}, status=status.HTTP_403_FORBIDDEN)
 
-        payment_logs = PaymentLog.objects.select_related('payment__user').all().order_by('-created_at')
+        payment_logs = _payment_log_queryset(request.query_params).select_related('payment__user')
         paginator = self.pagination_class()
         result_page = paginator.paginate_queryset(payment_logs, request)
         serializer = PaymentLogSerializer(result_page, many=True)
         return paginator.get_paginated_response(serializer.data)
 
 
+USER_EXPORT_COLUMNS = (
+    'id', 'first_name', 'last_name', 'email', 'phone', 'role__name', 'payment_status',
+    'email_verified', 'phone_verified', 'approved', 'rejected', 'postponed',
+    'parent_id', 'addBy_id', 'created',
+)
+PAYMENT_LOG_EXPORT_COLUMNS = (
+    'id', 'created', 'message', 'payment_id', 'payment__transaction_id', 'payment__amount',
+    'payment__payment_method', 'payment__status', 'payment__user_id', 'payment__user__email',
+)
+
+
+class TableExportView(APIView):
+    """Stream a whole admin table as CSV or gzipped JSON lines, with the table's filters."""
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+    queryset_builder = None
+    columns = ()
+    filename = None
+
+    def get(self, request, export_format):
+        if request.user.role.name != 'admin':
+            return Response({"status": "error", "message": "Permission denied"}, status=status.HTTP_403_FORBIDDEN)
+        if export_format not in EXPORT_FORMATS:
+            return Response(
+                {"status": "error", "message": f"Format must be one of {', '.join(EXPORT_FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        queryset = type(self).queryset_builder(request.query_params)
+        filename = f"{self.filename}-{now():%Y%m%d-%H%M%S}"
+        return streaming_export(queryset, self.columns, export_format, filename)
+
+
+class UserTableExportView(TableExportView):
+    queryset_builder = _user_table_queryset
+    columns = USER_EXPORT_COLUMNS
+    filename = "users"
+
+
+class PaymentLogTableExportView(TableExportView):
+    queryset_builder = _payment_log_queryset
+    columns = PAYMENT_LOG_EXPORT_COLUMNS
+    filename = "payment-logs"
+
+
+FAMILY_NODE_FIELDS = ('id', 'first_name', 'last_name', 'email', 'phone', 'payment_status', 'is_active', 'date_joined')
+
+
+def _family_node(row):
+    return {
+        "id": row['id'],
+        "name": f"{row['first_name']} {row['last_name']}".strip(),
+        "email": row['email'],
+        "phone": row['phone'],
+        "payment_status": row['payment_status'],
+        "is_active": row['is_active'],
+        "date_joined": row['date_joined'],
+        "childCount": row['child_count'],
+    }
+
+
+def _family_level(queryset, *extra_fields):
+    return queryset.annotate(child_count=Count('children')).values(*FAMILY_NODE_FIELDS, 'child_count', *extra_fields)
+
+
+def _page_position(field, ids):
+    """Sort key putting rows in the order of ``ids`` (a page of collectors) by ``field``."""
+    return Case(*[When(**{field: pk}, then=position) for position, pk in enumerate(ids)], output_field=IntegerField())
+
+
+class _Groups:
+    """Rows of one level, consumed group by group (rows must come ordered by ``key``)."""
+
+    def __init__(self, rows, key):
+        self.groups = groupby(rows, key=itemgetter(key))
+        self.pending = next(self.groups, None)
+
+    def take(self, value):
+        if self.pending is None or self.pending[0] != value:
+            return []
+        rows = list(self.pending[1])
+        self.pending = next(self.groups, None)
+        return rows
+
+
 class FamilyRelationshipView(APIView):
+    """
+    Collector -> registered users -> sub-accounts for a page of collectors, one
+    query per level. The lower levels come back in the page's collector order and
+    are read as the response streams, so each collector's subtree is sent as soon
+    as its rows have arrived.
+    """
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
+    pagination_class = ApplicationPagination
 
     def get(self, request):
         user_role = request.user.role.name
         if user_role != 'admin':
             return Response({"status": "error", "message": "Permission denied"}, status=status.HTTP_403_FORBIDDEN)
-            
-        collectors = User.objects.filter(role__name='dataCollector')
-        data = []
-        for collector in collectors:
-            public_users = User.objects.filter(addBy=collector)
-            collector_data = {
-                "collector": UserSerializer(collector).data,
-                "public_users": []
-            }
-            for public_user in public_users:
-                sub_accounts = User.objects.filter(parent=public_user)
-                public_user_data = {
-                    "public_user": UserSerializer(public_user).data,
-                    "sub_accounts": UserSerializer(sub_accounts, many=True).data
+
+        paginator = self.pagination_class()
+        collectors = paginator.paginate_queryset(
+            _family_level(User.objects.filter(role__name='dataCollector'), 'created'), request
+        )
+        collector_ids = [collector['id'] for collector in collectors]
+
+        def tree():
+            if not collector_ids:
+                return
+            public_users = _Groups(
+                _family_level(User.objects.filter(addBy_id__in=collector_ids), 'addBy_id')
+                .order_by(_page_position('addBy_id', collector_ids), 'id').iterator(),
+                'addBy_id',
+            )
+            sub_accounts = _Groups(
+                _family_level(User.objects.filter(parent__addBy_id__in=collector_ids), 'parent_id')
+                .order_by(_page_position('parent__addBy_id', collector_ids), 'parent_id', 'id').iterator(),
+                'parent_id',
+            )
+            for collector in collectors:
+                yield {
+                    "collector": _family_node(collector),
+                    "public_users": [
+                        {
+                            "public_user": _family_node(public_user),
+                            "sub_accounts": [_family_node(row) for row in sub_accounts.take(public_user['id'])],
+                        }
+                        for public_user in public_users.take(collector['id'])
+                    ],
                 }
-                collector_data["public_users"].append(public_user_data)
-            data.append(collector_data)
-        return Response(data, status=status.HTTP_200_OK)
+
+        def stream():
+            yield '{"next": %s, "previous": %s, "results": [' % (
+                json.dumps(paginator.get_next_link()), json.dumps(paginator.get_previous_link())
+            )
+            for index, node in enumerate(tree()):
+                yield ("," if index else "") + json.dumps(node, cls=DjangoJSONEncoder)
+            yield "]}"
+
+        return StreamingHttpResponse(stream(), content_type="application/json")
 
 class CollectorAppStatisticView(APIView):
     authentication_classes = [JWTAuthentication]
@@ -306,14 +497,6 @@ class CollectorAppStatisticView(APIView):
         if user_role != 'admin':
             return Response({"status": "error", "message": "Permission denied"}, status=status.HTTP_403_FORBIDDEN)
 
-            # Pending Review, Approved, Rejected statistics and role is dataCollector
-        data_collectors = User.objects.filter(role__name='dataCollector')
-        
-            
-        data = {
-            "pending_review": data_collectors.filter(Q(approved=False) & Q(rejected=False) & Q(payment_status='Paid') &(Q(email_verified=True) | Q(phone_verified=True))).count(),
-            "approved": data_collectors.filter(approved=True).count(),
-            "rejected": data_collectors.filter(rejected=True).count(),
-            
-        }
+        # Pending Review, Approved, Rejected statistics and role is dataCollector
+        data = collector_application_counters()
         return Response(data, status=status.HTTP_200_OK)
\ No newline at end of file
@@ -0,0 +1,97 @@
+import asyncio
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.test import AsyncClient, Client
+
+from apps.accounts.models import User
+from apps.user_auth.services import issue_session
+
+
+# (sync WSGI path, async ASGI path); verify rotates the access token so it runs last
+ENDPOINTS = [
+    ("/accounts/user-statistics", "/accounts/async/user-statistics"),
+    ("/accounts/user-details", "/accounts/async/user-details"),
+    ("/address/zillas/", "/address/async/zillas/"),
+    ("/auth/verify", "/auth/async/verify"),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare in-process throughput of the sync (WSGI, thread pool) and async (ASGI, "
+        "event loop) variants of the hot read endpoints. For production numbers run "
+        "gunicorn and uvicorn side by side behind an external load generator."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", required=True, help="id, email or phone of the account to benchmark as")
+        parser.add_argument("--requests", type=int, default=200, help="requests per endpoint and mode")
+        parser.add_argument("--concurrency", type=int, default=50, help="requests in flight at once")
+        parser.add_argument("--threads", type=int, default=8, help="WSGI worker threads (gunicorn --threads)")
+
+    def handle(self, *args, **options):
+        lookup = options["user"]
+        user = User.objects.by_contact(lookup).first()
+        if not user and lookup.isdigit():
+            user = User.objects.filter(pk=int(lookup)).first()
+        if not user:
+            raise CommandError(f"User {lookup!r} not found")
+
+        session = issue_session(
+            user, f"bench-{uuid.uuid4().hex}", remember=False, ip="127.0.0.1", user_agent="bench_asgi"
+        )
+        headers = {
+            "Access-Token": session.access_token,
+            "Refresh-Token": session.refresh_token,
+            "X-Visitor-ID": session.visitor_id,
+        }
+
+        self.stdout.write(f"{'endpoint':<32}{'mode':<6}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'errors':>8}")
+        try:
+            for sync_path, async_path in ENDPOINTS:
+                self._report(sync_path, "wsgi", self._run_sync(sync_path, headers, options))
+                self._report(async_path, "asgi", asyncio.run(self._run_async(async_path, headers, options)))
+        finally:
+            session.delete()
+
+    def _run_sync(self, path, headers, options):
+        def call(_):
+            client = Client(headers=headers)
+            started = time.perf_counter()
+            response = client.get(path)
+            close_old_connections()
+            return time.perf_counter() - started, response.status_code
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=min(options["threads"], options["concurrency"])) as pool:
+            results = list(pool.map(call, range(options["requests"])))
+        return results, time.perf_counter() - started
+
+    async def _run_async(self, path, headers, options):
+        client = AsyncClient()
+        gate = asyncio.Semaphore(options["concurrency"])
+
+        async def call():
+            async with gate:
+                started = time.perf_counter()
+                response = await client.get(path, headers=headers)
+                return time.perf_counter() - started, response.status_code
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(call() for _ in range(options["requests"])))
+        return results, time.perf_counter() - started
+
+    def _report(self, path, mode, outcome):
+        results, elapsed = outcome
+        latencies = sorted(latency * 1000 for latency, _ in results)
+        errors = sum(1 for _, code in results if code >= 400)
+        p95 = latencies[max(int(len(latencies) * 0.95) - 1, 0)]
+        self.stdout.write(
+            f"{path:<32}{mode:<6}{len(results) / elapsed:>10.1f}"
+            f"{statistics.median(latencies):>10.1f}{p95:>10.1f}{errors:>8}"
+        )
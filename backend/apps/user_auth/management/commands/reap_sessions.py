@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from apps.user_auth.services import reap_expired_sessions
+
+
+class Command(BaseCommand):
+    help = "Delete sessions whose refresh token has expired."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--max-batches", type=int, default=None,
+            help="Stop after this many batches (default: until no expired sessions remain)",
+        )
+
+    def handle(self, *args, **options):
+        deleted, seconds = reap_expired_sessions(
+            batch_size=options["batch_size"], max_batches=options["max_batches"]
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Removed {deleted} expired sessions in {seconds:.2f}s")
+        )
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.3 on 2026-10-18 08:01
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def _digest(token):
+    return hashlib.sha256(token.encode()).hexdigest() if token else None
+
+
+def backfill_token_digests(apps, schema_editor):
+    Session = apps.get_model('user_auth', 'Session')
+    seen_access, seen_refresh = set(), set()
+    # Newest first, so if two rows ever share a token the live one keeps the digest.
+    sessions = Session.objects.order_by('-updated', '-id').only('id', 'access_token', 'refresh_token')
+    batch = []
+    for session in sessions.iterator(chunk_size=2000):
+        access_digest = _digest(session.access_token)
+        refresh_digest = _digest(session.refresh_token)
+        if access_digest in seen_access:
+            access_digest = None
+        if refresh_digest in seen_refresh:
+            refresh_digest = None
+        seen_access.add(access_digest)
+        seen_refresh.add(refresh_digest)
+        session.access_token_digest = access_digest
+        session.refresh_token_digest = refresh_digest
+        batch.append(session)
+        if len(batch) >= 2000:
+            Session.objects.bulk_update(batch, ['access_token_digest', 'refresh_token_digest'])
+            batch = []
+    if batch:
+        Session.objects.bulk_update(batch, ['access_token_digest', 'refresh_token_digest'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_auth', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='session',
+            name='access_token_digest',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='session',
+            name='refresh_token_digest',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+        migrations.RunPython(backfill_token_digests, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.3 on 2026-10-18 08:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_auth', '0002_session_token_digests'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='session',
+            name='access_token_digest',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='session',
+            name='refresh_token_digest',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 08:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user_auth', '0003_alter_session_token_digests_unique'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='session',
+            name='refresh_token_expires',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -1,54 +1,43 @@
 from django.db import models
 from core.utils.modeler import BaseModel
 from apps.accounts.models import User
+from core.utils.token import token_digest
 
-from django.utils import timezone
-from core.utils.token import Token
 
-from django.db.models.signals import post_save
-from django.dispatch import receiver
+class SessionQuerySet(models.QuerySet):
+    def by_access_token(self, access_token):
+        return self.filter(access_token_digest=token_digest(access_token))
+
+    def by_refresh_token(self, refresh_token):
+        return self.filter(refresh_token_digest=token_digest(refresh_token))
 
 
 class Session(BaseModel):
     access_token = models.TextField(blank=True, null=True)
     refresh_token = models.TextField(blank=True, null=True)
+    # sha256 of the tokens above; lookups always go through these indexed columns
+    access_token_digest = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
+    refresh_token_digest = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="sessions")
     visitor_id = models.CharField(max_length=100)
     ip = models.GenericIPAddressField()
     user_agent = models.TextField()
     remember = models.BooleanField(default=False)
     access_token_expires = models.DateTimeField(blank=True, null=True)
-    refresh_token_expires = models.DateTimeField(blank=True, null=True)
-
-    def update_access_token(self):
-        token = Token()
-        self.access_token = token.access_token(self.user, expires=5)
-        self.access_token_expires = timezone.now() + timezone.timedelta(minutes=5)
-        return self.save()
-
-    def update_refresh_token(self):
-        token = Token()
-        self.refresh_token = token.refresh_token(
-            self.user, expires=30 if self.remember else 1
-        )
-        self.refresh_token_expires = timezone.now() + timezone.timedelta(
-            days=30 if self.remember else 1
-        )
-        return self.save()
-
-
-@receiver(post_save, sender=Session)
-def set_expires(sender, instance, created, **kwargs):
-    if created:
-        token = Token()
-        instance.access_token = token.access_token(instance.user)
-        instance.access_token_expires = timezone.now() + timezone.timedelta(minutes=5)
-        if instance.remember:
-            instance.refresh_token_expires = timezone.now() + timezone.timedelta(
-                days=30
-            )
-            instance.refresh_token = token.refresh_token(instance.user, expires=30)
-        else:
-            instance.refresh_token_expires = timezone.now() + timezone.timedelta(days=1)
-            instance.refresh_token = token.refresh_token(instance.user, expires=1)
-        instance.save()
+    refresh_token_expires = models.DateTimeField(blank=True, null=True, db_index=True)
+
+    objects = SessionQuerySet.as_manager()
+
+    def save(self, *args, **kwargs):
+        self.access_token_digest = token_digest(self.access_token)
+        self.refresh_token_digest = token_digest(self.refresh_token)
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if "access_token" in update_fields:
+                update_fields.add("access_token_digest")
+            if "refresh_token" in update_fields:
+                update_fields.add("refresh_token_digest")
+            kwargs["update_fields"] = update_fields
+        return super().save(*args, **kwargs)
@@ -1,5 +1,7 @@
 from typing import Required
 from rest_framework import serializers
+from apps.accounts.models import User
+from apps.permissions.cache import get_role_permissions
 from apps.user_auth.models import Session
 
 
@@ -43,6 +45,31 @@ class SessionSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
+class PrincipalSerializer(serializers.ModelSerializer):
+    """Compact view of the signed-in user returned by ``verify``."""
+    name = serializers.SerializerMethodField()
+    roleName = serializers.SerializerMethodField()
+    page_permissions = serializers.SerializerMethodField()
+
+    class Meta:
+        model = User
+        fields = [
+            'id', 'first_name', 'last_name', 'name', 'email', 'phone',
+            'email_verified', 'phone_verified', 'payment_status',
+            'approved', 'rejected', 'postponed', 'parent',
+            'roleName', 'page_permissions', 'updated',
+        ]
+
+    def get_name(self, obj):
+        return obj.get_full_name()
+
+    def get_roleName(self, obj):
+        return obj.role.name if obj.role else None
+
+    def get_page_permissions(self, obj):
+        return get_role_permissions(obj.role_id)
+
+
 class ApprovedRejectedUserSerializer(serializers.Serializer):
     identity = serializers.CharField(required=True)
     user_id = serializers.IntegerField(required=True)
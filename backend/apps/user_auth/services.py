@@ -0,0 +1,102 @@
+import hashlib
+import time
+
+from django.utils import timezone
+
+from apps.permissions.cache import permissions_version
+from core.utils.token import Token
+from .models import Session
+
+
+ACCESS_TOKEN_MINUTES = 5
+REFRESH_TOKEN_DAYS = 1
+REMEMBER_REFRESH_TOKEN_DAYS = 30
+
+ACCESS_TOKEN_FIELDS = ["access_token", "access_token_expires"]
+REFRESH_TOKEN_FIELDS = ["refresh_token", "refresh_token_expires"]
+
+
+def _mint_access_token(session, token, now):
+    session.access_token = token.access_token(session.user, expires=ACCESS_TOKEN_MINUTES)
+    session.access_token_expires = now + timezone.timedelta(minutes=ACCESS_TOKEN_MINUTES)
+
+
+def _mint_refresh_token(session, token, now):
+    days = REMEMBER_REFRESH_TOKEN_DAYS if session.remember else REFRESH_TOKEN_DAYS
+    session.refresh_token = token.refresh_token(session.user, expires=days)
+    session.refresh_token_expires = now + timezone.timedelta(days=days)
+
+
+def issue_session(user, visitor_id, remember, ip, user_agent):
+    """
+    Mint a fresh access/refresh token pair for ``(user, visitor_id)`` and persist the
+    session with a single INSERT (new visitor) or UPDATE (returning visitor).
+    """
+    session = Session.objects.filter(user=user, visitor_id=visitor_id).first()
+    created = session is None
+    if created:
+        session = Session(user=user, visitor_id=visitor_id)
+
+    session.remember = remember
+    session.ip = ip
+    session.user_agent = user_agent
+
+    token = Token()
+    now = timezone.now()
+    _mint_access_token(session, token, now)
+    _mint_refresh_token(session, token, now)
+
+    if created:
+        session.save(force_insert=True)
+    else:
+        session.save(
+            update_fields=ACCESS_TOKEN_FIELDS + REFRESH_TOKEN_FIELDS
+            + ["remember", "ip", "user_agent", "updated"]
+        )
+    return session
+
+
+def refresh_access_token(session):
+    """Rotate only the access token of an existing session (one UPDATE)."""
+    _mint_access_token(session, Token(), timezone.now())
+    session.save(update_fields=ACCESS_TOKEN_FIELDS + ["updated"])
+    return session
+
+
+def principal_etag(user):
+    """ETag of the verify payload: changes with the user row or any role permission change."""
+    source = f"{user.pk}:{user.updated.isoformat()}:{user.role_id}:{permissions_version()}"
+    return '"%s"' % hashlib.md5(source.encode()).hexdigest()
+
+
+def reap_expired_sessions(batch_size=1000, max_batches=None):
+    """
+    Delete sessions whose refresh token has expired, ``batch_size`` rows at a time so
+    no single statement holds locks on the table for long.
+
+    Returns ``(deleted, seconds)``.
+    """
+    started = time.monotonic()
+    now = timezone.now()
+    expired = (
+        Session.objects.filter(refresh_token_expires__lt=now)
+        .order_by("refresh_token_expires")
+        .values_list("id", flat=True)
+    )
+
+    deleted = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        ids = list(expired[:batch_size])
+        if not ids:
+            break
+        count, _ = Session.objects.filter(id__in=ids).delete()
+        deleted += count
+        batches += 1
+    return deleted, time.monotonic() - started
+
+
+async def arefresh_access_token(session):
+    _mint_access_token(session, Token(), timezone.now())
+    await session.asave(update_fields=ACCESS_TOKEN_FIELDS + ["updated"])
+    return session
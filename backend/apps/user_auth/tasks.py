@@ -0,0 +1,16 @@
+import logging
+
+from celery import shared_task
+
+from .services import reap_expired_sessions
+
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(name="user_auth.reap_expired_sessions")
+def reap_expired_sessions_task(batch_size=1000, max_batches=None):
+    """Periodic (celery beat) version of ``manage.py reap_sessions``."""
+    deleted, seconds = reap_expired_sessions(batch_size=batch_size, max_batches=max_batches)
+    logger.info(f"Removed {deleted} expired sessions in {seconds:.2f}s")
+    return {"deleted": deleted, "seconds": round(seconds, 3)}
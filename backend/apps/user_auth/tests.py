@@ -1,3 +1,362 @@
-from django.test import TestCase
+import hashlib
+import importlib
+import threading
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps as global_apps
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.permissions.cache import bump_permissions_version
+from core.authentication.auth import JWTAuthentication
+from core.authentication.principal import PRINCIPAL_KEY, evict_user_principals
+from core.utils.testing import api_client, make_roles, make_user
+from core.utils.token import Token
+
+from .models import Session
+from .services import issue_session, reap_expired_sessions, refresh_access_token
+from .tasks import reap_expired_sessions_task
+
+
+backfill_migration = importlib.import_module("apps.user_auth.migrations.0002_session_token_digests")
+
+
+def sha256(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class SessionDigestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user("public", "user", email="user@example.com")
+
+    def issue(self, visitor_id="visitor"):
+        return issue_session(self.user, visitor_id, remember=False, ip="127.0.0.1", user_agent="tests")
+
+    def test_session_is_found_by_token_digest(self):
+        session = self.issue()
+
+        stored = Session.objects.values("access_token_digest", "refresh_token_digest").get(pk=session.pk)
+        self.assertEqual(stored["access_token_digest"], sha256(session.access_token))
+        self.assertEqual(stored["refresh_token_digest"], sha256(session.refresh_token))
+        self.assertEqual(Session.objects.by_access_token(session.access_token).get(), session)
+        self.assertEqual(Session.objects.by_refresh_token(session.refresh_token).get(), session)
+        self.assertFalse(Session.objects.by_access_token(None).exists())
+
+    def test_digest_follows_a_token_saved_alone(self):
+        session = self.issue()
+        old_token = session.access_token
+
+        session.access_token = "rotated-access-token"
+        session.save(update_fields=["access_token"])
+
+        self.assertEqual(
+            Session.objects.values_list("access_token_digest", flat=True).get(pk=session.pk),
+            sha256("rotated-access-token"),
+        )
+        self.assertFalse(Session.objects.by_access_token(old_token).exists())
+        self.assertEqual(Session.objects.by_refresh_token(session.refresh_token).get(), session)
+
+    def test_rotation_retires_the_old_access_token(self):
+        session = self.issue()
+        old_token = session.access_token
+
+        refresh_access_token(session)
+
+        self.assertFalse(Session.objects.by_access_token(old_token).exists())
+        self.assertEqual(Session.objects.by_access_token(session.access_token).get(), session)
+
+    def test_migration_backfills_digests(self):
+        first, second = self.issue("first"), self.issue("second")
+        Session.objects.update(access_token_digest=None, refresh_token_digest=None)
+        # an older row sharing a token: only the newest keeps the digest
+        Session.objects.filter(pk=first.pk).update(
+            access_token=second.access_token, updated=timezone.now() - timezone.timedelta(days=1),
+        )
+
+        backfill_migration.backfill_token_digests(global_apps, None)
+
+        self.assertEqual(Session.objects.by_access_token(second.access_token).get(), second)
+        self.assertEqual(Session.objects.by_refresh_token(first.refresh_token).get(), first)
+        self.assertIsNone(Session.objects.values_list("access_token_digest", flat=True).get(pk=first.pk))
+
+
+class LogoutTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user("public", "user", email="user@example.com")
+
+    def test_logout_ends_only_the_callers_session(self):
+        this_device, other_device = api_client(self.user), api_client(self.user)
+
+        response = this_device.post(reverse("logout"))
+
+        self.assertEqual(response.status_code, 200)
+        now = timezone.now()
+        ended = Session.objects.get(pk=this_device.session_row.pk)
+        kept = Session.objects.get(pk=other_device.session_row.pk)
+        self.assertLessEqual(ended.refresh_token_expires, now)
+        self.assertGreater(kept.refresh_token_expires, now)
+        self.assertEqual(this_device.get(reverse("user")).status_code, 403)
+        self.assertEqual(other_device.get(reverse("user")).status_code, 200)
+
+
+class ReapExpiredSessionsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user("public", "user", email="user@example.com")
+
+    def sessions(self, count, expired):
+        sessions = [
+            issue_session(self.user, f"visitor-{expired}-{i}", remember=False, ip="127.0.0.1", user_agent="tests")
+            for i in range(count)
+        ]
+        if expired:
+            Session.objects.filter(pk__in=[s.pk for s in sessions]).update(
+                refresh_token_expires=timezone.now() - timezone.timedelta(minutes=1),
+            )
+        return sessions
+
+    def test_only_expired_sessions_are_deleted(self):
+        live = self.sessions(2, expired=False)
+        self.sessions(3, expired=True)
+
+        deleted, _ = reap_expired_sessions()
+
+        self.assertEqual(deleted, 3)
+        self.assertQuerySetEqual(Session.objects.order_by("pk"), sorted(live, key=lambda s: s.pk))
+
+    def test_batches_are_capped(self):
+        self.sessions(5, expired=True)
+
+        with self.assertNumQueries(4):
+            deleted, _ = reap_expired_sessions(batch_size=2, max_batches=2)
+
+        self.assertEqual(deleted, 4)
+        self.assertEqual(Session.objects.count(), 1)
+
+    def test_scheduled_task_reports_what_it_removed(self):
+        self.sessions(3, expired=True)
+
+        result = reap_expired_sessions_task.apply(kwargs={"batch_size": 2}).get()
+
+        self.assertEqual(result["deleted"], 3)
+        self.assertFalse(Session.objects.exists())
+
+
+@override_settings(JWT_STATELESS_AUTH=True)
+class PrincipalCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user("public", "user", password="old-pass-1234", email="user@example.com")
+
+    def setUp(self):
+        cache.clear()
+
+    def authenticate(self, session, access_token=None):
+        request = RequestFactory().get(
+            "/", HTTP_ACCESS_TOKEN=access_token or session.access_token, HTTP_REFRESH_TOKEN=session.refresh_token,
+        )
+        return JWTAuthentication().authenticate(request)
+
+    def test_second_request_is_served_from_cache(self):
+        session = api_client(self.user).session_row
+
+        user, auth = self.authenticate(session)
+        self.assertEqual((user, auth), (self.user, session))
+
+        with self.assertNumQueries(0):
+            user, auth = self.authenticate(session)
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertIsNone(auth)
+
+    def test_logout_revokes_the_cached_principal(self):
+        client = api_client(self.user)
+        self.authenticate(client.session_row)
+
+        client.post(reverse("logout"))
+
+        jti = Token().decode(client.session_row.access_token)["jti"]
+        self.assertIsNone(cache.get(PRINCIPAL_KEY.format(jti=jti)))
+        self.assertIsNone(self.authenticate(client.session_row))
+
+    def test_password_change_signs_out_other_devices(self):
+        this_device, other_device = api_client(self.user), api_client(self.user)
+        # both principals are cached before the change
+        self.authenticate(this_device.session_row)
+        self.authenticate(other_device.session_row)
+
+        response = this_device.put(reverse("user-change-password"), {
+            "current_password": "old-pass-1234", "new_password": "new-pass-5678", "confirm_password": "new-pass-5678",
+        }, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(self.authenticate(other_device.session_row))
+        user, auth = self.authenticate(this_device.session_row)
+        self.assertEqual(auth, this_device.session_row)
+        self.assertTrue(user.check_password("new-pass-5678"))
+
+    def test_evicted_user_is_reloaded_from_the_database(self):
+        session = api_client(self.user).session_row
+        self.authenticate(session)
+
+        self.user.__class__.objects.filter(pk=self.user.pk).update(first_name="Renamed")
+        evict_user_principals(self.user.pk)
+
+        user, auth = self.authenticate(session)
+        self.assertEqual(auth, session)
+        self.assertEqual(user.first_name, "Renamed")
+
+    def test_profile_update_evicts_after_commit(self):
+        from apps.accounts.models import UserProfile
+
+        UserProfile.objects.create(user=self.user, name_en="User", name_bn="User")
+        client = api_client(self.user)
+        self.authenticate(client.session_row)
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            response = client.put(reverse("users-update"), {
+                "first_name": "Renamed", "last_name": "User", "name_bn": "User", "blood_group": "O+",
+            }, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(callbacks), 1)
+        user, auth = self.authenticate(client.session_row)
+        self.assertEqual(auth, client.session_row)
+        self.assertEqual(user.first_name, "Renamed")
+
+    def test_expired_access_token_falls_through_to_the_refresh_token(self):
+        session = api_client(self.user).session_row
+        self.authenticate(session)
+        # the token and, with it, its cache entry ran out
+        cache.clear()
+        Session.objects.filter(pk=session.pk).update(access_token_expires=timezone.now())
+
+        user, auth = self.authenticate(session)
+
+        self.assertEqual(auth.pk, session.pk)
+        self.assertNotEqual(auth.access_token, session.access_token)
+        self.assertGreater(Session.objects.get(pk=session.pk).access_token_expires, timezone.now())
+
+    def test_fully_expired_session_is_rejected(self):
+        session = api_client(self.user).session_row
+        cache.clear()
+        Session.objects.filter(pk=session.pk).update(
+            access_token_expires=timezone.now(), refresh_token_expires=timezone.now(),
+        )
+
+        self.assertIsNone(self.authenticate(session))
+
+
+class VerifyETagTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.roles = make_roles()
+        cls.user = make_user(cls.roles["public"], "user", email="user@example.com")
+
+    def setUp(self):
+        cache.clear()
+        self.api = api_client(self.user)
+
+    def verify(self, etag=None, url="verify"):
+        headers = {"HTTP_IF_NONE_MATCH": etag} if etag else {}
+        return self.api.get(reverse(url), **headers)
+
+    def stored_access_token(self):
+        return Session.objects.values_list("access_token_digest", flat=True).get(pk=self.api.session_row.pk)
+
+    def test_unchanged_principal_is_not_modified_and_keeps_the_token(self):
+        for url in ("verify", "verify-async"):
+            with self.subTest(url=url):
+                first = self.verify(url=url)
+                self.assertEqual(first.status_code, 200)
+                self.assertIn("access-token", first.cookies)
+                digest = self.stored_access_token()
+                # the header keeps sending the token issued at sign-in, the cookie carries the new one
+                self.api.credentials(
+                    HTTP_ACCESS_TOKEN=first.cookies["access-token"].value,
+                    HTTP_REFRESH_TOKEN=self.api.session_row.refresh_token,
+                    HTTP_X_VISITOR_ID=self.api.session_row.visitor_id,
+                )
+
+                second = self.verify(first["ETag"], url=url)
+
+                self.assertEqual(second.status_code, 304)
+                self.assertEqual(second["ETag"], first["ETag"])
+                self.assertNotIn("access-token", second.cookies)
+                self.assertEqual(self.stored_access_token(), digest)
+
+    def test_expired_access_token_is_rotated_even_when_not_modified(self):
+        etag = self.verify()["ETag"]
+        Session.objects.filter(pk=self.api.session_row.pk).update(access_token_expires=timezone.now())
+        digest = self.stored_access_token()
+
+        response = self.verify(etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertIn("access-token", response.cookies)
+        self.assertNotEqual(self.stored_access_token(), digest)
+
+    def test_role_change_changes_the_etag(self):
+        etag = self.verify()["ETag"]
+        self.user.role = self.roles["dataCollector"]
+        self.user.save()
+
+        response = self.verify(etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(response.data["data"]["roleName"], "dataCollector")
+
+    def test_permission_change_changes_the_etag(self):
+        etag = self.verify()["ETag"]
+        bump_permissions_version()
+
+        response = self.verify(etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+
+class LoginTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = make_user(
+            "public", "user", password="pass-1234", email="User@Example.com", email_verified=True,
+        )
+
+    def login(self, **credentials):
+        return self.client.post(
+            reverse("login"),
+            {"account_type": "public", **credentials},
+            content_type="application/json",
+            HTTP_X_VISITOR_ID="visitor",
+            HTTP_USER_AGENT="tests",
+        )
+
+    def test_email_is_matched_case_insensitively(self):
+        response = self.login(email="user@EXAMPLE.com", password="pass-1234")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Session.objects.get(visitor_id="visitor").user, self.user)
+
+    def test_sub_users_sharing_a_contact_cost_one_verification_slot(self):
+        # sub-users have no contact of their own: they log in with the parent's,
+        # when it isn't the contact of a public account
+        parent = make_user("dataCollector", "parent", phone="01812345678")
+        sub_users = [
+            make_user("subUser", f"sub-{i}", password=f"sub-pass-{i}", parent=parent, phone_verified=True)
+            for i in range(3)
+        ]
+        slots = mock.Mock(wraps=threading.BoundedSemaphore(1))
+
+        with mock.patch("apps.accounts.hashing._verify_slots", slots):
+            found = self.login(phone="01812345678", password="sub-pass-2")
+            wrong = self.login(phone="01812345678", password="not-it")
+
+        self.assertEqual(found.status_code, 200)
+        self.assertEqual(Session.objects.get(visitor_id="visitor").user, sub_users[2])
+        self.assertEqual(wrong.status_code, 401)
+        self.assertEqual(slots.acquire.call_count, 2)
@@ -5,6 +5,7 @@ urlpatterns = [
     path('login', views.login.as_view(), name='login'),
     path('logout', views.logout.as_view(), name='logout'),
     path('verify', views.verify.as_view(), name='verify'),
+    path('async/verify', views.verify_async, name='verify-async'),
     path('user', views.UserDetail.as_view(), name='user'),
     path('approve-reject',views.ApprovedUser.as_view(), name='approve-reject'),
     path('postponed-reinstate', views.PostponedReinstateUser.as_view(), name='postponed-reinstate'),
@@ -1,20 +1,26 @@
 from rest_framework.permissions import IsAuthenticated
 from django.db import transaction
-from django.db.models import Q
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 import json
 
 from django.utils import timezone
+from django.http import HttpResponseNotModified, JsonResponse
+from django.views.decorators.http import require_GET
+from asgiref.sync import sync_to_async
 
+from apps.accounts.hashing import VerificationBusy, find_password_owner, verify_password
 from apps.accounts.models import User
 from apps.user_auth.models import Session
 
-from .serializers import LoginSerializer, ApprovedRejectedUserSerializer, UpdateUserSerializer,PasswordSerializer
+from .serializers import LoginSerializer, ApprovedRejectedUserSerializer, UpdateUserSerializer,PasswordSerializer, PrincipalSerializer
 from ..accounts.serializers import UserSerializer,PublicUserSerializer
 from rest_framework.permissions import IsAuthenticated
-from core.authentication.auth import JWTAuthentication
+from core.authentication.auth import JWTAuthentication, get_request_tokens
+from core.authentication.principal import evict_principal, evict_user_principals
+from core.utils.token import Token
+from .services import arefresh_access_token, issue_session, principal_etag, refresh_access_token
 
 
 class login(APIView):
@@ -24,40 +30,44 @@ class login(APIView):
             contact = serializer.validated_data.get("phone") or serializer.validated_data.get("email")
             account_type = serializer.validated_data.get("account_type")
 
-            match account_type:
-                case "public":
-                    user = User.objects.filter(
-                        Q(phone=contact) | Q(email=contact)&
-                        Q(role__name="public")
-                    ).first()
-
-                    if user is None:
-                        user = User.objects.filter(
-                        Q(parent__phone=contact) | Q(parent__email=contact)&
-                        Q(role__name="subUser")&
-                        Q(password=serializer.validated_data["password"])
-                    ).first()
-                    # print("user222((((((((((()))))))))))", user)
-                    
-                case "dataCollector":
-                    user = User.objects.filter(
-                        Q(phone=contact) | Q(email=contact)&
-                        Q(role__name="dataCollector")
-                    ).first()
-                case "admin":
-                    user = User.objects.filter(
-                        Q(phone=contact) | Q(email=contact)&
-                        Q(role__name="admin")
-                    ).first()
-
-            contact_type = "phone" if serializer.validated_data.get("phone") else "email"
-            
-            if not user:
+            password = serializer.validated_data["password"]
+            users = User.objects.select_related("role")
+            password_verified = None
+
+            try:
+                match account_type:
+                    case "public":
+                        user = users.by_contact(contact).filter(role__name="public").first()
+
+                        if user is None:
+                            # sub-users share their parent's contact; the password tells them apart
+                            sub_users = list(users.by_parent_contact(contact).filter(role__name="subUser"))
+                            if sub_users:
+                                owner = find_password_owner(sub_users, password)
+                                user, password_verified = (owner, True) if owner else (sub_users[0], False)
+
+                    case "dataCollector":
+                        user = users.by_contact(contact).filter(role__name="dataCollector").first()
+                    case "admin":
+                        user = users.by_contact(contact).filter(role__name="admin").first()
+
+                contact_type = "phone" if serializer.validated_data.get("phone") else "email"
+
+                if not user:
+                    return Response(
+                        {"errors": {"user": ["User not found"]}},
+                        status=status.HTTP_404_NOT_FOUND,
+                    )
+                if password_verified is None:
+                    password_verified = verify_password(user, password)
+            except VerificationBusy:
                 return Response(
-                    {"errors": {"user": ["User not found"]}},
-                    status=status.HTTP_404_NOT_FOUND,
+                    {"errors": {"password": ["Too many login attempts in progress, try again shortly"]}},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    headers={"Retry-After": "1"},
                 )
-            if not user.check_password(serializer.validated_data["password"]):
+
+            if not password_verified:
                 return Response(
                     {"errors": {"password": ["Invalid credentials"]}},
                     status=status.HTTP_401_UNAUTHORIZED,
@@ -82,22 +92,13 @@ class login(APIView):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-            session = Session.objects.filter(user=user, visitor_id=visitor_id).first()
-
-            if session:
-                session.remember = serializer.validated_data.get("remember", False)
-                session.user_agent = request.META.get("HTTP_USER_AGENT")
-                session.ip = request.META.get("REMOTE_ADDR")
-                session.update_access_token() # This will also update refresh_token and their expiry
-                session.save()
-            else:
-                session = Session.objects.create(
-                    user=user,
-                    visitor_id=visitor_id,
-                    remember=serializer.validated_data.get("remember", False),
-                    user_agent=request.META.get("HTTP_USER_AGENT"),
-                    ip=request.META.get("REMOTE_ADDR")
-                )
+            session = issue_session(
+                user,
+                visitor_id,
+                remember=serializer.validated_data.get("remember", False),
+                ip=request.META.get("REMOTE_ADDR"),
+                user_agent=request.META.get("HTTP_USER_AGENT"),
+            )
 
             user_data = UserSerializer(user, context={"request": request}).data
             role = user_data.get("roleName", None)
@@ -147,7 +148,35 @@ class login(APIView):
         return Response(serializer.errors, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
 
 
+def _verifiable_sessions(visitor_id):
+    return Session.objects.select_related("user__role").filter(
+        visitor_id=visitor_id, refresh_token_expires__gt=timezone.now()
+    )
+
+
+def _etag_matches(request, etag):
+    if_none_match = request.headers.get("If-None-Match", "")
+    return etag in [tag.strip() for tag in if_none_match.split(",")]
+
+
+def _access_token_live(session, access_token):
+    """True when ``session`` was found by the caller's access token and it hasn't expired."""
+    return (
+        access_token is not None
+        and session.access_token == access_token
+        and session.access_token_expires > timezone.now()
+    )
+
+
 class verify(APIView):
+    """
+    Rotate the access token and return the compact principal of the session.
+
+    Answers ``304 Not Modified`` when the client's ``If-None-Match`` matches the ETag of
+    the principal (user ``updated`` timestamp + role permission version). A 304 for a
+    still-live access token writes nothing: the token is only rotated once it expired.
+    """
+
     def get(self, request):
         access_token = request.COOKIES.get("access-token") or request.headers.get(
             "access-token"
@@ -168,87 +197,89 @@ class verify(APIView):
             response.delete_cookie("refresh-token")
             return response
 
+        sessions = _verifiable_sessions(visitor_id)
+        session = None
         if access_token:
-            session = Session.objects.filter(
-                access_token=access_token, visitor_id=visitor_id
-            ).first()
-            if not session:
-                session = Session.objects.filter(
-                    refresh_token=refresh_token,
-                    visitor_id=visitor_id,
-                    refresh_token_expires__gt=timezone.now(),
-                ).first()
-                if not session:
-                    response = Response(
-                        {"error": "Invalid token"},
-                        status=status.HTTP_401_UNAUTHORIZED,
-                    )
-                    response.delete_cookie("access-token")
-                    response.delete_cookie("refresh-token")
-                    return response
-                session.update_access_token()
-                getUser = User.objects.get(id=session.user.id)
-                response = Response(
-                    {
-                        "message": "Token verified",
-                        "data": UserSerializer(getUser, context={"request": request}).data,
-                    },
-                    status=status.HTTP_200_OK,
-                )
-                response.set_cookie(
-                    "access-token",
-                    session.access_token,
-                    path="/",
-                    max_age=5,
-                    httponly=True,
-                    samesite="None",
-                    secure=False,
-                )
-                return response
-            if (
-                session.access_token_expires < timezone.now()
-                and session.refresh_token_expires > timezone.now()
-            ):
-                session.update_access_token()
-                getUser = User.objects.get(id=session.user.id)
-                response = Response(
-                    {
-                        "message": "Token verified",
-                        "data": UserSerializer(getUser, context={"request": request}).data,
-                    },
-                    status=status.HTTP_200_OK,
-                )
-                response.set_cookie(
-                    "access-token",
-                    session.access_token,
-                    path="/",
-                    max_age=5 ,
-                    httponly=True,
-                    samesite="None",
-                    secure=False,
-                )
-                return response
-
-        session = Session.objects.filter(
-            refresh_token=refresh_token,
-            visitor_id=visitor_id,
-            refresh_token_expires__gt=timezone.now(),
-        ).first()
-        if not session:
+            session = sessions.by_access_token(access_token).first()
+        if session is None:
+            session = sessions.by_refresh_token(refresh_token).first()
+        if session is None:
             response = Response(
                 {"error": "Invalid token"},
                 status=status.HTTP_401_UNAUTHORIZED,
             )
+            response.delete_cookie("access-token")
             response.delete_cookie("refresh-token")
             return response
-        session.update_access_token()
-        getUser = User.objects.get(id=session.user.id)
-        response = Response(
-            {
-                "message": "Token verified",
-                "data": UserSerializer(getUser, context={"request": request}).data,
-            }
-        )
+
+        etag = principal_etag(session.user)
+        not_modified = _etag_matches(request, etag)
+        rotate = not (not_modified and _access_token_live(session, access_token))
+        if rotate:
+            refresh_access_token(session)
+        if not_modified:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(
+                {
+                    "message": "Token verified",
+                    "data": PrincipalSerializer(session.user).data,
+                },
+                status=status.HTTP_200_OK,
+            )
+        response["ETag"] = etag
+        response["Cache-Control"] = "private, no-cache"
+        if rotate:
+            response.set_cookie(
+                "access-token",
+                session.access_token,
+                path="/",
+                max_age=5,
+                httponly=True,
+                samesite="None",
+                secure=False,
+            )
+        return response
+
+
+@require_GET
+async def verify_async(request):
+    """ASGI variant of ``verify``: same contract, no worker thread blocked on the database."""
+    access_token = request.COOKIES.get("access-token") or request.headers.get("access-token")
+    refresh_token = request.COOKIES.get("refresh-token") or request.headers.get("refresh-token")
+    visitor_id = request.COOKIES.get("X-Visitor-ID") or request.headers.get("X-Visitor-ID")
+
+    if not refresh_token:
+        response = JsonResponse({"error": "Credentials not provide"}, status=status.HTTP_401_UNAUTHORIZED)
+        response.delete_cookie("access-token")
+        response.delete_cookie("refresh-token")
+        return response
+
+    sessions = _verifiable_sessions(visitor_id)
+    session = None
+    if access_token:
+        session = await sessions.by_access_token(access_token).afirst()
+    if session is None:
+        session = await sessions.by_refresh_token(refresh_token).afirst()
+    if session is None:
+        response = JsonResponse({"error": "Invalid token"}, status=status.HTTP_401_UNAUTHORIZED)
+        response.delete_cookie("access-token")
+        response.delete_cookie("refresh-token")
+        return response
+
+    etag = await sync_to_async(principal_etag)(session.user)
+    not_modified = _etag_matches(request, etag)
+    rotate = not (not_modified and _access_token_live(session, access_token))
+    if rotate:
+        await arefresh_access_token(session)
+    if not_modified:
+        response = HttpResponseNotModified()
+    else:
+        data = await sync_to_async(lambda: PrincipalSerializer(session.user).data)()
+        response = JsonResponse({"message": "Token verified", "data": data}, status=status.HTTP_200_OK)
+    response["ETag"] = etag
+    response["Cache-Control"] = "private, no-cache"
+    if rotate:
         response.set_cookie(
             "access-token",
             session.access_token,
@@ -258,7 +289,19 @@ class verify(APIView):
             samesite="None",
             secure=False,
         )
-        return response
+    return response
+
+
+def _request_session(request):
+    """The Session behind the request's tokens, or None."""
+    if isinstance(request.auth, Session):
+        return request.auth
+    # principal came from the stateless fast path, resolve the session by token digest
+    access_token, refresh_token = get_request_tokens(request)
+    return (
+        Session.objects.by_access_token(access_token).first()
+        or Session.objects.by_refresh_token(refresh_token).first()
+    )
 
 
 class logout(APIView):
@@ -266,15 +309,20 @@ class logout(APIView):
     permission_classes = [IsAuthenticated]
     def post(self, request):
 
-        print("request.user.is_authenticated",request.user.is_authenticated)
         if not request.user.is_authenticated:
             return Response(
                 {"error": "User is not authenticated"}, status=status.HTTP_401_UNAUTHORIZED
             )
-        session = request.session
-        session.refresh_token_expires = timezone.now()
-        session.access_token_expires = timezone.now()
-        session.save()
+        access_token, refresh_token = get_request_tokens(request)
+        session = _request_session(request)
+        if session:
+            session.refresh_token_expires = timezone.now()
+            session.access_token_expires = timezone.now()
+            session.save(update_fields=['refresh_token_expires', 'access_token_expires', 'updated'])
+
+        claims = Token().decode(access_token) if access_token else None
+        if claims:
+            evict_principal(claims["jti"])
         response = Response(
             {"message": "Logout successful"}, status=status.HTTP_200_OK
         )
@@ -360,7 +408,8 @@ class ApprovedUser(APIView):
             user_to_update.rejected = False
             user_to_update.approved_by = request.user
             user_to_update.approved_at = timezone.now()
-            user_to_update.save(update_fields=['approved','rejected', 'approved_by', 'approved_at'])
+            user_to_update.save(update_fields=['approved','rejected', 'approved_by', 'approved_at', 'updated'])
+            evict_user_principals(user_to_update.id)
             return Response({"status": "success", "message": f"User {user_to_update.first_name} approved"}, status=status.HTTP_200_OK)
 
         elif rejected is True:
@@ -375,7 +424,8 @@ class ApprovedUser(APIView):
             user_to_update.approved = False
             user_to_update.rejected_by = request.user
             user_to_update.rejected_at = timezone.now()
-            user_to_update.save(update_fields=['rejected', 'approved', 'rejected_by', 'rejected_at'])
+            user_to_update.save(update_fields=['rejected', 'approved', 'rejected_by', 'rejected_at', 'updated'])
+            evict_user_principals(user_to_update.id)
             return Response({
                 "status": "success",
                 "message": f"User {user_to_update.first_name} rejected successfully"
@@ -410,16 +460,17 @@ class DeleteUser(APIView):
             if not contact:
                 return Response({"status": "error", "message": "Parent contact is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-            filters = Q(id=user_id) & (Q(parent__email=contact) | Q(parent__phone=contact))
+            users = User.objects.by_parent_contact(contact)
         else:
-            filters = Q(id=user_id) & (Q(email=contact) | Q(phone=contact))
+            users = User.objects.by_contact(contact)
 
-        user_to_delete = User.objects.filter(filters).only('id', 'first_name').first()
+        user_to_delete = users.filter(id=user_id).only('id', 'first_name').first()
 
         if not user_to_delete:
             return Response({"status": "warning", "message": "User not found"}, status=status.HTTP_404_NOT_FOUND)
 
         user_to_delete.delete()
+        evict_user_principals(user_id)
         return Response({"status": "success", "message": f"User {user_to_delete.first_name} deleted"}, status=status.HTTP_200_OK)
 
 class PostponedReinstateUser(APIView):
@@ -447,17 +498,11 @@ class PostponedReinstateUser(APIView):
             if not contact:
                 return Response({"status": "error", "message": "Parent contact is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-            filters = (
-                Q(id=user_id) &
-                (Q(parent__email=contact) | Q(parent__phone=contact)) 
-            )
+            users = User.objects.by_parent_contact(contact)
         else:
-            filters = (
-                Q(id=user_id) &
-                (Q(email=contact) | Q(phone=contact))
-            )
+            users = User.objects.by_contact(contact)
 
-        user_to_update = User.objects.filter(filters).only('id', 'first_name').first()
+        user_to_update = users.filter(id=user_id).only('id', 'first_name').first()
 
         if not user_to_update:
             return Response({"status": "warning", "message": "User not found"}, status=status.HTTP_404_NOT_FOUND)
@@ -477,7 +522,8 @@ class PostponedReinstateUser(APIView):
             case False:
                 user_to_update.postponed = True
 
-        user_to_update.save(update_fields=['postponed'])
+        user_to_update.save(update_fields=['postponed', 'updated'])
+        evict_user_principals(user_to_update.id)
 
         return Response({"status": "success", "message": f"User {user_to_update.first_name} " + ("postponed" if user_to_update.postponed else "reinstated")}, status=status.HTTP_200_OK)
 
@@ -495,15 +541,10 @@ class UserApproveReject(APIView):
             return Response({"status": "error", "message": serializers_data.errors}, status=status.HTTP_400_BAD_REQUEST)
 
         if serializers_data.validated_data.get("identity") != 'subUser':
-            user = User.objects.filter(
-                Q(id=serializers_data.validated_data.get('user_id')) & 
-                (Q(email=serializers_data.validated_data.get('contact')) | Q(phone=serializers_data.validated_data.get('contact')))
-            ).first()
+            users = User.objects.by_contact(serializers_data.validated_data.get('contact'))
         else:
-            user = User.objects.filter(
-                Q(id=serializers_data.validated_data.get('user_id')) & 
-                (Q(parent__email=serializers_data.validated_data.get('contact')) | Q(parent__phone=serializers_data.validated_data.get('contact')))
-            ).first()
+            users = User.objects.by_parent_contact(serializers_data.validated_data.get('contact'))
+        user = users.filter(id=serializers_data.validated_data.get('user_id')).first()
 
         if not user:
             return Response({"status": "warning", "message": "User not found"}, status=status.HTTP_404_NOT_FOUND)
@@ -514,7 +555,8 @@ class UserApproveReject(APIView):
             user.rejected = False
             user.approved_by = request.user
             user.approved_at = timezone.now()
-            user.save(update_fields=['approved','rejected', 'approved_by', 'approved_at'])
+            user.save(update_fields=['approved','rejected', 'approved_by', 'approved_at', 'updated'])
+            evict_user_principals(user.id)
             return Response({"status": "success", "message": f"User {user.first_name} approved"}, status=status.HTTP_200_OK)
 
         elif serializers_data.validated_data.get('rejected') is True:
@@ -522,7 +564,8 @@ class UserApproveReject(APIView):
             user.approved = False
             user.rejected_by = request.user
             user.rejected_at = timezone.now()
-            user.save(update_fields=['approved','rejected', 'approved_by', 'approved_at', 'rejected_by', 'rejected_at'])
+            user.save(update_fields=['approved','rejected', 'approved_by', 'approved_at', 'rejected_by', 'rejected_at', 'updated'])
+            evict_user_principals(user.id)
             return Response({"status": "success", "message": f"User {user.first_name} rejected"}, status=status.HTTP_200_OK)
 
 
@@ -552,7 +595,7 @@ class UpdateUsers(APIView):
             # Update user
             user.first_name = validated.get('first_name', user.first_name)
             user.last_name = validated.get('last_name', user.last_name)
-            user.save(update_fields=['first_name', 'last_name'])
+            user.save(update_fields=['first_name', 'last_name', 'updated'])
 
             # Update profile
             profile.name_bn = validated.get('name_bn', profile.name_bn)
@@ -563,6 +606,9 @@ class UpdateUsers(APIView):
             transaction.set_rollback(True)
             return Response({"status": "error", "message": f"Update failed: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+        # cached principals still carry the old names
+        transaction.on_commit(lambda: evict_user_principals(user.id))
+
         return Response({"status": "success", "message": "User updated successfully"}, status=status.HTTP_200_OK)
 
 
@@ -578,15 +624,29 @@ class UpdateUserPassword(APIView):
             return Response({"status": "error", "message": serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
 
         validated = serializer.validated_data
-        user = User.objects.filter(id=user.id, password=validated['current_password']).first()
-        if not user:
+        user = User.objects.select_related("role").filter(id=user.id).first()
+        try:
+            password_verified = user is not None and verify_password(user, validated['current_password'])
+        except VerificationBusy:
+            return Response({"status": "error", "message": "Server busy, try again shortly"}, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={"Retry-After": "1"})
+        if not password_verified:
             return Response({"status": "error", "message": "Invalid current password"}, status=status.HTTP_404_NOT_FOUND)
 
         try:
-            user.set_password(validated['new_password'])
-            user.save(update_fields=['password'])
+            with transaction.atomic():
+                user.set_password(validated['new_password'])
+                user.save(update_fields=['password'])
+                # sign out every other device; this one keeps its session
+                now = timezone.now()
+                current = _request_session(request)
+                Session.objects.filter(user=user).exclude(pk=current.pk if current else None).update(
+                    access_token_expires=now, refresh_token_expires=now, updated=now,
+                )
 
         except Exception as e:
             return Response({"status": "error", "message": f"Update failed: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+        # drop cached principals (old password hash) and with them the revoked tokens' fast path
+        evict_user_principals(user.id)
+
         return Response({"status": "success", "message": "User updated successfully"}, status=status.HTTP_200_OK)
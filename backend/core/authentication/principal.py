@@ -0,0 +1,105 @@
+from django.core.cache import cache
+from django.utils import timezone
+
+from apps.permissions.cache import (
+    PERMISSIONS_VERSION_KEY, aget_role_permissions, get_role_permissions, permissions_version,
+    shared_timeout,
+)
+
+
+PRINCIPAL_KEY = "auth:principal:{jti}"
+USER_VERSION_KEY = "auth:principal-version:{user_id}"
+
+
+def _user_version_key(user_id):
+    return USER_VERSION_KEY.format(user_id=user_id)
+
+
+def build_principal(user):
+    """Everything the hot path needs about ``user`` (user must have ``role`` selected)."""
+    role = user.role
+    return {
+        "user": user,
+        "role": role.name if role else None,
+        "page_permissions": get_role_permissions(user.role_id),
+    }
+
+
+def _is_stale(principal, cached, version_key):
+    """Revoked user, or role permissions changed since the principal was cached."""
+    return (
+        principal["version"] != cached.get(version_key, 0)
+        or principal["permissions_version"] != cached.get(PERMISSIONS_VERSION_KEY)
+    )
+
+
+def get_principal(jti, user_id):
+    """Return the cached principal for an access token id, or None on miss/revocation."""
+    principal_key = PRINCIPAL_KEY.format(jti=jti)
+    version_key = _user_version_key(user_id)
+    cached = cache.get_many([principal_key, version_key, PERMISSIONS_VERSION_KEY])
+
+    principal = cached.get(principal_key)
+    if not principal or principal["user"].pk != user_id:
+        return None
+    if _is_stale(principal, cached, version_key):
+        cache.delete(principal_key)
+        return None
+    return principal
+
+
+def cache_principal(jti, user, expires):
+    """Cache the principal for an access token until the token itself expires (see shared_timeout)."""
+    timeout = int((expires - timezone.now()).total_seconds())
+    if timeout <= 0:
+        return None
+    principal = build_principal(user)
+    principal["version"] = cache.get(_user_version_key(user.pk), 0)
+    principal["permissions_version"] = permissions_version()
+    cache.set(PRINCIPAL_KEY.format(jti=jti), principal, timeout=shared_timeout(timeout))
+    return principal
+
+
+def evict_principal(jti):
+    cache.delete(PRINCIPAL_KEY.format(jti=jti))
+
+
+def evict_user_principals(user_id):
+    """Invalidate every cached principal of a user by bumping their version."""
+    version_key = _user_version_key(user_id)
+    cache.add(version_key, 0, timeout=None)
+    try:
+        cache.incr(version_key)
+    except ValueError:
+        # evicted between add() and incr(); any non-zero value invalidates old entries
+        cache.set(version_key, 1, timeout=None)
+
+
+async def aget_principal(jti, user_id):
+    principal_key = PRINCIPAL_KEY.format(jti=jti)
+    version_key = _user_version_key(user_id)
+    cached = await cache.aget_many([principal_key, version_key, PERMISSIONS_VERSION_KEY])
+
+    principal = cached.get(principal_key)
+    if not principal or principal["user"].pk != user_id:
+        return None
+    if _is_stale(principal, cached, version_key):
+        await cache.adelete(principal_key)
+        return None
+    return principal
+
+
+async def acache_principal(jti, user, expires):
+    timeout = int((expires - timezone.now()).total_seconds())
+    if timeout <= 0:
+        return None
+    role = user.role
+    principal = {
+        "user": user,
+        "role": role.name if role else None,
+        "page_permissions": await aget_role_permissions(user.role_id),
+        "version": await cache.aget(_user_version_key(user.pk), 0),
+        "permissions_version": await cache.aget_or_set(PERMISSIONS_VERSION_KEY, 1, timeout=None),
+    }
+    await cache.aset(PRINCIPAL_KEY.format(jti=jti), principal, timeout=shared_timeout(timeout))
+    return principal
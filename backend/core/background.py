@@ -0,0 +1,192 @@
+"""
+Process-wide background work.
+
+Two entry points share one bounded worker pool per process:
+
+* ``run_in_background(fn, *args)`` runs any callable (closures included) on the
+  pool. Used for in-process work such as refreshing a cached response.
+* ``@background_task("name")`` registers a function taking plain, serializable
+  arguments; ``task.delay(*args)`` then runs it on the configured backend:
+
+  - ``thread`` (default): the local pool;
+  - ``celery``: a Celery worker, via the ``core.background.run_task`` task
+    (``CELERY_BROKER_URL="memory://"`` keeps it in-process for tests);
+  - ``inline``: synchronously, in the caller.
+
+At most ``BACKGROUND_TASKS_MAX_QUEUE`` jobs may be queued or running on the
+pool; past that ``BackgroundQueueFull`` is raised instead of letting work (and
+threads) pile up. ``metrics()`` reports the pool's counters for this process.
+
+An unknown backend, or ``celery`` without Celery installed, raises
+``ImproperlyConfigured`` on the first ``delay()``.
+"""
+import functools
+import importlib
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import close_old_connections
+
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundQueueFull(Exception):
+    """``BACKGROUND_TASKS_MAX_QUEUE`` jobs are already waiting or running."""
+
+
+class _Pool:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._depth = 0
+        self._counters = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0}
+        self._busy_seconds = 0.0
+        self._max_depth = 0
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=settings.BACKGROUND_TASKS_WORKERS, thread_name_prefix="background",
+            )
+        return self._executor
+
+    def submit(self, fn, *args, **kwargs):
+        with self._lock:
+            if self._depth >= settings.BACKGROUND_TASKS_MAX_QUEUE:
+                self._counters["rejected"] += 1
+                raise BackgroundQueueFull(f"{self._depth} background jobs pending")
+            self._depth += 1
+            self._max_depth = max(self._max_depth, self._depth)
+            self._counters["submitted"] += 1
+            executor = self._get_executor()
+        try:
+            return executor.submit(self._run, fn, args, kwargs)
+        except RuntimeError:
+            # interpreter shutting down
+            self._finish("failed", 0.0)
+            raise
+
+    def _run(self, fn, args, kwargs):
+        started = time.perf_counter()
+        outcome = "completed"
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            outcome = "failed"
+            logger.exception("Background job %s failed", getattr(fn, "__qualname__", fn))
+        finally:
+            close_old_connections()
+            self._finish(outcome, time.perf_counter() - started)
+
+    def _finish(self, outcome, seconds):
+        with self._lock:
+            self._depth -= 1
+            self._counters[outcome] += 1
+            self._busy_seconds += seconds
+
+    def metrics(self):
+        with self._lock:
+            return {
+                **self._counters,
+                "pending": self._depth,
+                "max_pending": self._max_depth,
+                "workers": settings.BACKGROUND_TASKS_WORKERS,
+                "queue_limit": settings.BACKGROUND_TASKS_MAX_QUEUE,
+                "busy_seconds": round(self._busy_seconds, 3),
+            }
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+_pool = _Pool()
+
+
+def run_in_background(fn, *args, **kwargs):
+    """Run ``fn`` on this process's bounded pool; raises ``BackgroundQueueFull`` when saturated."""
+    return _pool.submit(fn, *args, **kwargs)
+
+
+def metrics():
+    return _pool.metrics()
+
+
+def shutdown(wait=True):
+    """Stop the pool (tests, or a worker's graceful exit)."""
+    _pool.shutdown(wait=wait)
+
+
+# -- named tasks --------------------------------------------------------------
+
+_registry = {}
+
+BACKENDS = ("thread", "celery", "inline")
+
+
+def _backend():
+    backend = settings.BACKGROUND_TASKS_BACKEND
+    if backend not in BACKENDS:
+        raise ImproperlyConfigured(f"BACKGROUND_TASKS_BACKEND must be one of {', '.join(BACKENDS)}, not {backend!r}")
+    if backend == "celery" and run_task is None:
+        raise ImproperlyConfigured('BACKGROUND_TASKS_BACKEND = "celery" requires Celery to be installed')
+    return backend
+
+
+class BackgroundTask:
+    def __init__(self, name, fn):
+        self.name = name
+        self.fn = fn
+        functools.update_wrapper(self, fn)
+
+    def __call__(self, *args, **kwargs):
+        return self.fn(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        """Run the task on the configured backend with JSON-serializable arguments."""
+        backend = _backend()
+        if backend == "inline":
+            return self.fn(*args, **kwargs)
+        if backend == "celery":
+            return run_task.delay(self.name, list(args), kwargs)
+        return run_in_background(self.fn, *args, **kwargs)
+
+
+def background_task(name):
+    """Register the decorated function as a named background task."""
+    def decorator(fn):
+        if name in _registry and _registry[name].fn is not fn:
+            raise ValueError(f"Background task {name!r} is already registered")
+        task = _registry[name] = BackgroundTask(name, fn)
+        return task
+    return decorator
+
+
+def get_task(name):
+    """Registered task by name, importing ``<app>.tasks`` modules on first miss (Celery workers)."""
+    if name not in _registry:
+        from django.apps import apps
+        for config in apps.get_app_configs():
+            try:
+                importlib.import_module(f"{config.name}.tasks")
+            except ModuleNotFoundError as error:
+                if error.name != f"{config.name}.tasks":
+                    raise
+    return _registry[name]
+
+
+try:
+    from celery import shared_task
+except ImportError:  # Celery is optional unless BACKGROUND_TASKS_BACKEND = "celery"
+    run_task = None
+else:
+    @shared_task(name="core.background.run_task", ignore_result=True)
+    def run_task(name, args, kwargs):
+        return get_task(name).fn(*args, **kwargs)
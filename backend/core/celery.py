@@ -0,0 +1,20 @@
+"""
+Celery application, used when ``BACKGROUND_TASKS_BACKEND = "celery"`` and by the
+periodic tasks in ``<app>/tasks.py``. Start a worker with::
+
+    celery -A core worker -l info
+
+and the periodic tasks in ``CELERY_BEAT_SCHEDULE`` with::
+
+    celery -A core beat -l info
+"""
+import os
+
+from celery import Celery
+
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+app = Celery('core')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
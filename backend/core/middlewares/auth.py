@@ -1,4 +1,5 @@
 from apps.user_auth.models import Session
+from apps.user_auth.services import refresh_access_token
 from core.utils.exceptions import Unauthorized
 from django.contrib.auth.models import AnonymousUser
 
@@ -27,15 +28,15 @@ class JwtTokenMiddleware(object):
         )
 
         if access_token:
-            session = Session.objects.filter(access_token=access_token).first()
+            session = Session.objects.by_access_token(access_token).first()
             if not session:
                 if refresh_token:
-                    session = Session.objects.filter(
-                        refresh_token=refresh_token
+                    session = Session.objects.by_refresh_token(
+                        refresh_token
                     ).first()
                     if not session:
                         return self._set_invalid_session_response(request)
-                    session.update_access_token()
+                    refresh_access_token(session)
                     self.access_token = session.access_token
                     self.access_token_expires = session.access_token_expires
                     request.session = session
@@ -47,13 +48,12 @@ class JwtTokenMiddleware(object):
                 request.user = session.user
 
         elif refresh_token:
-            session = Session.objects.filter(
-                refresh_token=refresh_token,
+            session = Session.objects.by_refresh_token(refresh_token).filter(
                 visitor_id=visitor_id,
             ).first()
             if not session:
                 return self._set_invalid_session_response(request)
-            session.update_access_token()
+            refresh_access_token(session)
             self.access_token = session.access_token
             self.access_token_expires = session.access_token_expires
             request.session = session
@@ -61,7 +61,6 @@ class JwtTokenMiddleware(object):
         else:
             request.session = None
             request.user = AnonymousUser()
-        print("request.user------->", request.user)
         return request
 
     def __call__(self, request):
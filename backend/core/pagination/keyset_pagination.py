@@ -0,0 +1,218 @@
+import base64
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import connection
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .user_pagination import UserPagination, apaginate_queryset
+
+
+def approximate_count(queryset):
+    """Planner row estimate on PostgreSQL (no scan), exact COUNT(*) elsewhere."""
+    if connection.vendor != "postgresql":
+        return queryset.count()
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def _encode_key(value):
+    # full isoformat: DjangoJSONEncoder drops microseconds, which would break seeks
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset ("seek") pagination: each page is ``WHERE (keys) < (last row's keys)
+    ORDER BY keys LIMIT n``, so page 1000 costs the same as page 1.
+
+    Keys are the queryset's own ordering (or ``ordering`` when it has none) plus
+    the primary key as tie-breaker. Cursors are opaque; ``?with_total=1`` adds an
+    approximate ``count``. Requests that still send ``?page=`` — or querysets
+    ordered on nullable columns or expressions, which a keyset can't seek on —
+    are served by ``legacy_pagination_class`` unchanged.
+    """
+    page_size = UserPagination.page_size
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    total_query_param = 'with_total'
+    ordering = ('-created', '-id')
+    legacy_pagination_class = UserPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self._start(queryset, request):
+            self.legacy = self.legacy_pagination_class()
+            self.legacy.page_size = self.page_size
+            return self.legacy.paginate_queryset(queryset, request, view)
+        if self._wants_total():
+            self.count = approximate_count(queryset)
+        return self._take(list(self._page_queryset(queryset)))
+
+    async def apaginate_queryset(self, queryset, request):
+        """
+        ``paginate_queryset`` for plain Django async views. Returns ``(rows, payload)``
+        where ``payload`` has the keys of ``get_paginated_response`` but ``results``.
+        """
+        if self._start(queryset, request):
+            return await apaginate_queryset(queryset, request, self.legacy_pagination_class)
+        if self._wants_total():
+            self.count = await sync_to_async(approximate_count)(queryset)
+        rows = self._take([row async for row in self._page_queryset(queryset)])
+        return rows, self._payload()
+
+    def get_paginated_response(self, data):
+        if self.legacy is not None:
+            return self.legacy.get_paginated_response(data)
+        return Response({**self._payload(), "results": data})
+
+    def _payload(self):
+        payload = {"next": self.get_next_link(), "previous": self.get_previous_link()}
+        if self.count is not None:
+            payload["count"] = self.count
+        return payload
+
+    def _start(self, queryset, request):
+        """Reset the per-request state; True when ``legacy_pagination_class`` serves the request."""
+        self.request = request
+        # DRF requests carry ``query_params``, plain Django ones (async views) only ``GET``
+        self.params = getattr(request, "query_params", request.GET)
+        self.legacy = None
+        self.count = None
+        self.keys = self._keys(queryset)
+        legacy_page = self.legacy_pagination_class.page_query_param in self.params
+        return self.keys is None or (legacy_page and self.cursor_query_param not in self.params)
+
+    def _wants_total(self):
+        return self.params.get(self.total_query_param) in ('1', 'true')
+
+    def _page_queryset(self, queryset):
+        """One row more than a page, seeked past the cursor, in fetch order."""
+        self.page_size = self._page_size()
+        self.position, self.reverse = self._decode_cursor(queryset)
+        if self.position is not None:
+            queryset = queryset.filter(self._seek(self.position, self.reverse))
+        ordering = [self._flip(key) for key in self.keys] if self.reverse else self.keys
+        return queryset.order_by(*ordering)[:self.page_size + 1]
+
+    def _take(self, rows):
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.position is not None
+        self.page = rows
+        return rows
+
+    def get_next_link(self):
+        if self.legacy is not None:
+            return self.legacy.get_next_link()
+        if not self.has_next or not self.page:
+            return None
+        return self._link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if self.legacy is not None:
+            return self.legacy.get_previous_link()
+        if not self.has_previous or not self.page:
+            return None
+        return self._link(self.page[0], reverse=True)
+
+    def _page_size(self):
+        try:
+            size = int(self.params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def _keys(self, queryset):
+        """Ordering keys with a pk tie-breaker, or None when they can't be sought on."""
+        keys = list(queryset.query.order_by or self.ordering)
+        pk_name = queryset.model._meta.pk.name
+        if not all(isinstance(key, str) and key != '?' for key in keys):
+            return None
+        if not any(key.lstrip('-') in (pk_name, 'pk') for key in keys):
+            keys.append(f"-{pk_name}" if keys and keys[-1].startswith('-') else pk_name)
+        for key in keys:
+            name = key.lstrip('-')
+            if name in queryset.query.annotations:
+                continue
+            if '__' in name:
+                return None
+            try:
+                field = queryset.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                return None
+            if field.null:
+                return None
+        return keys
+
+    @staticmethod
+    def _flip(key):
+        return key[1:] if key.startswith('-') else f"-{key}"
+
+    def _seek(self, position, reverse):
+        """(k1, k2, ...) strictly after ``position`` in the (possibly reversed) ordering."""
+        query = Q()
+        equal = Q()
+        for key, value in zip(self.keys, position):
+            name = key.lstrip('-')
+            descending = key.startswith('-') != reverse
+            query |= equal & Q(**{f"{name}__{'lt' if descending else 'gt'}": value})
+            equal &= Q(**{name: value})
+        return query
+
+    def _value(self, row, name):
+        return row[name] if isinstance(row, dict) else getattr(row, name)
+
+    def _link(self, row, reverse):
+        position = [self._value(row, key.lstrip('-')) for key in self.keys]
+        payload = json.dumps({"p": position, "r": int(reverse)}, default=_encode_key)
+        cursor = base64.urlsafe_b64encode(payload.encode()).decode()
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.legacy_pagination_class.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def _key_field(self, queryset, name):
+        if name in queryset.query.annotations:
+            return queryset.query.annotations[name].output_field
+        return queryset.model._meta.get_field(name)
+
+    def _decode_cursor(self, queryset):
+        cursor = self.params.get(self.cursor_query_param)
+        if not cursor:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+            position, reverse = payload["p"], bool(payload["r"])
+        except (TypeError, ValueError, KeyError, UnicodeDecodeError):
+            raise NotFound("Invalid cursor")
+        if not isinstance(position, list) or len(position) != len(self.keys):
+            raise NotFound("Invalid cursor")
+        # a tampered cursor must be a 404, not a 500 from the seek query
+        values = []
+        for key, value in zip(self.keys, position):
+            if value is None or isinstance(value, (list, dict)):
+                raise NotFound("Invalid cursor")
+            try:
+                value = self._key_field(queryset, key.lstrip('-')).to_python(value)
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound("Invalid cursor")
+            if value is None:
+                raise NotFound("Invalid cursor")
+            values.append(value)
+        return values, reverse
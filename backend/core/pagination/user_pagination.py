@@ -1,7 +1,41 @@
 # paginations.py
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 class UserPagination(PageNumberPagination):
     page_size = 5  # Initial page size
     page_size_query_param = 'page_size'  # Allow clients to override
     max_page_size = 100
+
+
+async def apaginate_queryset(queryset, request, pagination_class=UserPagination):
+    """
+    Async page-number pagination for plain Django async views.
+
+    Returns ``(rows, payload)`` where ``payload`` has the same ``count``/``next``/``previous``
+    keys as ``pagination_class.get_paginated_response`` (fill in ``results`` yourself).
+    """
+    paginator = pagination_class()
+    page_size = paginator.page_size
+    try:
+        page_size = min(int(request.GET.get(paginator.page_size_query_param, page_size)), paginator.max_page_size)
+        page = max(int(request.GET.get(paginator.page_query_param, 1)), 1)
+    except ValueError:
+        page = 1
+    page_size = max(page_size, 1)
+
+    count = await queryset.acount()
+    offset = (page - 1) * page_size
+    rows = [row async for row in queryset[offset:offset + page_size]]
+
+    url = request.build_absolute_uri()
+    next_url = None
+    if offset + page_size < count:
+        next_url = replace_query_param(url, paginator.page_query_param, page + 1)
+    previous_url = None
+    if page > 2:
+        previous_url = replace_query_param(url, paginator.page_query_param, page - 1)
+    elif page == 2:
+        previous_url = remove_query_param(url, paginator.page_query_param)
+
+    return rows, {"count": count, "next": next_url, "previous": previous_url}
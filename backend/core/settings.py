@@ -50,6 +50,7 @@ INSTALLED_APPS = [
     'apps.statistic_table',
     'apps.permissions',
     'apps.reports',
+    'apps.notifications',
     
 ]
 
@@ -104,6 +105,100 @@ DATABASES = {
 }
 
 
+# Cache
+# Auth principals and statistics are cached here; use a shared backend (Redis)
+# in production so revocations are seen by every worker.
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# The LocMemCache fallback is per process: a revocation (role permission change,
+# profile/password update, logout) only reaches the worker that handled it. So
+# entries other workers must see invalidated are then kept at most this many
+# seconds (apps.permissions.cache.shared_timeout).
+LOCAL_CACHE_MAX_TIMEOUT = int(os.getenv('LOCAL_CACHE_MAX_TIMEOUT', 30))
+
+
+# JWT authentication
+# Verify access tokens locally and serve the principal from cache, hitting the
+# session table only on cache miss or revocation.
+JWT_STATELESS_AUTH = os.getenv('JWT_STATELESS_AUTH', 'true').lower() == 'true'
+
+
+# Per-collector registration counters (apps.accounts.models.CollectorCounter);
+# when disabled the collector views count with a single annotated query instead.
+COLLECTOR_COUNTERS_ENABLED = os.getenv('COLLECTOR_COUNTERS_ENABLED', 'true').lower() == 'true'
+
+# Seconds the admin/collector dashboard counters are served from cache; writes
+# that move a counter invalidate it explicitly before the TTL runs out.
+DASHBOARD_COUNTERS_TIMEOUT = int(os.getenv('DASHBOARD_COUNTERS_TIMEOUT', 30))
+
+# Contact verification codes (apps.accounts.otp), stored hashed in the shared
+# cache when REDIS_URL is set and in their own table otherwise: digits per code, seconds a code stays valid, wrong guesses allowed per code,
+# and the minimum seconds between two codes for the same contact.
+OTP_LENGTH = int(os.getenv('OTP_LENGTH', 6))
+OTP_TTL = int(os.getenv('OTP_TTL', 300))
+OTP_MAX_ATTEMPTS = int(os.getenv('OTP_MAX_ATTEMPTS', 5))
+OTP_RESEND_COOLDOWN = int(os.getenv('OTP_RESEND_COOLDOWN', 60))
+
+# Background work (core.background): one bounded pool per process. Named tasks
+# run on BACKGROUND_TASKS_BACKEND: "thread" (the pool), "celery" or "inline".
+BACKGROUND_TASKS_BACKEND = os.getenv('BACKGROUND_TASKS_BACKEND', 'thread')
+BACKGROUND_TASKS_WORKERS = int(os.getenv('BACKGROUND_TASKS_WORKERS', 4))
+BACKGROUND_TASKS_MAX_QUEUE = int(os.getenv('BACKGROUND_TASKS_MAX_QUEUE', 1000))
+CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'memory://')
+CELERY_TASK_ALWAYS_EAGER = os.getenv('CELERY_TASK_ALWAYS_EAGER', 'false').lower() == 'true'
+
+# Periodic tasks, run by ``celery -A core beat``: expired sessions are reaped
+# every SESSION_REAP_INTERVAL seconds, at most SESSION_REAP_MAX_BATCHES batches
+# of SESSION_REAP_BATCH_SIZE rows per run.
+SESSION_REAP_INTERVAL = int(os.getenv('SESSION_REAP_INTERVAL', 60 * 60))
+SESSION_REAP_BATCH_SIZE = int(os.getenv('SESSION_REAP_BATCH_SIZE', 1000))
+SESSION_REAP_MAX_BATCHES = int(os.getenv('SESSION_REAP_MAX_BATCHES', 100))
+CELERY_BEAT_SCHEDULE = {
+    'reap-expired-sessions': {
+        'task': 'user_auth.reap_expired_sessions',
+        'schedule': SESSION_REAP_INTERVAL,
+        'kwargs': {'batch_size': SESSION_REAP_BATCH_SIZE, 'max_batches': SESSION_REAP_MAX_BATCHES},
+    },
+}
+
+# Bulk registration (accounts/register/bulk): rows per request, rows per
+# insert transaction, and the size cap for each photo in the uploaded zip.
+BULK_REGISTRATION_MAX_ROWS = int(os.getenv('BULK_REGISTRATION_MAX_ROWS', 1000))
+BULK_REGISTRATION_CHUNK_SIZE = int(os.getenv('BULK_REGISTRATION_CHUNK_SIZE', 100))
+BULK_REGISTRATION_MAX_PHOTO_BYTES = int(os.getenv('BULK_REGISTRATION_MAX_PHOTO_BYTES', 5 * 1024 * 1024))
+
+# Offline sync tokens are backdated by this many seconds so address changes
+# committed while a token was being issued are sent again, not lost.
+SYNC_TOKEN_SKEW = int(os.getenv('SYNC_TOKEN_SKEW', 60))
+
+# Admin statistic endpoints are served stale-while-revalidate: bodies younger
+# than STATISTICS_CACHE_FRESH seconds are returned as is, older ones (up to
+# STATISTICS_CACHE_STALE) are returned while a background worker refreshes them.
+STATISTICS_CACHE_ENABLED = os.getenv('STATISTICS_CACHE_ENABLED', 'true').lower() == 'true'
+STATISTICS_CACHE_FRESH = int(os.getenv('STATISTICS_CACHE_FRESH', 10))
+STATISTICS_CACHE_STALE = int(os.getenv('STATISTICS_CACHE_STALE', 300))
+STATISTICS_CACHE_LOCK_TIMEOUT = int(os.getenv('STATISTICS_CACHE_LOCK_TIMEOUT', 10))
+
+# PaymentLog is partitioned by month on PostgreSQL. The admin table shows the
+# most recent PAYMENT_LOG_RECENT_MONTHS unless asked for more, and
+# `archive_payment_logs` moves months past the retention window to files.
+PAYMENT_LOG_RECENT_MONTHS = int(os.getenv('PAYMENT_LOG_RECENT_MONTHS', 3))
+PAYMENT_LOG_RETENTION_MONTHS = int(os.getenv('PAYMENT_LOG_RETENTION_MONTHS', 24))
+PAYMENT_LOG_ARCHIVE_DIR = os.getenv('PAYMENT_LOG_ARCHIVE_DIR', os.path.join(BASE_DIR, 'archive', 'payment_logs'))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -123,15 +218,61 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Password hashing policy
+# PBKDF2 iteration budget per role; hashes made under another budget are
+# transparently re-encoded on the next successful login. Every role defaults to
+# Django 5.2's own PBKDF2 budget; a deployment may lower one only explicitly.
+PASSWORD_HASH_ITERATIONS_DEFAULT = 1_000_000
+PASSWORD_HASH_ITERATIONS_BY_ROLE = {
+    "admin": int(os.getenv('PASSWORD_HASH_ITERATIONS_ADMIN', PASSWORD_HASH_ITERATIONS_DEFAULT)),
+    "dataCollector": int(os.getenv('PASSWORD_HASH_ITERATIONS_COLLECTOR', PASSWORD_HASH_ITERATIONS_DEFAULT)),
+    "public": int(os.getenv('PASSWORD_HASH_ITERATIONS_PUBLIC', PASSWORD_HASH_ITERATIONS_DEFAULT)),
+    "subUser": int(os.getenv('PASSWORD_HASH_ITERATIONS_SUBUSER', PASSWORD_HASH_ITERATIONS_DEFAULT)),
+}
+# Concurrent password verifications per process and how long a login waits
+# for a free slot before answering 503.
+PASSWORD_VERIFY_CONCURRENCY = int(os.getenv('PASSWORD_VERIFY_CONCURRENCY', os.cpu_count() or 1))
+PASSWORD_VERIFY_TIMEOUT = float(os.getenv('PASSWORD_VERIFY_TIMEOUT', 2))
+
+
 
 # send email via smtp
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
-EMAIL_HOST = 'smtp.gmail.com'
-EMAIL_PORT = 587
-EMAIL_USE_TLS = True
+EMAIL_HOST = os.getenv('EMAIL_HOST', 'smtp.gmail.com')
+EMAIL_PORT = int(os.getenv('EMAIL_PORT', 587))
+EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', 'true').lower() == 'true'
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER') 
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD') 
 
+# Notification outbox (apps.notifications): messages per delivery batch (one
+# connection each), attempts before a message is dead-lettered, the retry
+# backoff (base doubling per attempt, capped), and how long a claimed batch is
+# leased to a worker before another may pick it up. Sent and dead messages are
+# deleted NOTIFICATION_RETENTION_DAYS after their last update.
+NOTIFICATION_BATCH_SIZE = int(os.getenv('NOTIFICATION_BATCH_SIZE', 50))
+NOTIFICATION_MAX_ATTEMPTS = int(os.getenv('NOTIFICATION_MAX_ATTEMPTS', 6))
+NOTIFICATION_RETRY_BASE = int(os.getenv('NOTIFICATION_RETRY_BASE', 30))
+NOTIFICATION_RETRY_MAX = int(os.getenv('NOTIFICATION_RETRY_MAX', 3600))
+NOTIFICATION_LEASE_SECONDS = int(os.getenv('NOTIFICATION_LEASE_SECONDS', 300))
+NOTIFICATION_RETENTION_DAYS = int(os.getenv('NOTIFICATION_RETENTION_DAYS', 7))
+
+# Queue a welcome message (verify the contact, pay the fee) to the phone or
+# email a new account registers with. Off until the registration flow relies on it.
+SEND_REGISTRATION_WELCOME = os.getenv('SEND_REGISTRATION_WELCOME', 'false').lower() == 'true'
+
+# SMS delivery (apps.notifications.sms): the backend ("...FakeSmsBackend" keeps
+# messages in memory for tests), the gateway endpoint and credentials, numbers
+# per multi-recipient request, keep-alive connections (= requests in flight)
+# per process, and the shared token the gateway's delivery receipts carry.
+SMS_BACKEND = os.getenv('SMS_BACKEND', 'apps.notifications.sms.HttpSmsBackend')
+SMS_GATEWAY_URL = os.getenv('SMS_GATEWAY_URL', '')
+SMS_API_KEY = os.getenv('SMS_API_KEY', '')
+SMS_SENDER_ID = os.getenv('SMS_SENDER_ID', '')
+SMS_MAX_RECIPIENTS = int(os.getenv('SMS_MAX_RECIPIENTS', 100))
+SMS_MAX_CONNECTIONS = int(os.getenv('SMS_MAX_CONNECTIONS', 4))
+SMS_TIMEOUT = float(os.getenv('SMS_TIMEOUT', 10))
+SMS_RECEIPT_TOKEN = os.getenv('SMS_RECEIPT_TOKEN', '')
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -0,0 +1,65 @@
+import threading
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.test import SimpleTestCase, override_settings
+
+from . import background
+
+
+@override_settings(BACKGROUND_TASKS_WORKERS=1, BACKGROUND_TASKS_MAX_QUEUE=1)
+class BackgroundPoolTests(SimpleTestCase):
+    def setUp(self):
+        self.pool = background._Pool()
+        self.addCleanup(self.pool.shutdown)
+
+    def test_submissions_past_the_queue_limit_are_rejected(self):
+        release = threading.Event()
+        running = self.pool.submit(release.wait, 5)
+
+        with self.assertRaises(background.BackgroundQueueFull):
+            self.pool.submit(print, "never runs")
+        self.assertEqual(self.pool.metrics()["rejected"], 1)
+        self.assertEqual(self.pool.metrics()["pending"], 1)
+
+        release.set()
+        running.result(timeout=5)
+        self.pool.submit(int, "1").result(timeout=5)
+        self.assertEqual(self.pool.metrics()["completed"], 2)
+
+    def test_metrics_count_every_outcome(self):
+        self.pool.submit(int, "1").result(timeout=5)
+        with self.assertLogs("core.background", "ERROR"):
+            self.pool.submit(int, "not a number").result(timeout=5)
+
+        metrics = self.pool.metrics()
+
+        self.assertEqual(
+            {key: metrics[key] for key in ("submitted", "completed", "failed", "rejected", "pending", "max_pending")},
+            {"submitted": 2, "completed": 1, "failed": 1, "rejected": 0, "pending": 0, "max_pending": 1},
+        )
+        self.assertEqual((metrics["workers"], metrics["queue_limit"]), (1, 1))
+        self.assertGreaterEqual(metrics["busy_seconds"], 0)
+
+
+class BackgroundTaskTests(SimpleTestCase):
+    task = background.BackgroundTask("tests.double", lambda value: value * 2)
+
+    @override_settings(BACKGROUND_TASKS_BACKEND="inline")
+    def test_inline_runs_in_the_caller(self):
+        self.assertEqual(self.task.delay(21), 42)
+
+    @override_settings(BACKGROUND_TASKS_BACKEND="thread")
+    def test_thread_runs_on_the_pool(self):
+        self.assertEqual(self.task.delay(21).result(timeout=5), 42)
+
+    @override_settings(BACKGROUND_TASKS_BACKEND="celery")
+    def test_celery_backend_without_celery_is_a_configuration_error(self):
+        with mock.patch.object(background, "run_task", None):
+            with self.assertRaises(ImproperlyConfigured):
+                self.task.delay(21)
+
+    @override_settings(BACKGROUND_TASKS_BACKEND="rq")
+    def test_unknown_backend_is_a_configuration_error(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.task.delay(21)
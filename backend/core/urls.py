@@ -27,4 +27,5 @@ urlpatterns = [
     path('address/', include('apps.address.urls')),
     path('data/', include('apps.statistic_table.urls')),
     path('reports/', include('apps.reports.urls')),
+    path('notifications/', include('apps.notifications.urls')),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,37 @@
+import re
+
+
+BD_COUNTRY_CODE = "880"
+
+
+def normalize_email(value):
+    """Lower-cased, trimmed email or None."""
+    if not value:
+        return None
+    value = value.strip().lower()
+    return value or None
+
+
+def normalize_phone(value):
+    """
+    Canonical 11-digit local phone number (``01XXXXXXXXX``) or None.
+
+    Accepts spaces/dashes and the ``+880`` / ``880`` country prefix.
+    """
+    if not value:
+        return None
+    digits = re.sub(r"\D", "", str(value))
+    if digits.startswith(BD_COUNTRY_CODE) and len(digits) == 13:
+        digits = "0" + digits[len(BD_COUNTRY_CODE):]
+    return digits if len(digits) == 11 else None
+
+
+def normalize_contact(value):
+    """Return ``(kind, normalized)`` where kind is ``"email"``, ``"phone"`` or None."""
+    if not value:
+        return None, None
+    if "@" in str(value):
+        email = normalize_email(value)
+        return ("email", email) if email else (None, None)
+    phone = normalize_phone(value)
+    return ("phone", phone) if phone else (None, None)
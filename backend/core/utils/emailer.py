@@ -3,13 +3,8 @@ from django.conf import settings
 
 
 class EmailSender:
-    _instance = None
-
-    def __new__(cls, *args, **kwargs):
-        if cls._instance is None:
-            cls._instance = super(EmailSender, cls).__new__(cls)
-        return cls._instance
-
+    # One instance per message (or batch): the setters mutate it, so it must
+    # never be shared between requests or threads.
     def __init__(self):
         # For single email
         self.subject = None
@@ -70,6 +65,25 @@ class EmailSender:
             raise ValueError("No bulk messages queued.")
         return send_mass_mail(tuple(self.bulk_messages), fail_silently=False)
 
+    # ---- Queue in the notification outbox (sent after commit, with retries) ----
+    def queue(self):
+        if not self.subject or not self.message or not self.recipient_list:
+            raise ValueError("Missing subject, message, or recipients for single email.")
+        from apps.notifications.outbox import enqueue
+
+        return enqueue('email', self.recipient_list, self.message, subject=self.subject)
+
+    def queue_bulk(self):
+        if not self.bulk_messages:
+            raise ValueError("No bulk messages queued.")
+        from apps.notifications.outbox import enqueue
+
+        return [
+            message
+            for subject, body, _from_email, recipients in self.bulk_messages
+            for message in enqueue('email', recipients, body, subject=subject)
+        ]
+
     def __str__(self):
         return f"EmailSender(single to={self.recipient_list}, bulk={len(self.bulk_messages)} items)"
 
@@ -92,6 +106,20 @@ class EmailSender:
 
 '''
 
+'''
+  #! Queued instead of sent inline: call inside the transaction that makes the
+  #! email true; it is delivered by apps.notifications once that commits.
+
+    with transaction.atomic():
+        user.save()
+        EmailSender()\
+            .set_subject("Verify Your Account")\
+            .set_message(f"Your verification code is {otp}")\
+            .set_recipients(user.email)\
+            .queue()
+
+'''
+
 '''
 
     #! For bulk emails
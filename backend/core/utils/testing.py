@@ -0,0 +1,39 @@
+"""Fixtures shared by the apps' ``tests.py`` modules."""
+import uuid
+
+from rest_framework.test import APIClient
+
+from apps.accounts.models import Role, User
+from apps.user_auth.services import issue_session
+
+
+ROLE_NAMES = ("admin", "dataCollector", "public", "subUser")
+
+
+def make_roles():
+    """Every role the views check for, keyed by name."""
+    return {
+        name: Role.objects.get_or_create(name=name, defaults={"label": name})[0]
+        for name in ROLE_NAMES
+    }
+
+
+def make_user(role, username, password=None, **fields):
+    """A user of ``role`` (a ``Role`` or a role name)."""
+    if isinstance(role, str):
+        role = make_roles()[role]
+    return User.objects.create_user(username=username, password=password, role=role, **fields)
+
+
+def api_client(user, visitor_id=None):
+    """An ``APIClient`` signed in as ``user`` with a fresh session; the session is on ``client.session_row``."""
+    visitor_id = visitor_id or uuid.uuid4().hex
+    session = issue_session(user, visitor_id, remember=False, ip="127.0.0.1", user_agent="tests")
+    client = APIClient()
+    client.credentials(
+        HTTP_ACCESS_TOKEN=session.access_token,
+        HTTP_REFRESH_TOKEN=session.refresh_token,
+        HTTP_X_VISITOR_ID=visitor_id,
+    )
+    client.session_row = session
+    return client
@@ -1,7 +1,16 @@
 from django.utils import timezone
+import hashlib
+import uuid
 import jwt
 
 
+def token_digest(token):
+    """Fixed-width sha256 hex digest used to index and look up raw tokens."""
+    if not token:
+        return None
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
 class Token:
     def __init__(self) -> None:
         self.key = "Fw1SEF2a2eAF323RA3SDFa321s3FR"
@@ -10,6 +19,8 @@ class Token:
         return jwt.encode(
             {
                 "user_id": user.pk,
+                "jti": uuid.uuid4().hex,
+                "type": "access",
                 "exp": timezone.now() + timezone.timedelta(minutes=expires),
             },
             self.key,
@@ -20,12 +31,24 @@ class Token:
         return jwt.encode(
             {
                 "user_id": user.pk,
+                "jti": uuid.uuid4().hex,
+                "type": "refresh",
                 "exp": timezone.now() + timezone.timedelta(days=expires),
             },
             self.key,
             algorithm="HS256",
         )
 
+    def decode(self, token, token_type="access"):
+        """Return the verified claims of ``token`` or None if it is invalid, expired or of another type."""
+        try:
+            data = jwt.decode(token, self.key, algorithms=["HS256"])
+        except jwt.PyJWTError:
+            return None
+        if data.get("type") != token_type or not data.get("jti"):
+            return None
+        return data
+
     def verify_token(self, token):
         try:
             data = jwt.decode(token, self.key, algorithms=["HS256"])
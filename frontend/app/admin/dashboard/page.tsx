@@ -88,7 +88,6 @@ export default function AdminDashboard() {
 
   const [users, setUsers] = useState<User[]>([])
   const [collectors, setCollectors] = useState<any[]>([])
-  const [pendingApplications, setPendingApplications] = useState<any[]>([])
   const [currentPage, setCurrentPage] = useState(1);
   const [totalPages, setTotalPages] = useState(1);
   const [pageSize] = useState(10); // You can adjust this value
@@ -98,9 +97,12 @@ export default function AdminDashboard() {
   const [selectedUser, setSelectedUser] = useState<any | null>(null)
   const [verifyingUser, setVerifyingUser] = useState<any | null>(null)
   const [familyData, setFamilyData] = useState<any[]>([])
+  // The family tree is paged with opaque cursors taken from the API's next/previous links
+  const [familyCursor, setFamilyCursor] = useState<string | null>(null)
+  const [familyNextCursor, setFamilyNextCursor] = useState<string | null>(null)
+  const [familyPreviousCursor, setFamilyPreviousCursor] = useState<string | null>(null)
   const [loading, setLoading] = useState(true) // Add loading state
   const [collectorsLoading, setCollectorsLoading] = useState(true) // Add loading state for collectors
-  const [pendingApplicationsLoading, setPendingApplicationsLoading] = useState(true) // Add loading state for pending applications
   const router = useRouter()
   const authData = useSelector(selectAuth)
   const dispatch = useDispatch()
@@ -229,7 +231,8 @@ export default function AdminDashboard() {
 
       try {
         const apiUrl = process.env.NEXT_PUBLIC_API_URL;
-        const response = await fetch(`${apiUrl}/data/family-relationship`, {
+        const query = familyCursor ? `?cursor=${encodeURIComponent(familyCursor)}` : "";
+        const response = await fetch(`${apiUrl}/data/family-relationship${query}`, {
           method: "GET",
           headers: {
             "Content-Type": "application/json",
@@ -243,7 +246,7 @@ export default function AdminDashboard() {
         }
 
         const result = await response.json();
-        const transformedData = result.map((item: any) => ({
+        const transformedData = result.results.map((item: any) => ({
           id: item.collector.id,
           name: item.collector.name,
           role: "Data Collector", // Assuming this is always "Data Collector"
@@ -274,6 +277,9 @@ export default function AdminDashboard() {
           })),
         }));
         setFamilyData(transformedData);
+        const cursorFrom = (link: string | null) => (link ? new URL(link).searchParams.get("cursor") : null);
+        setFamilyNextCursor(cursorFrom(result.next));
+        setFamilyPreviousCursor(cursorFrom(result.previous));
       } catch (error: any) {
         console.error("Failed to fetch family relationship:", error);
         toast.error(`Failed to fetch family relationship: ${error.message}`);
@@ -283,7 +289,7 @@ export default function AdminDashboard() {
     if (visitorId) {
       fetchFamilyData();
     }
-  }, [visitorId]);
+  }, [visitorId, familyCursor]);
 
   useEffect(() => {
     const fetchCollectors = async () => {
@@ -324,45 +330,6 @@ export default function AdminDashboard() {
     }
   }, [visitorId]);
 
-  useEffect(() => {
-    const fetchPendingApplications = async () => {
-      if (!visitorId) return;
-      setPendingApplicationsLoading(true);
-      try {
-        const apiUrl = process.env.NEXT_PUBLIC_API_URL;
-        const response = await fetch(`${apiUrl}/data/pending-application-table`, {
-          method: "GET",
-          headers: {
-            "Content-Type": "application/json",
-            "X-Visitor-ID": visitorId,
-          },
-          credentials: "include",
-        });
-
-        if (!response.ok) {
-          throw new Error(`HTTP error! status: ${response.status}`);
-        }
-
-        const result = await response.json();
-        if (Array.isArray(result)) {
-          setPendingApplications(result);
-        } else {
-          console.warn("API response for pending applications did not contain expected array or was malformed:", result);
-          setPendingApplications([]);
-        }
-      } catch (error: any) {
-        console.error("Failed to fetch pending applications:", error);
-        toast.error(`Failed to fetch pending applications: ${error.message}`);
-      } finally {
-        setPendingApplicationsLoading(false);
-      }
-    };
-
-    if (visitorId) {
-      fetchPendingApplications();
-    }
-  }, [visitorId]);
-
   const handleLogout = async () => {
     try {
       const apiUrl = process.env.NEXT_PUBLIC_API_URL;
@@ -1034,6 +1001,22 @@ export default function AdminDashboard() {
                         </p>
                       </div>
                       {/* <FamilyRelationshipView collectors={familyData} /> */}
+                      <div className="flex items-center justify-end space-x-2 mt-4">
+                        <Button
+                          variant="outline"
+                          onClick={() => setFamilyCursor(familyPreviousCursor)}
+                          disabled={!familyPreviousCursor}
+                        >
+                          Previous
+                        </Button>
+                        <Button
+                          variant="outline"
+                          onClick={() => setFamilyCursor(familyNextCursor)}
+                          disabled={!familyNextCursor}
+                        >
+                          Next
+                        </Button>
+                      </div>
                     </div>
                   )}
                 </TabsContent>
@@ -34,6 +34,15 @@ interface PendingCollector {
   paidAt?: string | null
 }
 
+interface CursorPage<T> {
+  next: string | null
+  previous: string | null
+  results: T[]
+}
+
+// The API pages with opaque cursors; keep only the cursor from its absolute links
+const cursorFrom = (link: string | null) => (link ? new URL(link).searchParams.get("cursor") : null)
+
 interface CollectorStats {
   pending_review: number;
   approved: number;
@@ -51,6 +60,9 @@ export function PendingCollectorsTable() {
   const [collectorToReject, setCollectorToReject] = useState<PendingCollector | null>(null)
   const [rejectionContact, setRejectionContact] = useState("")
   const [loading, setLoading] = useState(true) // Add loading state
+  const [cursor, setCursor] = useState<string | null>(null)
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
+  const [previousCursor, setPreviousCursor] = useState<string | null>(null)
   const apiUrl = process.env.NEXT_PUBLIC_API_URL
 
   useEffect(() => {
@@ -65,7 +77,8 @@ export function PendingCollectorsTable() {
     if (!visitorId) return;
     setLoading(true); // Set loading to true before fetching
     try {
-      const response = await fetch(`${apiUrl}/data/pending-application-table`, {
+      const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : ""
+      const response = await fetch(`${apiUrl}/data/pending-application-table${query}`, {
         headers: {
           "Content-Type": "application/json",
           "X-Visitor-ID": visitorId,
@@ -75,8 +88,10 @@ export function PendingCollectorsTable() {
       if (!response.ok) {
         throw new Error(`HTTP error! status: ${response.status}`)
       }
-      const data: PendingCollector[] = await response.json()
-      setPendingCollectors(data)
+      const data: CursorPage<PendingCollector> = await response.json()
+      setPendingCollectors(data.results)
+      setNextCursor(cursorFrom(data.next))
+      setPreviousCursor(cursorFrom(data.previous))
     } catch (error) {
       console.error("Error fetching pending collectors:", error)
       toast.error("Failed to fetch pending applications.")
@@ -108,8 +123,11 @@ export function PendingCollectorsTable() {
 
   useEffect(() => {
     fetchPendingCollectors();
+  }, [visitorId, apiUrl, cursor]);
+
+  useEffect(() => {
     fetchStats();
-}, [visitorId, apiUrl]);
+  }, [visitorId, apiUrl]);
 
   const handleApprove = async (collector: PendingCollector) => {
     if (!visitorId) return;
@@ -359,6 +377,19 @@ export function PendingCollectorsTable() {
           </Table>
         </div>
 
+        <div className="flex items-center justify-end space-x-2 mt-4">
+          <Button
+            onClick={() => setCursor(previousCursor)}
+            disabled={!previousCursor}
+            variant="outline"
+          >
+            Previous
+          </Button>
+          <Button onClick={() => setCursor(nextCursor)} disabled={!nextCursor} variant="outline">
+            Next
+          </Button>
+        </div>
+
         {/* Summary */}
         <div className="mt-6 grid grid-cols-3 gap-4">
           <div className="text-center p-4 bg-yellow-50 rounded-lg">